@@ -1,39 +1,144 @@
 from fastapi import FastAPI, Request, Query, BackgroundTasks, HTTPException, Path
+from fastapi.responses import Response
 from pydantic import BaseModel
 import os
+import secrets
+import threading
+import time
 from dotenv import load_dotenv
 from stellar_sdk import Keypair, Server
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from x402.fastapi.middleware import require_payment
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+from contextlib import nullcontext
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+except ImportError:
+    trace = None
 
 # Load environment variables from .env file
 load_dotenv()
 
-server = Server("https://horizon-testnet.stellar.org")
+HORIZON_URL = os.getenv("HORIZON_URL", "https://horizon-testnet.stellar.org")
 
 STELLAR_PRIVATE_KEY = os.getenv("STELLAR_PRIVATE_KEY")
-server = Server(horizon_url="https://horizon-testnet.stellar.org")
+server = Server(horizon_url=HORIZON_URL)
 stellar_kp = Keypair.from_secret(STELLAR_PRIVATE_KEY)
 
-async def monitor_transfer_and_bridge(req, id):
-    print(f"Background task started for request: {req}")
-
+# Prometheus metrics, served at /metrics
+CALLBACK_METHODS = ("request_onchain_funds", "notify_onchain_funds_received", "notify_offchain_funds_sent")
+CALLBACK_SECONDS = Histogram(
+    "business_callback_seconds", "Time to answer an anchor transaction callback, by JSON-RPC method", ["method"]
+)
+callback_seconds = {method: CALLBACK_SECONDS.labels(method) for method in (*CALLBACK_METHODS, "other")}
+FUNDS_WAIT_SECONDS = Histogram(
+    "business_onchain_funds_wait_seconds",
+    "Time from starting to watch for a transaction's Stellar payment until it was seen",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+AWAITING_FUNDS = Gauge("business_awaiting_onchain_funds", "Transactions waiting for the user's Stellar payment")
+AWAITING_FUNDS.set_function(lambda: len(awaiting_payment))
+
+# Transactions waiting for the user's Stellar payment, by the memo id each was handed:
+# memo -> (transaction_id, time we started waiting). An entry leaves when its payment is seen,
+# the transaction moves on by another path, or after FUNDS_TTL seconds.
+awaiting_payment = {}
+awaiting_lock = threading.Lock()
+FUNDS_TTL = float(os.getenv("FUNDS_TTL", "86400"))
+
+def allocate_memo(tx_id):
+    """Random MEMO_ID (below 2**63, which every wallet handles) no waiting transaction has."""
+    with awaiting_lock:
+        while True:
+            memo = str(secrets.randbelow(2**63 - 1) + 1)
+            if memo not in awaiting_payment:
+                awaiting_payment[memo] = (tx_id, time.monotonic())
+                return memo
+
+def release_memo(tx_id):
+    """Stop waiting for `tx_id`'s payment, freeing its memo."""
+    memo = db.get(tx_id, {}).get("memo")
+    with awaiting_lock:
+        if memo is not None and awaiting_payment.get(memo, (None,))[0] == tx_id:
+            del awaiting_payment[memo]
+
+def expire_payments():
+    """Drop transactions whose payment hasn't come within FUNDS_TTL seconds."""
+    while True:
+        time.sleep(min(FUNDS_TTL, 60))
+        cutoff = time.monotonic() - FUNDS_TTL
+        with awaiting_lock:
+            expired = [(memo, tx_id) for memo, (tx_id, started) in awaiting_payment.items() if started < cutoff]
+            for memo, tx_id in expired:
+                del awaiting_payment[memo]
+        for memo, tx_id in expired:
+            if db.get(tx_id, {}).get("memo") == memo:
+                db[tx_id] = {"status": "expired"}
+            print(f"⚠️ No Stellar payment for {tx_id} within {FUNDS_TTL:g}s; memo {memo} released")
+
+def watch_payments():
+    """One payments stream for every transaction: each payment goes to the transaction its memo names."""
     print(f"🔁 Watching for USDC on Stellar...")
+    cursor = "now"
+    while True:
+        try:
+            payments = server.payments().for_account(stellar_kp.public_key).join("transactions").cursor(cursor)
+            for payment in payments.stream():
+                cursor = payment["paging_token"]
+                transaction = payment.get("transaction") or {}
+                if payment["type"] != "payment" or payment["to"] != stellar_kp.public_key or transaction.get("memo_type") != "id":
+                    continue
+                with awaiting_lock:
+                    entry = awaiting_payment.pop(transaction["memo"], None)
+                if entry is None:
+                    continue
+                tx_id, started = entry
+                with span("business.payment_received", {"anchor.transaction_id": tx_id, "stellar.payment_id": payment["id"]}):
+                    print(f"✅ Stellar Payment detected for {tx_id}: {payment}")
+                    FUNDS_WAIT_SECONDS.observe(time.monotonic() - started)
+                    db[tx_id] = {"status": "completed"}
+        except Exception as e:
+            print(f"⚠️ Stellar payment stream error: {e}")
+        time.sleep(5)
 
-    seen = set()
-    for payment in server.payments().for_account(stellar_kp.public_key).cursor("now").stream():
-        print(f'🔍 Checking payment: {payment}')
-        if payment["type"] == "payment" and \
-            payment["to"] == stellar_kp.public_key and \
-            payment["id"] not in seen:
+app = FastAPI()
 
-            seen.add(payment["id"])
-            print(f"✅ Stellar Payment detected: {payment}")
-            db[id] = {"status": "completed"}
-            break
+# Spans go to TRACE_FILE and/or an OTLP collector when either is configured;
+# callers' traceparent headers make these spans part of their traces
+tracer = None
+tracer_provider = None
+if trace and (os.getenv("TRACE_FILE") or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")):
+    tracer_provider = TracerProvider(resource=Resource.create({"service.name": "x402-ramp-business-server"}))
+    if os.getenv("TRACE_FILE"):
+        exporter = ConsoleSpanExporter(out=open(os.getenv("TRACE_FILE"), "a"), formatter=lambda span: span.to_json(indent=None) + "\n")
+        tracer_provider.add_span_processor(BatchSpanProcessor(exporter))
+    if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(tracer_provider)
+    tracer = trace.get_tracer("business-server")
+    FastAPIInstrumentor.instrument_app(app, excluded_urls="metrics,callbacks/health", exclude_spans=["receive", "send"])
+
+def span(name, attributes=None):
+    return tracer.start_as_current_span(name, attributes=attributes) if tracer else nullcontext()
+
+@app.on_event("startup")
+def start_payment_watcher():
+    # The stream is blocking, so it runs on its own thread rather than the event loop
+    threading.Thread(target=watch_payments, daemon=True).start()
+    threading.Thread(target=expire_payments, daemon=True).start()
+
+@app.on_event("shutdown")
+def flush_spans():
+    if tracer_provider:
+        tracer_provider.shutdown()
 
-app = FastAPI()
 app.middleware("http")(
     require_payment(price="0.01", pay_to_address="0x55D84680053B999fa3c452D82c5b2743B3AdD424",
                     path="/payments", network="base-sepolia")
@@ -84,6 +189,10 @@ def get_payments(request: Request):
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/callbacks/customer")
 async def get_customer(
     id: Optional[str] = Query(None, description="Customer ID to lookup"),
@@ -247,9 +356,13 @@ def get_price(
     }
 
 @app.post("/callbacks/transactions")
-async def handle_transaction_callback(request: Request, background_tasks: BackgroundTasks):
+async def handle_transaction_callback(request: Request):
     body = await request.json()
+    method = body.get("method")
+    with callback_seconds[method if method in CALLBACK_METHODS else "other"].time():
+        return handle_transaction(body)
 
+def handle_transaction(body: dict):
     method = body.get("method")
     params = body.get("params", {})
     tx_id = params.get("transaction_id") or body.get("id")
@@ -268,16 +381,18 @@ async def handle_transaction_callback(request: Request, background_tasks: Backgr
     print(f"Received callback method: {method} for transaction {tx_id}")
 
     if method == "request_onchain_funds":
-        # Mark transaction as funds requested
-        db[tx_id] = {"status": "funds_requested"}
-        # Start background task to monitor Stellar for funds
-        background_tasks.add_task(monitor_transfer_and_bridge, request, tx_id)
+        # Mark transaction as funds requested, under a memo only this transaction's payment carries;
+        # a repeated callback gets the memo it was already given
+        memo = db.get(tx_id, {}).get("memo") if status == "funds_requested" else None
+        if memo is None:
+            memo = allocate_memo(tx_id)
+        db[tx_id] = {"status": "funds_requested", "memo": memo}
         return {
             "jsonrpc": "2.0",
             "id": tx_id,
             "result": {
-                "memo": "id",  # Typically a memo or identifier for Stellar payment
-                "memo_type": "id",  # Memo type, e.g., id, text, hash
+                "memo": memo,  # The watcher matches the user's Stellar payment to this transaction by it
+                "memo_type": "id",
                 "destination_account": stellar_kp.public_key,  # Your Stellar account to receive funds
                 "status": "funds_requested"
             }
@@ -285,6 +400,7 @@ async def handle_transaction_callback(request: Request, background_tasks: Backgr
 
     elif method == "notify_onchain_funds_received":
         # You might update status to 'funds_received'
+        release_memo(tx_id)
         db[tx_id] = {"status": "funds_received"}
         return {
             "jsonrpc": "2.0",
@@ -294,6 +410,7 @@ async def handle_transaction_callback(request: Request, background_tasks: Backgr
 
     elif method == "notify_offchain_funds_sent":
         # Mark that offchain funds have been sent
+        release_memo(tx_id)
         db[tx_id] = {"status": "offchain_funds_sent"}
         return {
             "jsonrpc": "2.0",
@@ -1,15 +1,19 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, Response
 from fastapi.templating import Jinja2Templates
 import httpx
 from stellar_sdk import Keypair, TransactionEnvelope, Network, Server, Asset, TransactionBuilder, Memo
+from stellar_sdk.exceptions import BadRequestError
 from web3 import Web3
 import os
-import toml
 from dotenv import load_dotenv
 import json
-import requests
 import time
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from x402_ramp import WALLET_BALANCE, AccountCache, EvmChain, FeeOracle, GasLimitCache, NonceManager, Sep10Tokens, StellarChain, StellarToml, Upstreams, result_code, setup_tracing, span, warm_up
 load_dotenv()
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -19,139 +23,117 @@ ASSET_CODE = "USDC"  # or "USDT", etc.
 
 STELLAR_PRIVATE_KEY = os.getenv("THIRD_PARTY_STELLAR_KEY")
 
-server = Server(horizon_url="https://horizon-testnet.stellar.org")
+HORIZON_URL = os.getenv("HORIZON_URL", "https://horizon-testnet.stellar.org")
 kp = Keypair.from_secret(STELLAR_PRIVATE_KEY)
-stellar_account = server.load_account(kp.public_key)
+stellar = StellarChain(HORIZON_URL)
+stellar_accounts = AccountCache(stellar)  # our sequence number and balances, kept current from the effects stream
 STELLAR_ADDRESS = kp.public_key
 STELLAR_TESTNET_USD_ISSUER = os.getenv("STELLAR_TESTNET_USD_ISSUER", "GBBD47IF6LWK7P7MDEVSCWR7DPUWV3NY3DTQEVFL4NAT4AQH3ZLLFLA5")
 usdc_asset_code = "USDC"
 usdc_asset = Asset(usdc_asset_code, STELLAR_TESTNET_USD_ISSUER)  # Circle testnet issuer
+usdc_asset_key = f"{usdc_asset_code}:{STELLAR_TESTNET_USD_ISSUER}"
 
 infura_key = os.getenv("INFURA_API_KEY")
-WEB3_PROVIDER = f"https://base-sepolia.infura.io/v3/{infura_key}"  # or local/testnet
+WEB3_PROVIDER = os.getenv("WEB3_PROVIDER", f"https://base-sepolia.infura.io/v3/{infura_key}")  # or local/testnet; comma-separate several to pool them
 USDC_ADDRESS = "0x036CbD53842c5426634e7929541eC2318f3dCF7e"  # USDC on Base Sepolia
-print(F'current_dir: {current_dir}')
 abi_path = os.path.join(current_dir, "abi", "erc20_abi.json")
-print(F'abi_path: {abi_path}')
 EVM_PRIVATE_KEY = os.getenv("THIRD_PARTY_EVM_KEY")
 
 with open(abi_path, "r") as abi_file:
     ERC20_ABI = abi_file.read()
 
-w3 = Web3(Web3.HTTPProvider(WEB3_PROVIDER))
+evm = EvmChain(WEB3_PROVIDER, USDC_ADDRESS, ERC20_ABI)
+w3 = evm.w3
 evm_account = w3.eth.account.from_key(EVM_PRIVATE_KEY)
-usdc_contract = w3.eth.contract(address=USDC_ADDRESS, abi=ERC20_ABI)
+usdc_contract = evm.token
 EVM_ADDRESS = evm_account.address
 w3.eth.default_account = EVM_ADDRESS
+evm_nonces = NonceManager(w3, EVM_ADDRESS)
+fee_oracle = FeeOracle(w3)
+gas_limits = GasLimitCache()
+
+# Wallet balances for /metrics: Stellar from the effects-fed cache, EVM as last fetched
+WALLET_BALANCE.labels("stellar", usdc_asset_code, STELLAR_ADDRESS).set_function(
+    lambda: stellar_accounts.cached_balance(STELLAR_ADDRESS, usdc_asset_key)
+)
+evm_wallet_balance = WALLET_BALANCE.labels("base", usdc_asset_code, EVM_ADDRESS)
 
 stellar_base_url = "https://testnet.stellarchain.io/transactions/"
 base_base_url = "https://sepolia.basescan.org/tx/"
+BRIDGE_TIMEOUT = 120  # seconds to follow a bridge request before giving up
+
+# Bridge jobs started from the dashboard, kept in memory for JOB_TTL seconds after they settle
+bridge_jobs = {}
+JOB_TTL = 3600
 
-def get_stellar_usdc_balance(public_key: str) -> float:
-    account = server.accounts().account_id(public_key).call()
-    for balance in account["balances"]:
-        if balance.get("asset_code") == "USDC" and balance.get("asset_issuer") == STELLAR_TESTNET_USD_ISSUER:
-            return float(balance["balance"])
-    return 0.0
+async def get_stellar_usdc_balance(public_key: str) -> float:
+    if public_key == STELLAR_ADDRESS:
+        return await stellar_accounts.balance(public_key, usdc_asset_key)
+    return await stellar.asset_balance(public_key, usdc_asset_code, STELLAR_TESTNET_USD_ISSUER)
 
-def get_evm_usdc_balance(address: str) -> float:
-    decimals = usdc_contract.functions.decimals().call()
-    raw_balance = usdc_contract.functions.balanceOf(Web3.to_checksum_address(address)).call()
-    return raw_balance / (10 ** decimals)
+async def get_evm_usdc_balance(address: str) -> float:
+    balance = await evm.token_balance(address)
+    if address == EVM_ADDRESS:
+        evm_wallet_balance.set(balance)
+    return balance
 
-def send_stellar_payment(recipient, amount, memo=None):
-    kp = Keypair.from_secret(STELLAR_PRIVATE_KEY)
-    server = Server("https://horizon-testnet.stellar.org")
-    acc = server.load_account(kp.public_key)
+async def send_stellar_payment(recipient, amount, memo=None, memo_type="text"):
+    acc = await stellar_accounts.next_account(kp.public_key)
 
     tx = (
         TransactionBuilder(source_account=acc, network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE, base_fee=100)
         .append_payment_op(destination=recipient, asset=usdc_asset, amount=str(amount))
     )
-    if memo:
+    if memo and memo_type == "id":
+        tx.add_id_memo(int(memo))
+    elif memo:
         tx.add_text_memo(memo)
 
     tx = tx.build()
     tx.sign(kp)
-    response = server.submit_transaction(tx)
-    return response["hash"]
-
-def get_dynamic_gas_fees(
-    w3,
-    default_priority_gwei: float = 2,
-    history_blocks: int = 5,
-    reward_pct: int = 50,
-) -> dict:
-    """
-    Estimate dynamic gas fee parameters using Web3.
-
-    Returns a dict with:
-      - base_fee           (wei)
-      - max_priority_fee   (wei)
-      - max_fee_per_gas    (wei)
-      - gas_price          (wei)  # legacy fallback
-    """
-    # 1) Base fee from latest block
-    latest = w3.eth.get_block("latest")
-    base_fee = latest.get("baseFeePerGas", 0)
-
-    # 2) Node‐suggested tip (method or attr)
-    raw = getattr(w3.eth, "max_priority_fee", None)
-    if callable(raw):
-        priority_fee = raw()
-    elif isinstance(raw, int):
-        priority_fee = raw
-    else:
-        priority_fee = w3.to_wei(default_priority_gwei, "gwei")
-
-    # 3) Historical percentile tip
-    hist = w3.eth.fee_history(history_blocks, "latest", [reward_pct])
-    hist_tip = int(hist["reward"][-1][0])
-    priority_fee = max(priority_fee, hist_tip)
-
-    # 4) Buffer to cover up to +12.5% baseFee increase
-    buffer = int(base_fee * 0.125)
-
-    max_fee_per_gas = max(base_fee + priority_fee + buffer, base_fee + priority_fee)
-
-    return {
-        "base_fee": base_fee,
-        "max_priority_fee": priority_fee,
-        "max_fee_per_gas": max_fee_per_gas,
-        "gas_price": w3.eth.gas_price
-    }
-
-def send_usdc(recipient, amount):
-    decimals = usdc_contract.functions.decimals().call()
-    amt = int(amount * (10 ** decimals))
-    nonce = w3.eth.get_transaction_count(evm_account.address)
-
-    tx = usdc_contract.functions.transfer(recipient, amt).build_transaction({
-        'chainId': w3.eth.chain_id,
-        'nonce': nonce,
-    })
-
-    fees = get_dynamic_gas_fees(w3)
-
-    # Dynamically estimate gas
     try:
-        gas_limit = w3.eth.estimate_gas(tx)
+        response = await stellar.submit(tx)
     except Exception as e:
-        gas_limit = 21000  # Fallback gas limit
-
-    # Add EIP-1559 fields
-    tx.update({
-        'gas': int(gas_limit*1.15),
-        'maxFeePerGas': fees['max_fee_per_gas'],
-        'maxPriorityFeePerGas': fees['max_priority_fee'],
-        'type': 2,
-    })
-
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=EVM_PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    return tx_hash.hex()
+        # Only a tx that failed in the ledger consumed its sequence number
+        if not (isinstance(e, BadRequestError) and result_code(e) == "tx_failed"):
+            stellar_accounts.invalidate(kp.public_key)
+        raise
+    return response["hash"]
 
-app = FastAPI()
+async def send_usdc(recipient, amount):
+    return await evm.send_token(evm_account, recipient, amount, evm_nonces, fee_oracle, gas_limits)
+
+# One keep-alive client per upstream service, opened for the app's lifetime
+BRIDGE_URL = os.getenv("BRIDGE_URL", "http://localhost:9000")
+ANCHOR_URL = os.getenv("ANCHOR_URL", "http://localhost:8080")
+BUSINESS_URL = os.getenv("BUSINESS_URL", "http://localhost:3000")
+upstreams = Upstreams()
+
+# The anchor's stellar.toml and our SEP-10 token, kept warm between withdrawals
+anchor_toml = None
+sep10_tokens = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global anchor_toml, sep10_tokens
+    await evm.connect()
+    upstreams.add("bridge", BRIDGE_URL, httpx.Timeout(30, connect=5))
+    anchor = upstreams.add("anchor", ANCHOR_URL, httpx.Timeout(15, connect=5))
+    upstreams.add("business", BUSINESS_URL, httpx.Timeout(30, connect=5))
+    anchor_toml = StellarToml(anchor)
+    sep10_tokens = Sep10Tokens(anchor, anchor_toml, Network.TESTNET_NETWORK_PASSPHRASE)
+    account_watch = asyncio.create_task(stellar_accounts.watch(kp.public_key))
+    await warm_up({"chain id": evm.chain_id(), "token decimals": evm.decimals()})
+    yield
+    account_watch.cancel()
+    sep10_tokens.close()
+    await asyncio.gather(evm.close(), stellar.close(), upstreams.close())
+    if tracer_provider:
+        tracer_provider.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+# Spans go to TRACE_FILE and/or an OTLP collector when either is configured
+tracer_provider = setup_tracing("x402-ramp-dashboard", app)
 templates = Jinja2Templates(directory="templates")
 
 @app.get("/")
@@ -162,10 +144,13 @@ async def root(request: Request):
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/anchor-toml")
 async def get_anchor_toml():
-    anchor_toml = requests.get("http://localhost:8080/.well-known/stellar.toml").text
-    docs = toml.loads(anchor_toml)
+    docs = await anchor_toml.get()
     print(json.dumps(docs, indent=2))
     # Return the relevant parts of the TOML
     print(docs.get("DOCUMENTATION", {}))
@@ -196,9 +181,7 @@ async def get_balance():
 
     # Ethereum balance
     try:
-        decimals = usdc_contract.functions.decimals().call()
-        balance = usdc_contract.functions.balanceOf(evm_account.address).call()
-        balance = balance / (10 ** decimals)
+        balance = await get_evm_usdc_balance(evm_account.address)
         data.append({
             "network": "base-sepolia",
             "address": EVM_ADDRESS,
@@ -212,7 +195,7 @@ async def get_balance():
 
     # Stellar balance
     try:
-        balance = get_stellar_usdc_balance(kp.public_key)
+        balance = await get_stellar_usdc_balance(kp.public_key)
         data.append({
             "network": "stellar-testnet",
             "address": kp.public_key,
@@ -226,8 +209,21 @@ async def get_balance():
 
     return {"accounts": data}
 
-@app.get("/bridge")
-async def bridge(request: Request, amount: float):
+async def wait_for_bridge(request_id: str) -> dict:
+    """Follow the bridge server's status events for a request until it completes or fails."""
+    events_url = f"/bridge/events/{request_id}"
+    async with upstreams["bridge"].stream("GET", events_url, timeout=httpx.Timeout(10, read=None)) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            if event["status"] in ("completed", "failed"):
+                return event
+    raise httpx.ReadError("Bridge status stream closed early")
+
+async def run_bridge(amount: float) -> dict:
+    """Request an EVM → Stellar bridge, fund it and follow it until it settles."""
     request_data = {
         "apikey": "",
         "stellar_address": STELLAR_ADDRESS, # Example Ethereum address
@@ -236,11 +232,7 @@ async def bridge(request: Request, amount: float):
         "amount": amount
     }
 
-    balance = get_evm_usdc_balance(EVM_ADDRESS)
-    if balance < amount:
-        return {"error": f"Insufficient EVM balance. Current balance: {balance}, required: {amount}"}
-
-    r = requests.post("http://localhost:9000/bridge/request", json=request_data)
+    r = await upstreams["bridge"].post("/bridge/request", json=request_data)
     r.raise_for_status()
     print("Bridge request sent successfully:", r.json())
     data = r.json()
@@ -254,30 +246,69 @@ async def bridge(request: Request, amount: float):
     bridge_address = data.get("bridge_address")
     amount = data.get("amount", amount)
 
-    base_tx = send_usdc(bridge_address, amount)
+    base_tx = await send_usdc(bridge_address, amount)
 
-    for _ in range(10):
-        try:
-            r = requests.get(f"http://localhost:9000/bridge/status/{request_id}")
-            r.raise_for_status()
-            status = r.json().get("status")
-            if status == "completed":
-                message = r.json()
-                return {"status": status, "message": message, "bridge_tx": "0x" + base_tx, "bridge_tx_url": f"{base_base_url}{"0x" + base_tx}", "bridge_address": bridge_address}
-        except requests.RequestException as e:
-            print(f"Error checking status: {e}")
-        time.sleep(5)
-    return {"error": "Bridge request timed out or failed to complete."}
+    try:
+        event = await asyncio.wait_for(wait_for_bridge(request_id), BRIDGE_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"error": "Bridge request timed out or failed to complete."}
+    except httpx.HTTPError as e:
+        print(f"Error following bridge status: {e}")
+        return {"error": "Bridge request timed out or failed to complete."}
+    if event["status"] != "completed":
+        return {"error": f"Bridge request failed: {event.get('error')}"}
+    return {"status": event["status"], "message": event, "bridge_tx": "0x" + base_tx, "bridge_tx_url": f"{base_base_url}{"0x" + base_tx}", "bridge_address": bridge_address}
+
+async def run_job(job_id: str, work):
+    job = bridge_jobs[job_id]
+    try:
+        with span("dashboard.bridge_job", {"dashboard.job_id": job_id}):
+            result = await work
+    except Exception as e:
+        print(f"❌ Bridge job {job_id} failed: {e}")
+        job.update(status="failed", error=str(e))
+    else:
+        job.update(status="failed" if "error" in result else "completed", result=result)
+    job["finished_at"] = time.time()
+    job.pop("task", None)
+
+def start_job(work) -> str:
+    # Forget settled jobs nobody has asked about for a while
+    now = time.time()
+    for job_id in [j for j, job in bridge_jobs.items() if now - job.get("finished_at", now) > JOB_TTL]:
+        del bridge_jobs[job_id]
+
+    job_id = secrets.token_hex(8)
+    bridge_jobs[job_id] = {"status": "running", "created_at": now}
+    bridge_jobs[job_id]["task"] = asyncio.create_task(run_job(job_id, work))
+    return job_id
+
+@app.get("/bridge")
+async def bridge(request: Request, amount: float):
+    balance = await get_evm_usdc_balance(EVM_ADDRESS)
+    if balance < amount:
+        return {"error": f"Insufficient EVM balance. Current balance: {balance}, required: {amount}"}
+
+    job_id = start_job(run_bridge(amount))
+    return {"status": "running", "job_id": job_id, "job_url": f"/bridge/jobs/{job_id}"}
+
+@app.get("/bridge/jobs/{job_id}")
+async def bridge_job(job_id: str):
+    job = bridge_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, **{key: value for key, value in job.items() if key != "task"}}
 
 @app.get("/withdraw")
 async def withdrawal_ui(request: Request, amount: float):
 
-    balance = get_stellar_usdc_balance(kp.public_key)
+    balance = await get_stellar_usdc_balance(kp.public_key)
     if balance < amount:
         return {"error": f"Insufficient Stellar balance. Current balance: {balance}, required: {amount}"}
 
-    anchor_domain = "localhost:8080"  # Replace with your anchor's domain
-    toml_data = toml.loads(requests.get(f"http://{anchor_domain}/.well-known/stellar.toml").text)
+    anchor = upstreams["anchor"]
+    business = upstreams["business"]
+    toml_data = await anchor_toml.get()
 
     print(json.dumps(toml_data, indent=2))
     amount = int(amount)
@@ -292,17 +323,6 @@ async def withdrawal_ui(request: Request, amount: float):
     transfer_server = toml_data["TRANSFER_SERVER"]
     signing_key = toml_data["SIGNING_KEY"]
 
-    # Request challenge
-    challenge_tx = requests.get(web_auth_endpoint, params={"account": kp.public_key}).json()
-    envelope = TransactionEnvelope.from_xdr(challenge_tx["transaction"], Network.TESTNET_NETWORK_PASSPHRASE)
-
-    # Sign and send back
-    envelope.sign(kp)
-    resp = requests.post(web_auth_endpoint, json={"transaction": envelope.to_xdr()})
-    jwt_token = resp.json()["token"]
-
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {jwt_token}"}
-
     withdraw_req = {
         "amount": amount_str,
         "asset_code": "USDC",
@@ -311,11 +331,18 @@ async def withdrawal_ui(request: Request, amount: float):
         "claimable_balance_supported": "false"
     }
 
-    response = requests.get(
-        f"http://{anchor_domain}/sep6/withdraw",
-        headers=headers,
-        params=withdraw_req
-    )
+    # SEP-10 token comes from the cache; a rejected one is replaced once
+    for attempt in range(2):
+        jwt_token = await sep10_tokens.token(kp)
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {jwt_token}"}
+        response = await anchor.get(
+            "/sep6/withdraw",
+            headers=headers,
+            params=withdraw_req
+        )
+        if response.status_code not in (401, 403):
+            break
+        sep10_tokens.invalidate(kp.public_key)
     print(response.json())
     transaction_id = response.json()["id"]
 
@@ -328,7 +355,7 @@ async def withdrawal_ui(request: Request, amount: float):
         }
     }
 
-    response = requests.post("http://localhost:3000/callbacks/transactions", json=payload)
+    response = await business.post("/callbacks/transactions", json=payload)
     print(response.json())
 
     # breakpoint()
@@ -352,7 +379,7 @@ async def withdrawal_ui(request: Request, amount: float):
 
     # breakpoint()
 
-    stellar_tx = send_stellar_payment(recipient=destination, amount=amount, memo=memo)
+    stellar_tx = await send_stellar_payment(recipient=destination, amount=amount, memo=memo, memo_type=memo_type)
     print(f"Stellar transaction sent: {stellar_tx}")
     payload = {
         "jsonrpc": "2.0",
@@ -365,16 +392,16 @@ async def withdrawal_ui(request: Request, amount: float):
 
     for _ in range(10):
         try:
-            r = requests.post(f"http://localhost:3000/callbacks/transactions", json=payload)
+            r = await business.post("/callbacks/transactions", json=payload)
             r.raise_for_status()
             print(f"Callback response: {r.json()}")
             status = r.json().get("result", {}).get("status")
             if status == "funds_received":
                 print("Withdrawal request completed successfully.")
                 break
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"Error checking transaction status: {e}")
-        time.sleep(5)
+        await asyncio.sleep(5)
 
     final_resp = {
         "message": "Withdrawal request processed successfully",
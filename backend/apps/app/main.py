@@ -1,50 +1,120 @@
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from flask import request
 from pydantic import BaseModel
 from web3 import Web3
+from web3.exceptions import TransactionNotFound
 from stellar_sdk import Account, Server, Asset, Keypair, Network, TransactionBuilder
 import os
 from dotenv import load_dotenv
 import threading
 import asyncio
 import secrets
-from diskcache import Cache
+import json
+import math
+from contextlib import asynccontextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from x402_ramp import WALLET_BALANCE, AccountCache, ChannelPool, EvmChain, FeeOracle, GasLimitCache, NonceManager, StellarChain, setup_tracing, span, warm_up
+from x402_ramp.bridge import (
+    TERMINAL_STATUSES,
+    AdmissionController,
+    ConfirmationTracker,
+    DisperseBatcher,
+    LifecycleMetrics,
+    LiquidityLedger,
+    PayoutError,
+    PayoutPending,
+    PaymentStream,
+    PendingDeposits,
+    RequestStore,
+    ReservedTags,
+    StatusEvents,
+    StellarPayoutBatcher,
+    Throttled,
+    TransferIndexer,
+    allocate_amount_tag,
+    allocate_memo_id,
+    api_key_id,
+    parse_tiers,
+)
 
 load_dotenv()
 
-app = FastAPI()
+# Request journal; keep BRIDGE_DB_PATH on persistent storage (the container mounts a volume at /data)
+store = RequestStore(os.getenv("BRIDGE_DB_PATH", "bridge.db"))
 
-cache = Cache("cache")
+# Status transitions fan out to SSE and WebSocket subscribers as they commit
+status_events = StatusEvents()
+store.listeners.append(status_events.publish)
+SSE_KEEPALIVE = 15
+
+# Stage latencies and pending / in-flight gauges for /metrics, fed by the same transitions
+lifecycle_metrics = LifecycleMetrics()
+store.listeners.append(lifecycle_metrics)
+
+# Per-API-key admission to /bridge/request: a token bucket and a cap on open requests (0 turns either off).
+# With BRIDGE_API_KEYS unset any key is accepted, so a client can dodge its limits by changing keys.
+BRIDGE_API_KEYS = {key for key in os.getenv("BRIDGE_API_KEYS", "").split(",") if key}
+admission = AdmissionController(
+    rate=float(os.getenv("BRIDGE_KEY_RATE", "1")),
+    burst=float(os.getenv("BRIDGE_KEY_BURST", "20")),
+    max_open=int(os.getenv("BRIDGE_KEY_MAX_OPEN", "50")),
+)
+store.listeners.append(admission)
+
+# Bridge wallet balances net of promised payouts; accepting a request reserves its payout here, no RPC involved
+liquidity = LiquidityLedger()
+store.listeners.append(liquidity)
 
 # Web3 config
 infura_key = os.getenv("INFURA_API_KEY")
-WEB3_PROVIDER = f"https://base-sepolia.infura.io/v3/{infura_key}"  # or local/testnet
+WEB3_PROVIDER = os.getenv("WEB3_PROVIDER", f"https://base-sepolia.infura.io/v3/{infura_key}")  # or local/testnet; comma-separate several to pool them
 USDC_ADDRESS = "0x036CbD53842c5426634e7929541eC2318f3dCF7e"  # USDC on Base Sepolia
 current_dir = os.path.dirname(os.path.abspath(__file__))
-print(F'current_dir: {current_dir}')
 abi_path = os.path.join(current_dir, "abi", "erc20_abi.json")
-print(F'abi_path: {abi_path}')
 EVM_PRIVATE_KEY = os.getenv("BRIDGE_EVM_PRIVATE_KEY")
 
 with open(abi_path, "r") as abi_file:
     ERC20_ABI = abi_file.read()
 
-w3 = Web3(Web3.HTTPProvider(WEB3_PROVIDER))
+# Optional BridgeDisperse deployment (contracts/solidity/src/BridgeDisperse.sol)
+DISPERSE_ADDRESS = os.getenv("DISPERSE_ADDRESS")
+with open(os.path.join(current_dir, "abi", "disperse_abi.json"), "r") as abi_file:
+    DISPERSE_ABI = abi_file.read()
+
+evm = EvmChain(WEB3_PROVIDER, USDC_ADDRESS, ERC20_ABI)
+w3 = evm.w3
 evm_account = w3.eth.account.from_key(EVM_PRIVATE_KEY)
-usdc_contract = w3.eth.contract(address=USDC_ADDRESS, abi=ERC20_ABI)
+usdc_contract = evm.token
 EVM_ADDRESS = evm_account.address
 w3.eth.default_account = EVM_ADDRESS
+evm_nonces = NonceManager(w3, EVM_ADDRESS)
+fee_oracle = FeeOracle(w3)
+gas_limits = GasLimitCache()
+
+# Stellar → EVM payouts go out in one disperse tx per batch when a contract is configured
+evm_payouts = None
+if DISPERSE_ADDRESS:
+    disperse_contract = w3.eth.contract(address=Web3.to_checksum_address(DISPERSE_ADDRESS), abi=DISPERSE_ABI)
+    evm_payouts = DisperseBatcher(evm, disperse_contract, evm_account, evm_nonces, fee_oracle)
 
 STELLAR_PRIVATE_KEY = os.getenv("BRIDGE_STELLAR_PRIVATE_KEY")
 
-server = Server(horizon_url="https://horizon-testnet.stellar.org")
+HORIZON_URL = os.getenv("HORIZON_URL", "https://horizon-testnet.stellar.org")
+stellar = StellarChain(HORIZON_URL)
+stellar_accounts = AccountCache(stellar)  # bridge account sequence and balances, kept current from its effects
 stellar_kp = Keypair.from_secret(STELLAR_PRIVATE_KEY)
-stellar_account = server.load_account(stellar_kp.public_key)
 STELLAR_ADDRESS = stellar_kp.public_key
 STELLAR_TESTNET_USD_ISSUER = os.getenv("STELLAR_TESTNET_USD_ISSUER", "GBBD47IF6LWK7P7MDEVSCWR7DPUWV3NY3DTQEVFL4NAT4AQH3ZLLFLA5")
 usdc_asset_code = "USDC"
 usdc_asset = Asset(usdc_asset_code, STELLAR_TESTNET_USD_ISSUER)  # Circle testnet issuer
+usdc_asset_key = f"{usdc_asset_code}:{STELLAR_TESTNET_USD_ISSUER}"  # matches payment_asset() of a USDC payment
+BRIDGE_MEMO = "x402-ramp bridge"  # one memo for every payout so they can share a transaction
+# Read at scrape time from the effects-fed cache and the liquidity ledger
+WALLET_BALANCE.labels("stellar", usdc_asset_code, STELLAR_ADDRESS).set_function(
+    lambda: stellar_accounts.cached_balance(STELLAR_ADDRESS, usdc_asset_key)
+)
+WALLET_BALANCE.labels("base", usdc_asset_code, EVM_ADDRESS).set_function(lambda: liquidity.balance("base-sepolia"))
 
 def has_trustline(account, asset_code, issuer):
     for balance in account['balances']:
@@ -57,94 +127,53 @@ def has_trustline(account, asset_code, issuer):
             return True
     return False
 
-def check_for_usdc_transfer(expected_sender, expected_amount):
-    current_block = w3.eth.block_number
-    logs = usdc_contract.events.Transfer().get_logs(
-        from_block=current_block - 20,
-        to_block='latest'
-    )
-    for log in logs:
-        if log['args']['from'].lower() == expected_sender.lower() and \
-           log['args']['to'].lower() == evm_account.address.lower() and \
-           log['args']['value'] >= expected_amount:
-            return log['transactionHash'].hex()
-    return None
-
-def send_stellar_payment(recipient, amount, memo=None):
-    kp = Keypair.from_secret(STELLAR_PRIVATE_KEY)
-    server = Server("https://horizon-testnet.stellar.org")
-    acc = server.load_account(kp.public_key)
-
-    tx = (
-        TransactionBuilder(source_account=acc, network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE, base_fee=100)
-        .append_payment_op(destination=recipient, asset=usdc_asset, amount=str(amount))
-    )
-    if memo:
-        tx.add_text_memo(memo)
-
-    tx = tx.build()
-    tx.sign(kp)
-    response = server.submit_transaction(tx)
-    return response["hash"]
-
-def get_dynamic_gas_fees(
+# EVM deposits are paid out once their block is deep enough for their amount, e.g. "100:seen,10000:safe,finalized".
+# Without BRIDGE_SAFE_DEPTH / BRIDGE_FINALIZED_DEPTH the node's safe / finalized blocks count; Stellar deposits are final once seen
+SAFE_DEPTH = os.getenv("BRIDGE_SAFE_DEPTH")
+FINALIZED_DEPTH = os.getenv("BRIDGE_FINALIZED_DEPTH")
+evm_confirmations = ConfirmationTracker(
     w3,
-    default_priority_gwei: float = 2,
-    history_blocks: int = 5,
-    reward_pct: int = 50,
-) -> dict:
-    """
-    Estimate dynamic gas fee parameters using Web3.
-
-    Returns a dict with:
-      - base_fee           (wei)
-      - max_priority_fee   (wei)
-      - max_fee_per_gas    (wei)
-      - gas_price          (wei)  # legacy fallback
-    """
-    # 1) Base fee from latest block
-    latest = w3.eth.get_block("latest")
-    base_fee = latest.get("baseFeePerGas", 0)
-
-    # 2) Node‐suggested tip (method or attr)
-    raw = getattr(w3.eth, "max_priority_fee", None)
-    if callable(raw):
-        priority_fee = raw()
-    elif isinstance(raw, int):
-        priority_fee = raw
-    else:
-        priority_fee = w3.to_wei(default_priority_gwei, "gwei")
-
-    # 3) Historical percentile tip
-    hist = w3.eth.fee_history(history_blocks, "latest", [reward_pct])
-    hist_tip = int(hist["reward"][-1][0])
-    priority_fee = max(priority_fee, hist_tip)
-
-    # 4) Buffer to cover up to +12.5% baseFee increase
-    buffer = int(base_fee * 0.125)
-
-    max_fee_per_gas = max(base_fee + priority_fee + buffer, base_fee + priority_fee)
-
-    return {
-        "base_fee": base_fee,
-        "max_priority_fee": priority_fee,
-        "max_fee_per_gas": max_fee_per_gas,
-        "gas_price": w3.eth.gas_price
-    }
-
-def handle_payment(payment):
-    print("💸 Payment received!")
-    print(f"Type: {payment['type']}")
-    print(f"From: {payment['from']}")
-    print(f"To: {payment['to']}")
-    print(f"Asset: {payment['asset_type']}")
-    print(f"Amount: {payment['amount']}")
-
-def listen_for_payments():
-    print("🔁 Listening for Stellar payments...")
-    for payment in server.payments().for_account(stellar_kp.public_key).cursor("now").stream():
-        if payment["type"] == "payment":
-            handle_payment(payment)
+    parse_tiers(os.getenv("BRIDGE_CONFIRMATION_TIERS", "100:seen,safe")),
+    safe_depth=int(SAFE_DEPTH) if SAFE_DEPTH else None,
+    finalized_depth=int(FINALIZED_DEPTH) if FINALIZED_DEPTH else None,
+)
+
+# Memo ids and amount tags of open requests; each is held until its request completes or fails
+deposit_tags = ReservedTags()
+store.listeners.append(deposit_tags)
+
+# EVM → Stellar requests waiting on a deposit, keyed by their tagged amount in token units
+pending_evm_deposits = PendingDeposits()
+evm_indexer = TransferIndexer(
+    w3, usdc_contract, EVM_ADDRESS, store.state, pending_evm_deposits, store.deposits, evm_confirmations
+)
+
+# Stellar → EVM requests waiting on a deposit, keyed by their memo id
+pending_stellar_deposits = PendingDeposits()
+stellar_stream = PaymentStream(
+    stellar.server, STELLAR_ADDRESS, pending_stellar_deposits, usdc_asset_key, store.deposits, state=store.state
+)
+
+# Every transfer into a bridge wallet adds to its liquidity, matched or not
+evm_indexer.listeners.append(
+    lambda log: liquidity.credit("base-sepolia", log["args"]["value"] / 10**6, log["blockNumber"])  # USDC = 6 decimals
+)
+stellar_stream.listeners.append(
+    lambda payment: liquidity.credit("stellar-testnet", payment["amount"], int(payment["paging_token"]) >> 32)
+)
+# A reorg may have dropped credited transfers, so the EVM balance is read again
+evm_confirmations.listeners.append(lambda fork: asyncio.ensure_future(load_evm_liquidity()))
+
+# EVM → Stellar payouts share one transaction per ledger window, sent from
+# channel accounts so several batches can land in the same ledger
+STELLAR_CHANNEL_ACCOUNTS = int(os.getenv("STELLAR_CHANNEL_ACCOUNTS", "4"))
+stellar_channels = ChannelPool(stellar, stellar_kp, Network.TESTNET_NETWORK_PASSPHRASE, size=STELLAR_CHANNEL_ACCOUNTS)
+stellar_payouts = StellarPayoutBatcher(
+    stellar, stellar_kp, Network.TESTNET_NETWORK_PASSPHRASE, channels=stellar_channels, accounts=stellar_accounts
+)
+
+async def send_stellar_payment(recipient, amount, memo=None):
+    return await stellar_payouts.pay(recipient, usdc_asset, amount, memo=memo)
 
 class BridgeRequest(BaseModel):
     apikey: str  # user api key
@@ -153,35 +182,10 @@ class BridgeRequest(BaseModel):
     stellar_address: str  # target address (EVM or Stellar)
     amount: float  # amount to bridge
 
-def send_usdc_from_bridge_wallet(recipient, amount):
-    decimals = usdc_contract.functions.decimals().call()
-    amt = int(amount * (10 ** decimals))
-    nonce = w3.eth.get_transaction_count(evm_account.address)
-
-    tx = usdc_contract.functions.transfer(recipient, amt).build_transaction({
-        'chainId': w3.eth.chain_id,
-        'nonce': nonce,
-    })
+PAYOUT_RECEIPT_TIMEOUT = 120  # seconds to wait for a single-transfer EVM payout to be mined
 
-    fees = get_dynamic_gas_fees(w3)
-
-    # Dynamically estimate gas
-    try:
-        gas_limit = w3.eth.estimate_gas(tx)
-    except Exception as e:
-        gas_limit = 21000  # Fallback gas limit
-
-    # Add EIP-1559 fields
-    tx.update({
-        'gas': int(gas_limit*1.15),
-        'maxFeePerGas': fees['max_fee_per_gas'],
-        'maxPriorityFeePerGas': fees['max_priority_fee'],
-        'type': 2,
-    })
-
-    signed_tx = w3.eth.account.sign_transaction(tx, private_key=EVM_PRIVATE_KEY)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    return tx_hash.hex()
+async def send_usdc_from_bridge_wallet(recipient, amount):
+    return await evm.send_token(evm_account, recipient, amount, evm_nonces, fee_oracle, gas_limits)
 
 def is_valid_evm_address(address: str) -> bool:
     return Web3.is_address(address)
@@ -189,59 +193,202 @@ def is_valid_evm_address(address: str) -> bool:
 def is_valid_stellar_address(address: str) -> bool:
     return address.startswith("G") and len(address) == 56
 
-def get_stellar_usdc_balance(public_key: str) -> float:
-    account = server.accounts().account_id(public_key).call()
-    for balance in account["balances"]:
-        if balance.get("asset_code") == "USDC" and balance.get("asset_issuer") == STELLAR_TESTNET_USD_ISSUER:
-            return float(balance["balance"])
-    return 0.0
+async def get_stellar_usdc_balance(public_key: str) -> float:
+    if public_key == STELLAR_ADDRESS:
+        return await stellar_accounts.balance(public_key, usdc_asset_key)
+    return await stellar.asset_balance(public_key, usdc_asset_code, STELLAR_TESTNET_USD_ISSUER)
 
-def get_evm_usdc_balance(address: str) -> float:
-    decimals = usdc_contract.functions.decimals().call()
-    raw_balance = usdc_contract.functions.balanceOf(Web3.to_checksum_address(address)).call()
-    return raw_balance / (10 ** decimals)
+async def get_evm_usdc_balance(address: str) -> float:
+    return await evm.token_balance(address)
 
-async def monitor_transfer_and_bridge(req: BridgeRequest, request_id: str):
-    print(f"Background task started for request: {req}")
+async def load_evm_liquidity():
+    head = await w3.eth.block_number
+    liquidity.set_balance("base-sepolia", await evm.token_balance(EVM_ADDRESS, block_identifier=head), as_of=head)
+
+async def load_stellar_liquidity():
+    state = await stellar_accounts.reload(STELLAR_ADDRESS)
+    liquidity.set_balance(
+        "stellar-testnet", state.balances.get(usdc_asset_key, 0), as_of=state.ledgers.get(usdc_asset_key, 0)
+    )
+
+LIQUIDITY_LOADERS = {"base-sepolia": load_evm_liquidity, "stellar-testnet": load_stellar_liquidity}
+liquidity_lock = asyncio.Lock()
+
+async def load_liquidity():
+    """Load both bridge balances into the ledger with the block / ledger they reflect."""
+    await asyncio.gather(load_evm_liquidity(), load_stellar_liquidity())
+
+async def ensure_liquidity(chain: str):
+    """Load `chain`'s balance if startup couldn't, so one failed warm-up doesn't refuse every request."""
+    if chain in liquidity:
+        return
+    async with liquidity_lock:
+        if chain not in liquidity:
+            try:
+                await LIQUIDITY_LOADERS[chain]()
+            except Exception as e:
+                raise HTTPException(status_code=503, detail=f"Bridge wallet balance on {chain} is unavailable: {e}")
+
+def register_deposit(req: BridgeRequest, request_id: str, deposit_tag: str):
+    """Wait for the deposit carrying `deposit_tag`; returns the PendingDeposits, key and future."""
     if req.target_chain == "stellar-testnet":
-        # EVM → Stellar bridge
-        print(f"🔁 Watching for USDC from {req.evm_address} on EVM...")
+        units = int(deposit_tag)
+        return pending_evm_deposits, units, pending_evm_deposits.register(units, request_id, units)
+    return pending_stellar_deposits, deposit_tag, pending_stellar_deposits.register(deposit_tag, request_id, req.amount)
+
+async def wait_for_deposit(req: BridgeRequest, request_id: str, deposit_tag: str):
+    source_chain = "EVM" if req.target_chain == "stellar-testnet" else "Stellar"
+    watcher = evm_indexer if req.target_chain == "stellar-testnet" else stellar_stream
+    print(f"🔁 Watching for USDC tagged {deposit_tag} on {source_chain}...")
+    while True:
+        pending, key, deposit = register_deposit(req, request_id, deposit_tag)
+        try:
+            deposit = await deposit
+        finally:
+            pending.unregister(key, request_id)
+        # The claim moves the request to deposit_detected; a deposit another request consumed is refused
+        chain, source_tx, position = watcher.deposit_key(deposit)
+        if not await store.deposits.claim(request_id, chain, source_tx, position):
+            print(f"⚠️ {source_chain} deposit {source_tx} was already claimed; still waiting for request {request_id}")
+            continue
+        if watcher is stellar_stream or await evm_confirmations.confirm(deposit["blockNumber"], deposit["blockHash"], req.amount):
+            break
+        # Waiting again before the claim is given back, so the rescan from the fork finds this request
+        register_deposit(req, request_id, deposit_tag)
+        await store.deposits.release(request_id)
+        print(f"⚠️ {source_chain} deposit {source_tx} was reorged out; still waiting for request {request_id}")
 
-        while True:
-            tx = check_for_usdc_transfer(req.evm_address, int(req.amount * (10**6)))  # USDC = 6 decimals
-            if tx:
-                print(f"✅ EVM Transfer detected: {tx}")
-                stellar_tx = send_stellar_payment(req.stellar_address, req.amount, memo=f"Bridge from {req.evm_address[0:5]}")
-                info = dict(cache[request_id])  # get a mutable copy
-                info.update({"status": "completed", "target_tx": stellar_tx})
-                cache[request_id] = info
-                print(f"✅ Sent to Stellar: {stellar_tx}")
-                break
-            await asyncio.sleep(5)
+    if req.target_chain == "stellar-testnet":
+        # EVM → Stellar bridge
+        print(f"✅ EVM Transfer detected: {source_tx}")
 
     elif req.target_chain == "base-sepolia":
         # Stellar → EVM bridge
-        print(f"🔁 Watching for USDC from {req.stellar_address} on Stellar...")
-
-        seen = set()
-        for payment in server.payments().for_account(stellar_kp.public_key).cursor("now").stream():
-            if payment["type"] == "payment" and \
-               payment["from"] == req.stellar_address and \
-               payment["to"] == stellar_kp.public_key and \
-               float(payment["amount"]) >= req.amount and \
-               payment["id"] not in seen:
-
-                seen.add(payment["id"])
-                print(f"✅ Stellar Payment detected: {payment}")
-                # For MVP, send from EVM bridge wallet to user
-                evm_tx = send_usdc_from_bridge_wallet(req.evm_address, req.amount)
-                info = dict(cache[request_id])  # get a mutable copy
-                info.update({"status": "completed", "target_tx": evm_tx})
-                cache[request_id] = info        # write back to cache
-                print(f"✅ Sent to Base: {evm_tx}")
-                break
-
-# cache = {}
+        print(f"✅ Stellar Payment detected: {deposit}")
+
+async def pay_out(req: BridgeRequest, request_id: str):
+    # Recorded before sending so a restart never pays a request twice
+    await store.update(request_id, "paying")
+    log_index = None
+
+    async def submitted(target_tx: str):
+        await store.update(request_id, "submitted", target_tx=target_tx)
+
+    try:
+        if req.target_chain == "stellar-testnet":
+            # Horizon answers once the transaction is in a closed ledger, so it is broadcast and included at once
+            target_tx = await send_stellar_payment(req.stellar_address, req.amount, memo=BRIDGE_MEMO)
+            await submitted(target_tx)
+        elif evm_payouts:
+            target_tx, log_index = await evm_payouts.pay(request_id, req.evm_address, req.amount, on_submitted=submitted)
+        else:
+            # For MVP, send from EVM bridge wallet to user
+            target_tx = await send_usdc_from_bridge_wallet(req.evm_address, req.amount)
+            await submitted(target_tx)
+            try:
+                receipt = await w3.eth.wait_for_transaction_receipt(target_tx, timeout=PAYOUT_RECEIPT_TIMEOUT)
+            except Exception as e:
+                raise PayoutPending(f"transfer {target_tx} not confirmed: {e}") from e
+            if receipt["status"] != 1:
+                raise PayoutError(f"transfer {target_tx} reverted")
+    except PayoutPending as e:
+        # Broadcast and maybe still mined: failing it would free its liquidity, tag and slot
+        print(f"⚠️ Payout for {request_id} is unconfirmed ({e}); left as submitted, check it before retrying")
+        return
+    except Exception as e:
+        await store.update(request_id, "failed", error=str(e))
+        print(f"❌ Payout for {request_id} failed: {e}")
+        return
+    await store.update(request_id, "completed", target_tx=target_tx, target_log_index=log_index)
+    print(f"✅ Sent to {req.target_chain}: {target_tx}")
+
+async def confirm_and_pay_out(req: BridgeRequest, request_id: str, deposit_tag: str, source_tx: str):
+    """Pay out a resumed EVM deposit once its block is deep enough, or wait for it again if a reorg dropped it."""
+    try:
+        receipt = await w3.eth.get_transaction_receipt(source_tx)
+    except TransactionNotFound:
+        receipt = None
+    if receipt is not None and await evm_confirmations.confirm(receipt["blockNumber"], receipt["blockHash"], req.amount):
+        await pay_out(req, request_id)
+        return
+    register_deposit(req, request_id, deposit_tag)
+    await store.deposits.release(request_id)
+    print(f"⚠️ EVM deposit {source_tx} was reorged out; still waiting for request {request_id}")
+    await monitor_transfer_and_bridge(req, request_id, deposit_tag)
+
+async def monitor_transfer_and_bridge(req: BridgeRequest, request_id: str, deposit_tag: str):
+    print(f"Background task started for request: {req}")
+    with span("bridge.monitor", {"bridge.request_id": request_id, "bridge.target_chain": req.target_chain}):
+        with span("bridge.wait_for_deposit"):
+            await wait_for_deposit(req, request_id, deposit_tag)
+        with span("bridge.pay_out"):
+            await pay_out(req, request_id)
+
+def resume_requests() -> list:
+    """Restart the monitors of requests a previous process left in flight."""
+    tasks = []
+    for row in store.in_flight():
+        req = BridgeRequest.model_construct(
+            apikey="", **{key: row[key] for key in ("target_chain", "evm_address", "stellar_address", "amount")}
+        )
+        if row["status"] == "pending" and row["deposit_tag"] is None:
+            print(f"⚠️ Request {row['id']} predates deposit tags and can't be matched; check deposits from {row['source_address']} by hand")
+        elif row["status"] == "pending":
+            tasks.append(asyncio.create_task(monitor_transfer_and_bridge(req, row["id"], row["deposit_tag"])))
+        elif row["status"] == "deposit_detected" and row["target_chain"] == "stellar-testnet" and row["deposit_tag"]:
+            tasks.append(asyncio.create_task(confirm_and_pay_out(req, row["id"], row["deposit_tag"], row["source_tx"])))
+        elif row["status"] == "deposit_detected":
+            tasks.append(asyncio.create_task(pay_out(req, row["id"])))
+        elif row["status"] == "submitted":
+            print(f"⚠️ Request {row['id']} was interrupted waiting for payout {row['target_tx']}; check it before retrying")
+        else:
+            # The payout may or may not have gone out before the restart
+            print(f"⚠️ Request {row['id']} was interrupted while paying out; check {row['target_address']} before retrying")
+    if tasks:
+        print(f"🔁 Resumed {len(tasks)} in-flight bridge request(s)")
+    return tasks
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing above touches the network; connections open here, warm-up runs concurrently
+    await evm.connect()
+    steps = {
+        "chain id": evm.chain_id(),
+        "token decimals": evm.decimals(),
+        "Stellar channel accounts": stellar_channels.setup(),
+        "liquidity": load_liquidity(),
+    }
+    if evm_payouts:
+        steps["disperse allowance"] = evm_payouts.ensure_allowance()
+    await warm_up(steps)
+    # Resumed monitors start before the scanners so their deposits are
+    # registered by the time the missed blocks and payments are replayed
+    in_flight = store.in_flight()
+    lifecycle_metrics.seed(in_flight)
+    liquidity.seed(in_flight)
+    deposit_tags.seed(in_flight)
+    await admission.seed(in_flight)
+    tasks = resume_requests()
+    tasks += [
+        asyncio.create_task(evm_indexer.run()),
+        asyncio.create_task(stellar_stream.run()),
+        asyncio.create_task(stellar_accounts.watch(STELLAR_ADDRESS)),
+        asyncio.create_task(fee_oracle.run()),
+        asyncio.create_task(stellar_payouts.run()),
+    ]
+    if evm_payouts:
+        tasks.append(asyncio.create_task(evm_payouts.run()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(evm.close(), stellar.close(), return_exceptions=True)
+    store.close()
+    if tracer_provider:
+        tracer_provider.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+# Spans go to TRACE_FILE and/or an OTLP collector when either is configured
+tracer_provider = setup_tracing("x402-ramp-bridge", app)
 
 @app.get("/")
 async def root():
@@ -250,79 +397,180 @@ async def root():
 @app.get("/health")
 async def health_check():
     data = {}
-    if w3.isConnected():
-        data[w3.eth.chain_id] = {"status": "ok",
-                                 "address": evm_account.address,
-                                 "block_number": w3.eth.block_number
+    # Both chains are probed at once; chain id comes from the cache warmed at startup
+    block_number, stellar_account = await asyncio.gather(
+        evm.block_number(),
+        stellar.load_account(stellar_kp.public_key),
+        return_exceptions=True,
+    )
+    if not isinstance(block_number, Exception):
+        data[await evm.chain_id()] = {"status": "ok",
+                                      "address": evm_account.address,
+                                      "block_number": block_number
             }
     else:
-        data[w3.eth.chain_id] = {"status": "error", "message": "Web3 provider not reachable"}
+        data["evm"] = {"status": "error", "message": "Web3 provider not reachable"}
 
-    try:
-        stellar_account = server.load_account(stellar_kp.public_key)
+    if not isinstance(stellar_account, Exception):
         data["stellar"] = {
             "status": "ok",
             "address": stellar_kp.public_key,
             "sequence": stellar_account.sequence
         }
-    except Exception as e:
+    else:
         data["stellar"] = {
             "status": "error",
-            "message": str(e)
+            "message": str(stellar_account)
         }
     return data
 
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/bridge/supported_chains")
 async def supported_chains():
     return {"chains": ["stellar-testnet", "base-sepolia"]}
 
 @app.get("/bridge/status/{request_id}")
 async def request_status(request_id: str):
-    req_info = cache.get(request_id)
-    if req_info is None:
+    row = store.get(request_id)
+    if row is None:
         return {"error": "Request not found"}
-    # Make a copy of the request dict and remove apikey if present
-    info = dict(req_info)  # shallow copy
-    print(f'info: {info}')
-    if "request" in info and isinstance(info["request"], BridgeRequest):
-        info["request"] = dict(info["request"])  # copy request dict
-        info["request"].pop("apikey", None)
-        print(f'info: {info}')
-    status = info.get("status")
-    info.pop("status", None)
-    return {"status": status, "info": info}
+    info = {
+        "request": {key: row[key] for key in ("target_chain", "evm_address", "stellar_address", "amount")},
+        "history": store.history(request_id),
+    }
+    for key in ("source_tx", "target_tx", "target_log_index", "error"):
+        if row[key] is not None:
+            info[key] = row[key]
+    return {"status": row["status"], "info": info}
+
+def status_snapshot(row: dict) -> dict:
+    event = {"request_id": row["id"], "status": row["status"], "at": row["updated_at"]}
+    for key in ("source_tx", "target_tx", "target_log_index", "error"):
+        if row[key] is not None:
+            event[key] = row[key]
+    return event
+
+@app.get("/bridge/events/{request_id}")
+async def request_events(request_id: str):
+    # Subscribe before reading the current status so no transition falls in between
+    queue = asyncio.Queue()
+    status_events.subscribe(queue, request_id)
+    row = store.get(request_id)
+    if row is None:
+        status_events.unsubscribe(queue, request_id)
+        raise HTTPException(status_code=404, detail="Request not found")
+
+    async def stream():
+        try:
+            event = status_snapshot(row)
+            yield f"event: status\ndata: {json.dumps(event)}\n\n"
+            while event["status"] not in TERMINAL_STATUSES:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: status\ndata: {json.dumps(event)}\n\n"
+        finally:
+            status_events.unsubscribe(queue, request_id)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/bridge/events")
+async def events_socket(websocket: WebSocket):
+    """Multiplexed status feed: send {"subscribe": [ids]} or {"unsubscribe": [ids]} at any time."""
+    await websocket.accept()
+    queue = asyncio.Queue()
+    followed = set()
+
+    def unfollow(request_id):
+        followed.discard(request_id)
+        status_events.unsubscribe(queue, request_id)
+
+    async def forward():
+        while True:
+            event = await queue.get()
+            await websocket.send_json(event)
+            if event.get("status") in TERMINAL_STATUSES:
+                unfollow(event["request_id"])
+
+    sender = asyncio.create_task(forward())
+    try:
+        while True:
+            message = await websocket.receive_json()
+            for request_id in message.get("subscribe", []):
+                if request_id in followed:
+                    continue
+                followed.add(request_id)
+                status_events.subscribe(queue, request_id)
+                row = store.get(request_id)
+                if row is None:
+                    unfollow(request_id)
+                    queue.put_nowait({"request_id": request_id, "error": "Request not found"})
+                else:
+                    queue.put_nowait(status_snapshot(row))
+            for request_id in message.get("unsubscribe", []):
+                unfollow(request_id)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        for request_id in list(followed):
+            unfollow(request_id)
 
 @app.get("/bridge/balance")
 async def get_balance():
     data = {}
-    try:
-        decimals = usdc_contract.functions.decimals().call()
-        balance = usdc_contract.functions.balanceOf(evm_account.address).call()
-        balance = balance / (10 ** decimals)  # Convert to human-readable format
-        data["ethereum"] = balance
-    except Exception as e:
-        data["ethereum_error"] = str(e)
+    evm_balance, stellar_balance = await asyncio.gather(
+        get_evm_usdc_balance(evm_account.address),
+        get_stellar_usdc_balance(stellar_kp.public_key),
+        return_exceptions=True,
+    )
+    if isinstance(evm_balance, Exception):
+        data["ethereum_error"] = str(evm_balance)
+    else:
+        data["ethereum"] = evm_balance
 
-    try:
-        balance = get_stellar_usdc_balance(stellar_kp.public_key)
-        data["stellar"] = balance
-    except Exception as e:
-        data["stellar_error"] = str(e)
+    if isinstance(stellar_balance, Exception):
+        data["stellar_error"] = str(stellar_balance)
+    else:
+        data["stellar"] = stellar_balance
 
     return data
 
 @app.post("/bridge/request")
 async def request_bridge(req: BridgeRequest, background_tasks: BackgroundTasks):
-    # Validate chain target
-    if req.target_chain not in ["stellar-testnet", "base-sepolia"]:
-        raise HTTPException(status_code=400, detail="Invalid target_chain")        
+    if BRIDGE_API_KEYS and req.apikey not in BRIDGE_API_KEYS:
+        raise HTTPException(status_code=401, detail="Unknown API key")
 
     salt = os.urandom(32).hex()
     if not salt.startswith("0x"):
         salt = "0x" + salt
     settlement_id = secrets.token_hex(16)
-    id_hash_bytes = w3.solidity_keccak(["bytes32", "string"], [salt, settlement_id])
+    id_hash_bytes = Web3.solidity_keccak(["bytes32", "string"], [salt, settlement_id])
     request_id = id_hash_bytes.hex()
+
+    # Refused before any Horizon / RPC call is made on the request's behalf
+    try:
+        await admission.admit(req.apikey, request_id)
+    except Throttled as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    try:
+        return await open_bridge_request(req, request_id, background_tasks)
+    except BaseException:
+        liquidity.release(request_id)
+        deposit_tags.release(request_id)
+        await admission.release(request_id)
+        raise
+
+async def open_bridge_request(req: BridgeRequest, request_id: str, background_tasks: BackgroundTasks):
+    # Validate chain target
+    if req.target_chain not in ["stellar-testnet", "base-sepolia"]:
+        raise HTTPException(status_code=400, detail="Invalid target_chain")        
+
     status = "pending"
 
     source_chain = "stellar-testnet" if req.target_chain == "base-sepolia" else "base-sepolia"
@@ -333,37 +581,54 @@ async def request_bridge(req: BridgeRequest, background_tasks: BackgroundTasks):
         if not is_valid_stellar_address(req.stellar_address) or not is_valid_evm_address(req.evm_address):
             raise HTTPException(status_code=400, detail="Invalid source/target address format for EVM → Stellar")
         
-        # Check if recipient has trustline to USDC
-        recipient_account = server.accounts().account_id(req.stellar_address).call()
+        # Check recipient trustline, then reserve the payout from the bridge wallet's Stellar liquidity
+        recipient_account = await stellar.account(req.stellar_address)
         if not has_trustline(recipient_account, usdc_asset_code, STELLAR_TESTNET_USD_ISSUER):
             raise HTTPException(status_code=400, detail="Recipient does not have a trustline to USDC")
         
-        # Check Stellar balance of bridge wallet
-        bridge_balance = get_stellar_usdc_balance(stellar_kp.public_key)
-        if bridge_balance < req.amount:
-            raise HTTPException(status_code=400, detail=f"Bridge wallet has insufficient balance on Stellar: {bridge_balance} USDC")
+        await ensure_liquidity(req.target_chain)
+        if not liquidity.reserve(request_id, req.target_chain, req.amount):
+            raise HTTPException(status_code=400, detail=f"Bridge wallet has insufficient balance on Stellar: {liquidity.available(req.target_chain)} USDC available")
 
     elif req.target_chain == "base-sepolia":
         bridge_address = STELLAR_ADDRESS
         if not is_valid_stellar_address(req.stellar_address) or not is_valid_evm_address(req.evm_address):
             raise HTTPException(status_code=400, detail="Invalid source/target address format for Stellar → EVM")
         
-        # Check Base (EVM) balance of bridge wallet
-        bridge_balance = get_evm_usdc_balance(evm_account.address)
-        if bridge_balance < req.amount:
-            raise HTTPException(status_code=400, detail=f"Bridge wallet has insufficient balance on Base: {bridge_balance} USDC")
-
-    cache[request_id] = {
-        "request": req,  # Remove apikey from request
-        "status": status
-    }
+        # Reserve the payout from the bridge wallet's Base (EVM) liquidity
+        await ensure_liquidity(req.target_chain)
+        if not liquidity.reserve(request_id, req.target_chain, req.amount):
+            raise HTTPException(status_code=400, detail=f"Bridge wallet has insufficient balance on Base: {liquidity.available(req.target_chain)} USDC available")
+
+    # The deposit is matched by a key no other open request has: a sub-cent
+    # amount tag on EVM, a memo id on Stellar. It stays reserved until the request is terminal.
+    if req.target_chain == "stellar-testnet":
+        deposit_tag = str(allocate_amount_tag(round(req.amount * 10**6), deposit_tags))  # USDC = 6 decimals
+        deposit = {"amount": int(deposit_tag) / 10**6}
+        instructions = f"exactly {deposit['amount']} USDC"
+    else:
+        deposit_tag = allocate_memo_id(deposit_tags)
+        deposit = {"amount": req.amount, "memo": deposit_tag, "memo_type": "id"}
+        instructions = f"{req.amount} USDC with memo id {deposit_tag}"
+    deposit_tags.reserve(request_id, deposit_tag)
+    pending, key, _ = register_deposit(req, request_id, deposit_tag)
+    try:
+        await store.create(
+            request_id, status=status, deposit_tag=deposit_tag, api_key_id=api_key_id(req.apikey),
+            **req.model_dump(exclude={"apikey"}),
+        )
+    except Exception:
+        pending.unregister(key, request_id)
+        deposit_tags.release(request_id)
+        raise
 
     # Launch background task to monitor and bridge
-    background_tasks.add_task(monitor_transfer_and_bridge, req, request_id)
+    background_tasks.add_task(monitor_transfer_and_bridge, req, request_id, deposit_tag)
     return {"status": "watching for source transfer",
             "request_id": request_id,
-            "message": f"Request {request_id} is being processed. Please send USDC on {source_chain} to the bridge address {bridge_address}.",
+            "message": f"Request {request_id} is being processed. Please send {instructions} on {source_chain} to the bridge address {bridge_address}.",
             "source_chain": source_chain,
-            "source_chain_id": w3.eth.chain_id if source_chain == "base-sepolia" else "n/a",
+            "source_chain_id": await evm.chain_id() if source_chain == "base-sepolia" else "n/a",
             "bridge_address": bridge_address,
+            **deposit,
         }
@@ -26,7 +26,6 @@ def get_stellar_usdc_balance(public_key: str) -> float:
 
 def send_stellar_payment(recipient, amount, pk, memo=None):
     kp = Keypair.from_secret(pk)
-    server = Server("https://horizon-testnet.stellar.org")
     acc = server.load_account(kp.public_key)
 
     tx = (
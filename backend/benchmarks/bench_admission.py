@@ -0,0 +1,128 @@
+"""
+Per-API-key admission on POST /bridge/request: one noisy client vs one polite one.
+
+For `--duration` seconds a noisy API key floods the bridge server from
+`--clients` connections while a polite key sends one request every
+`--interval` seconds. Runs once with the admission limits off and once with
+`--rate` / `--burst` / `--max-open`, and reports what each key got through,
+the polite key's latency, and the fake RPC / Horizon calls spent in total.
+
+    python benchmarks/bench_admission.py --clients 50 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import aiohttp
+from eth_account import Account
+from stellar_sdk import Keypair
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_bridge_request import BRIDGE_APP_DIR
+from fakes import diff_calls, dump, fetch_calls, percentile, start_fakes, start_service, stop
+
+
+async def post(http: aiohttp.ClientSession, url: str, apikey: str, i: int) -> tuple:
+    body = {
+        "apikey": apikey,
+        "target_chain": "stellar-testnet" if i % 2 else "base-sepolia",
+        "evm_address": Account.create().address,
+        "stellar_address": Keypair.random().public_key,
+        "amount": 1,
+    }
+    start = time.perf_counter()
+    async with http.post(url, json=body) as r:
+        await r.read()
+        return r.status, time.perf_counter() - start, r.headers.get("Retry-After")
+
+
+async def run_keys(base_url: str, clients: int, duration: float, interval: float) -> dict:
+    url = f"{base_url}/bridge/request"
+    deadline = time.monotonic() + duration
+    noisy = {"admitted": 0, "throttled": 0, "retry_after_s": set()}
+    polite = {"admitted": 0, "throttled": 0, "latencies": []}
+
+    async def flood(http):
+        i = 0
+        while time.monotonic() < deadline:
+            status, _, retry_after = await post(http, url, "noisy", i)
+            i += 1
+            if status == 429:
+                noisy["throttled"] += 1
+                noisy["retry_after_s"].add(int(retry_after))
+            else:
+                noisy["admitted"] += 1
+
+    async def trickle(http):
+        i = 0
+        while time.monotonic() < deadline:
+            status, latency, _ = await post(http, url, "polite", i)
+            i += 1
+            polite["throttled" if status == 429 else "admitted"] += 1
+            polite["latencies"].append(latency)
+            await asyncio.sleep(interval)
+
+    connector = aiohttp.TCPConnector(limit=clients + 1)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(120)) as http:
+        await asyncio.gather(trickle(http), *(flood(http) for _ in range(clients)))
+    latencies = polite.pop("latencies")
+    polite["p50_ms"] = round(percentile(latencies, 50) * 1000, 1)
+    polite["p99_ms"] = round(percentile(latencies, 99) * 1000, 1)
+    noisy["retry_after_s"] = sorted(noisy["retry_after_s"])
+    return {"noisy": noisy, "polite": polite}
+
+
+def run(args, limits: dict) -> dict:
+    rpc, horizon = f"http://127.0.0.1:{args.port + 1}", f"http://127.0.0.1:{args.port + 2}"
+    env = {
+        "WEB3_PROVIDER": rpc,
+        "HORIZON_URL": horizon,
+        "BRIDGE_EVM_PRIVATE_KEY": Account.create().key.hex(),
+        "BRIDGE_STELLAR_PRIVATE_KEY": Keypair.random().secret,
+        "PYTHONPATH": BACKEND_DIR,
+        **limits,
+    }
+    rpc_before, horizon_before = fetch_calls(rpc), fetch_calls(horizon)
+    bridge = start_service(BRIDGE_APP_DIR, "main", args.port, env, cwd=tempfile.mkdtemp(prefix="bridge-admission-"))
+    try:
+        report = asyncio.run(run_keys(f"http://127.0.0.1:{args.port}", args.clients, args.duration, args.interval))
+        report["rpc_calls"] = sum(diff_calls(rpc_before, fetch_calls(rpc)).values())
+        report["horizon_calls"] = sum(diff_calls(horizon_before, fetch_calls(horizon)).values())
+    finally:
+        stop(bridge)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between the polite key's requests")
+    parser.add_argument("--rate", type=float, default=1)
+    parser.add_argument("--burst", type=float, default=20)
+    parser.add_argument("--max-open", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fake RPC/Horizon call")
+    parser.add_argument("--port", type=int, default=19700)
+    args = parser.parse_args()
+
+    fakes = start_fakes(args.port + 1, args.latency)
+    report = {"clients": args.clients, "duration_s": args.duration, "upstream_latency_ms": args.latency * 1000}
+    try:
+        report["off"] = run(args, {"BRIDGE_KEY_RATE": "0", "BRIDGE_KEY_MAX_OPEN": "0"})
+        report["on"] = run(args, {
+            "BRIDGE_KEY_RATE": str(args.rate),
+            "BRIDGE_KEY_BURST": str(args.burst),
+            "BRIDGE_KEY_MAX_OPEN": str(args.max_open),
+        })
+    finally:
+        stop(fakes)
+    dump(report)
+
+
+if __name__ == "__main__":
+    main()
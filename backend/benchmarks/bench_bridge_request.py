@@ -0,0 +1,105 @@
+"""
+Latency of POST /bridge/request on the bridge server under concurrent load.
+
+Starts the bridge server under uvicorn against a fake JSON-RPC node and a fake
+Horizon (see fakes.py), each adding `--latency` seconds per call, and reports
+p50/p99 latency and throughput for `--clients` concurrent clients. Server,
+fakes and load generator run in separate processes.
+
+    python benchmarks/bench_bridge_request.py --clients 200 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import aiohttp
+from eth_account import Account
+from stellar_sdk import Keypair
+
+from fakes import dump, fetch_calls, percentile, start_fakes, start_service, stop
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BRIDGE_APP_DIR = os.path.join(BACKEND_DIR, "apps", "app")
+
+
+async def run_clients(base_url: str, clients: int, total: int):
+    user_evm = Account.create().address
+    user_stellar = Keypair.random().public_key
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def client(http: aiohttp.ClientSession):
+        nonlocal errors
+        while not queue.empty():
+            i = queue.get_nowait()
+            body = {
+                "apikey": "bench",
+                "target_chain": "stellar-testnet" if i % 2 else "base-sepolia",
+                "evm_address": user_evm,
+                "stellar_address": user_stellar,
+                "amount": 1,
+            }
+            start = time.perf_counter()
+            try:
+                async with http.post(f"{base_url}/bridge/request", json=body) as r:
+                    r.raise_for_status()
+                    await r.read()
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(120)) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fake RPC/Horizon call")
+    parser.add_argument("--port", type=int, default=19000)
+    args = parser.parse_args()
+
+    fakes = start_fakes(args.port + 1, args.latency)
+    env = {
+        "WEB3_PROVIDER": f"http://127.0.0.1:{args.port + 1}",
+        "HORIZON_URL": f"http://127.0.0.1:{args.port + 2}",
+        "BRIDGE_EVM_PRIVATE_KEY": Account.create().key.hex(),
+        "BRIDGE_STELLAR_PRIVATE_KEY": Keypair.random().secret,
+        "BRIDGE_KEY_RATE": "0",  # one API key drives the whole load
+        "BRIDGE_KEY_MAX_OPEN": "0",
+        "PYTHONPATH": BACKEND_DIR,
+    }
+    bridge = start_service(BRIDGE_APP_DIR, "main", args.port, env, cwd=tempfile.mkdtemp(prefix="bridge-bench-"))
+    try:
+        latencies, errors, elapsed = asyncio.run(run_clients(f"http://127.0.0.1:{args.port}", args.clients, args.requests))
+        rpc_calls = fetch_calls(env["WEB3_PROVIDER"])
+        horizon_calls = fetch_calls(env["HORIZON_URL"])
+    finally:
+        stop(bridge)
+        stop(fakes)
+    dump({
+        "endpoint": "POST /bridge/request",
+        "clients": args.clients,
+        "requests": args.requests,
+        "errors": errors,
+        "upstream_latency_ms": args.latency * 1000,
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "rpc_calls": rpc_calls,
+        "horizon_calls": horizon_calls,
+    })
+
+
+if __name__ == "__main__":
+    main()
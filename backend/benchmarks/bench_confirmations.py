@@ -0,0 +1,153 @@
+"""
+EVM deposit confirmation policy and reorgs on the bridge server.
+
+Runs EVM → Stellar requests against the bridge under two payout policies:
+`seen` pays every deposit as soon as its log is indexed, `tiered` pays
+amounts up to `--small` at `seen` and larger ones once their block is
+`--safe-depth` blocks deep. In each, `--flows` small and `--flows` large
+requests run to completion, then `--flows` large requests have their
+deposits reorged away, one at a time, right after the bridge detects them.
+Reports time to payout per tier, and how many reorged deposits were paid
+out anyway versus returned to pending (and completed once the user pays
+again).
+
+    python benchmarks/bench_confirmations.py --flows 10 --safe-depth 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import aiohttp
+from eth_account import Account
+from stellar_sdk import Keypair
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_e2e import BRIDGE_APP_DIR, USDC_ADDRESS
+from fakes import dump, percentile, start_fakes, start_service, stop
+
+FLOW_TIMEOUT = 120
+
+
+class Flows:
+    def __init__(self, http: aiohttp.ClientSession, bridge: str, rpc: str, reorg_depth: int):
+        self.http = http
+        self.bridge = bridge
+        self.rpc = rpc
+        self.reorg_depth = reorg_depth
+
+    async def post(self, url: str, body: dict) -> dict:
+        async with self.http.post(url, json=body) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def deposit(self, user: str, data: dict):
+        await self.post(f"{self.rpc}/_deposit", {
+            "token": USDC_ADDRESS, "from": user, "to": data["bridge_address"], "value": round(data["amount"] * 10**6),
+        })
+
+    async def statuses(self, request_id: str):
+        async with self.http.get(f"{self.bridge}/bridge/events/{request_id}") as r:
+            r.raise_for_status()
+            async for line in r.content:
+                line = line.decode().strip()
+                if line.startswith("data: "):
+                    yield json.loads(line[len("data: "):])["status"]
+
+    async def run(self, amount: float, reorg: bool) -> dict:
+        user = Account.create().address
+        data = await self.post(f"{self.bridge}/bridge/request", {
+            "apikey": "bench", "target_chain": "stellar-testnet", "evm_address": user,
+            "stellar_address": Keypair.random().public_key, "amount": amount,
+        })
+        start = time.perf_counter()
+        await self.deposit(user, data)
+        outcome = {"reorged": False, "returned_to_pending": False}
+        async for status in self.statuses(data["request_id"]):
+            if status == "deposit_detected" and reorg and not outcome["reorged"]:
+                await self.post(f"{self.rpc}/_reorg", {"depth": self.reorg_depth})
+                outcome["reorged"] = True
+            elif status == "pending" and outcome["reorged"] and not outcome["returned_to_pending"]:
+                # The user's transfer was dropped; they send it again
+                outcome["returned_to_pending"] = True
+                await self.deposit(user, data)
+            elif status in ("paying", "completed", "failed"):
+                outcome["paid_after_reorg"] = outcome["reorged"] and not outcome["returned_to_pending"]
+                outcome["status"] = "completed" if status == "paying" else status
+                break
+        outcome["latency"] = time.perf_counter() - start
+        return outcome
+
+
+async def run_policy(base_url: str, rpc: str, args) -> dict:
+    report = {}
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(FLOW_TIMEOUT)) as http:
+        flows = Flows(http, base_url, rpc, args.safe_depth)
+        for name, amount in (("small", 1), ("large", args.large)):
+            results = await asyncio.gather(*(flows.run(amount, False) for _ in range(args.flows)))
+            latencies = [r["latency"] for r in results]
+            report[name] = {
+                "amount": amount,
+                "completed": sum(r["status"] == "completed" for r in results),
+                "p50_s": round(percentile(latencies, 50), 2),
+                "p99_s": round(percentile(latencies, 99), 2),
+            }
+        # One at a time, so a reorg only drops the deposit it was aimed at
+        results = [await flows.run(args.large, True) for _ in range(args.flows)]
+        report["large_reorged"] = {
+            "paid_on_dropped_deposit": sum(r["paid_after_reorg"] for r in results),
+            "returned_to_pending": sum(r["returned_to_pending"] for r in results),
+            "completed_after_repaying": sum(r["returned_to_pending"] and r["status"] == "completed" for r in results),
+        }
+    return report
+
+
+def run(args, policy: dict) -> dict:
+    rpc, horizon = f"http://127.0.0.1:{args.port + 1}", f"http://127.0.0.1:{args.port + 2}"
+    env = {
+        "WEB3_PROVIDER": rpc,
+        "HORIZON_URL": horizon,
+        "BRIDGE_EVM_PRIVATE_KEY": Account.create().key.hex(),
+        "BRIDGE_STELLAR_PRIVATE_KEY": Keypair.random().secret,
+        "BRIDGE_KEY_RATE": "0",
+        "BRIDGE_KEY_MAX_OPEN": "0",
+        "PYTHONPATH": BACKEND_DIR,
+        **policy,
+    }
+    bridge = start_service(BRIDGE_APP_DIR, "main", args.port, env, cwd=tempfile.mkdtemp(prefix="bridge-confirmations-"))
+    try:
+        return asyncio.run(run_policy(f"http://127.0.0.1:{args.port}", rpc, args))
+    finally:
+        stop(bridge)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=10, help="requests per tier and for the reorg run")
+    parser.add_argument("--small", type=float, default=5, help="largest amount paid out as soon as it is seen")
+    parser.add_argument("--large", type=float, default=50)
+    parser.add_argument("--safe-depth", type=int, default=4, help="blocks (2 s each on the fake node) until a block is safe")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fake RPC/Horizon call")
+    parser.add_argument("--port", type=int, default=19800)
+    args = parser.parse_args()
+
+    fakes = start_fakes(args.port + 1, args.latency)
+    report = {"flows": args.flows, "safe_depth": args.safe_depth}
+    try:
+        report["seen"] = run(args, {"BRIDGE_CONFIRMATION_TIERS": "seen"})
+        report["tiered"] = run(args, {
+            "BRIDGE_CONFIRMATION_TIERS": f"{args.small:g}:seen,safe",
+            "BRIDGE_SAFE_DEPTH": str(args.safe_depth),
+        })
+    finally:
+        stop(fakes)
+    dump(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+End-to-end bridge, withdrawal and anchor-callback flows, fully offline.
+
+Starts the bridge server, the dashboard and the anchor's business server
+under uvicorn against a fake JSON-RPC node, a fake Horizon and a fake SEP-1/10/6
+anchor (see fakes.py), each adding `--latency` seconds per call. The fakes
+turn submitted transactions into on-chain events, and the harness plays the
+users by injecting their deposits, so every flow runs to completion:
+
+    bridge     POST /bridge/request, deposit on the source chain, follow
+               /bridge/events/{id} until the request completes or fails
+               (alternating EVM → Stellar and Stellar → EVM)
+    dashboard  GET /bridge on the dashboard and poll its job until it settles
+    withdraw   GET /withdraw on the dashboard (SEP-10, SEP-6, business server)
+    business   request_onchain_funds, pay the returned account and memo,
+               notify_onchain_funds_received on the business server
+
+Each scenario runs `--flows` flows at `--clients` concurrency and reports
+completed flows per second, p50/p99 latency of a completed flow, and the
+fake RPC / Horizon / anchor calls made per completed flow (background
+polling included).
+
+    python benchmarks/bench_e2e.py --clients 20 --flows 200 --scenarios bridge
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import aiohttp
+from eth_account import Account
+from stellar_sdk import Keypair
+
+from fakes import diff_calls, dump, fetch_calls, percentile, start_fakes, start_service, stop
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BRIDGE_APP_DIR = os.path.join(BACKEND_DIR, "apps", "app")
+BUSINESS_APP_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "anchor", "business-server", "app")
+USDC_ADDRESS = "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
+SCENARIOS = {
+    # scenario: services it needs
+    "bridge": ("bridge",),
+    "dashboard": ("bridge", "dashboard"),
+    "withdraw": ("dashboard", "business"),
+    "business": ("business",),
+}
+FLOW_TIMEOUT = 120
+
+
+class Harness:
+    def __init__(self, http: aiohttp.ClientSession, urls: dict):
+        self.http = http
+        self.urls = urls
+
+    async def post(self, url: str, body: dict) -> dict:
+        async with self.http.post(url, json=body) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def get(self, url: str, **params) -> dict:
+        async with self.http.get(url, params=params) as r:
+            r.raise_for_status()
+            return await r.json()
+
+    async def follow(self, request_id: str) -> str:
+        async with self.http.get(f"{self.urls['bridge']}/bridge/events/{request_id}") as r:
+            r.raise_for_status()
+            async for line in r.content:
+                line = line.decode().strip()
+                if line.startswith("data: "):
+                    status = json.loads(line[len("data: "):])["status"]
+                    if status in ("completed", "failed"):
+                        return status
+        raise RuntimeError("status stream closed early")
+
+    async def bridge(self, i: int) -> bool:
+        user_evm = Account.create().address
+        user_stellar = Keypair.random().public_key
+        target_chain = "stellar-testnet" if i % 2 else "base-sepolia"
+        data = await self.post(f"{self.urls['bridge']}/bridge/request", {
+            "apikey": "bench",
+            "target_chain": target_chain,
+            "evm_address": user_evm,
+            "stellar_address": user_stellar,
+            "amount": 1,
+        })
+        # Deposits carry the request's tag: its exact tagged amount on EVM, its memo on Stellar
+        if target_chain == "stellar-testnet":
+            await self.post(f"{self.urls['rpc']}/_deposit", {
+                "token": USDC_ADDRESS, "from": user_evm, "to": data["bridge_address"],
+                "value": round(data["amount"] * 10**6),
+            })
+        else:
+            await self.post(f"{self.urls['horizon']}/_payment", {
+                "from": user_stellar, "to": data["bridge_address"], "amount": "1", "memo": data["memo"],
+            })
+        return await self.follow(data["request_id"]) == "completed"
+
+    async def dashboard(self, i: int) -> bool:
+        job = await self.get(f"{self.urls['dashboard']}/bridge", amount=1)
+        while True:
+            await asyncio.sleep(0.25)
+            state = await self.get(f"{self.urls['dashboard']}{job['job_url']}")
+            if state["status"] != "running":
+                return state["status"] == "completed"
+
+    async def withdraw(self, i: int) -> bool:
+        result = await self.get(f"{self.urls['dashboard']}/withdraw", amount=1)
+        return result.get("status") == "funds_received"
+
+    async def business(self, i: int) -> bool:
+        callbacks = f"{self.urls['business']}/callbacks/transactions"
+        tx_id = f"bench-{i}-{os.urandom(4).hex()}"
+        funds = await self.post(callbacks, {
+            "jsonrpc": "2.0", "id": tx_id, "method": "request_onchain_funds", "params": {"transaction_id": tx_id},
+        })
+        await self.post(f"{self.urls['horizon']}/_payment", {
+            "from": Keypair.random().public_key, "to": funds["result"]["destination_account"], "amount": "1",
+            "memo": funds["result"]["memo"],
+        })
+        result = await self.post(callbacks, {
+            "jsonrpc": "2.0", "id": tx_id, "method": "notify_onchain_funds_received",
+            "params": {"transaction_id": tx_id},
+        })
+        return result["result"]["status"] == "funds_received"
+
+
+async def run_scenario(name: str, urls: dict, clients: int, flows: int) -> dict:
+    latencies = []
+    failed = 0
+    queue = asyncio.Queue()
+    for i in range(flows):
+        queue.put_nowait(i)
+
+    async def client(harness: Harness):
+        nonlocal failed
+        flow = getattr(harness, name)
+        while not queue.empty():
+            i = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                ok = await asyncio.wait_for(flow(i), FLOW_TIMEOUT)
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError, KeyError) as e:
+                print(f"⚠️ {name} flow {i} failed: {e!r}")
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failed += 1
+
+    before = {fake: fetch_calls(urls[fake]) for fake in ("rpc", "horizon", "anchor")}
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(FLOW_TIMEOUT)) as http:
+        harness = Harness(http, urls)
+        start = time.perf_counter()
+        await asyncio.gather(*(client(harness) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    calls = {fake: diff_calls(before[fake], fetch_calls(urls[fake])) for fake in before}
+
+    completed = len(latencies)
+    return {
+        "completed": completed,
+        "failed": failed,
+        "elapsed_s": round(elapsed, 2),
+        "completed_per_s": round(completed / elapsed, 2),
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+        "calls_per_completed": {
+            fake: round(sum(counts.values()) / max(completed, 1), 2) for fake, counts in calls.items()
+        },
+        "calls": calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--flows", type=int, default=100, help="flows per scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fake RPC/Horizon/anchor call")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--python", default=None, help="interpreter to run the services with")
+    parser.add_argument("--port", type=int, default=19400)
+    args = parser.parse_args()
+
+    # bridge, dashboard and business server on port..port+2, the fakes on port+3..port+5
+    urls = {
+        name: f"http://127.0.0.1:{args.port + offset}"
+        for offset, name in enumerate(("bridge", "dashboard", "business", "rpc", "horizon", "anchor"))
+    }
+    python = {"python": args.python} if args.python else {}
+    env = {
+        "WEB3_PROVIDER": urls["rpc"],
+        "HORIZON_URL": urls["horizon"],
+        "BRIDGE_URL": urls["bridge"],
+        "ANCHOR_URL": urls["anchor"],
+        "BUSINESS_URL": urls["business"],
+        "BRIDGE_EVM_PRIVATE_KEY": Account.create().key.hex(),
+        "BRIDGE_STELLAR_PRIVATE_KEY": Keypair.random().secret,
+        "BRIDGE_KEY_RATE": "0",  # one API key drives the whole load
+        "BRIDGE_KEY_MAX_OPEN": "0",
+        "THIRD_PARTY_EVM_KEY": Account.create().key.hex(),
+        "THIRD_PARTY_STELLAR_KEY": Keypair.random().secret,
+        "STELLAR_PRIVATE_KEY": Keypair.random().secret,
+        "PYTHONPATH": BACKEND_DIR,
+    }
+    services = {service for scenario in args.scenarios for service in SCENARIOS[scenario]}
+
+    fakes = start_fakes(args.port + 3, args.latency)
+    procs = [fakes]
+    report = {"upstream_latency_ms": args.latency * 1000, "clients": args.clients, "flows": args.flows}
+    try:
+        if "bridge" in services:
+            procs.append(start_service(BRIDGE_APP_DIR, "main", args.port, env,
+                                       cwd=tempfile.mkdtemp(prefix="bridge-e2e-"), **python))
+        if "dashboard" in services:
+            procs.append(start_service(BACKEND_DIR, "app", args.port + 1, env, cwd=BACKEND_DIR, **python))
+        if "business" in services:
+            procs.append(start_service(BUSINESS_APP_DIR, "main", args.port + 2, env,
+                                       cwd=tempfile.mkdtemp(prefix="business-e2e-"), **python))
+        for scenario in args.scenarios:
+            report[scenario] = asyncio.run(run_scenario(scenario, urls, args.clients, args.flows))
+    finally:
+        for proc in reversed(procs):
+            stop(proc)
+    dump(report)
+
+
+if __name__ == "__main__":
+    main()
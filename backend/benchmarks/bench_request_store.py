@@ -0,0 +1,84 @@
+"""
+Sustained write rate of the bridge request journal (x402_ramp.bridge.RequestStore).
+
+`--writers` concurrent coroutines each create requests and walk them through
+deposit_detected -> completed, the writes the bridge server makes per
+request. Runs once with group commits and once committing every write, and
+reports writes per second and per-write latency for both.
+
+    python benchmarks/bench_request_store.py --requests 20000 --writers 200
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import dump, percentile
+from x402_ramp.bridge import RequestStore
+
+
+async def run_writers(store: RequestStore, requests: int, writers: int):
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(secrets.token_hex(32))
+
+    async def timed(write):
+        start = time.perf_counter()
+        await write
+        latencies.append(time.perf_counter() - start)
+
+    async def writer(n: int):
+        evm_address = "0x" + secrets.token_hex(20)
+        stellar_address = "G" + secrets.token_hex(28).upper()[:55]
+        while not queue.empty():
+            request_id = queue.get_nowait()
+            await timed(store.create(request_id, "stellar-testnet", evm_address, stellar_address, 1.0))
+            await timed(store.update(request_id, "deposit_detected", source_tx=secrets.token_hex(32)))
+            await timed(store.update(request_id, "completed", target_tx=secrets.token_hex(32)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(n) for n in range(writers)))
+    return latencies, time.perf_counter() - start
+
+
+def bench(path: str, requests: int, writers: int, max_batch: int) -> dict:
+    store = RequestStore(path, max_batch=max_batch)
+    latencies, elapsed = asyncio.run(run_writers(store, requests, writers))
+    start = time.perf_counter()
+    pending = store.find(status="pending", limit=100)
+    query_ms = (time.perf_counter() - start) * 1000
+    store.close()
+    return {
+        "max_batch": max_batch,
+        "writes": len(latencies),
+        "writes_per_sec": round(len(latencies) / elapsed),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "pending_query_ms": round(query_ms, 2),
+        "pending_rows": len(pending),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="store-bench-")
+    dump({
+        "requests": args.requests,
+        "writers": args.writers,
+        "group_commit": bench(os.path.join(workdir, "grouped.db"), args.requests, args.writers, max_batch=500),
+        "commit_per_write": bench(os.path.join(workdir, "single.db"), args.requests, args.writers, max_batch=1),
+    })
+
+
+if __name__ == "__main__":
+    main()
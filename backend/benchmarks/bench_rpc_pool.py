@@ -0,0 +1,93 @@
+"""
+POST /bridge/request on the bridge server with one EVM RPC provider vs a pool.
+
+Every fake RPC node answers in `--latency` seconds, except a `--slow-fraction`
+share of calls that take `--slow-latency` (a provider's tail). Half the
+requests check the bridge wallet's USDC balance with an `eth_call`, which
+the pool hedges to the second endpoint when the first is slow. The last
+scenario puts a degraded provider (`--degraded-latency` per call) first in
+the list, which the pool should route around. Reports throughput, p50/p99
+latency and where the RPC calls went.
+
+    python benchmarks/bench_rpc_pool.py --clients 100 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from eth_account import Account
+from stellar_sdk import Keypair
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_bridge_request import BRIDGE_APP_DIR, run_clients
+from fakes import diff_calls, dump, fetch_calls, percentile, start_fakes, start_service, stop
+
+
+def run_load(args, rpc_ports: list) -> dict:
+    env = {
+        "WEB3_PROVIDER": ",".join(f"http://127.0.0.1:{port}" for port in rpc_ports),
+        "HORIZON_URL": f"http://127.0.0.1:{args.port + 2}",
+        "BRIDGE_EVM_PRIVATE_KEY": Account.create().key.hex(),
+        "BRIDGE_STELLAR_PRIVATE_KEY": Keypair.random().secret,
+        "BRIDGE_KEY_RATE": "0",  # one API key drives the whole load
+        "BRIDGE_KEY_MAX_OPEN": "0",
+        "PYTHONPATH": BACKEND_DIR,
+    }
+    before = [fetch_calls(f"http://127.0.0.1:{port}") for port in rpc_ports]
+    bridge = start_service(BRIDGE_APP_DIR, "main", args.port, env, cwd=tempfile.mkdtemp(prefix="bridge-rpc-pool-"))
+    try:
+        latencies, errors, elapsed = asyncio.run(run_clients(f"http://127.0.0.1:{args.port}", args.clients, args.requests))
+    finally:
+        stop(bridge)
+    return {
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": errors,
+        "eth_calls_per_provider": [
+            diff_calls(b, fetch_calls(f"http://127.0.0.1:{port}")).get("eth_call", 0) for b, port in zip(before, rpc_ports)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fake RPC/Horizon call")
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.05)
+    parser.add_argument("--degraded-latency", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=19600)
+    args = parser.parse_args()
+
+    # RPC nodes on port + 1, + 4 and + 7; only the first one's Horizon is used
+    first, second, degraded = args.port + 1, args.port + 4, args.port + 7
+    fakes = [
+        start_fakes(first, args.latency, args.slow_latency, args.slow_fraction),
+        start_fakes(second, args.latency, args.slow_latency, args.slow_fraction),
+        start_fakes(degraded, args.degraded_latency),
+    ]
+    report = {
+        "upstream_latency_ms": args.latency * 1000,
+        "slow_calls": f"{args.slow_fraction:.0%} at {args.slow_latency * 1000:.0f} ms",
+        "clients": args.clients,
+        "requests": args.requests,
+    }
+    try:
+        report["single"] = run_load(args, [first])
+        report["pool"] = run_load(args, [first, second])
+        report["degraded_single"] = run_load(args, [degraded])
+        report["degraded_pool"] = run_load(args, [degraded, first])
+    finally:
+        for proc in fakes:
+            stop(proc)
+    dump(report)
+
+
+if __name__ == "__main__":
+    main()
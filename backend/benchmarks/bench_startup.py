@@ -0,0 +1,79 @@
+"""
+Import-to-ready time of the bridge server and the dashboard.
+
+Starts each service under uvicorn against a fake JSON-RPC node and a fake
+Horizon (see fakes.py) that add `--latency` seconds per call, and reports
+how long it takes from spawning the process until uvicorn accepts
+connections (imports plus lifespan startup) and until the first `/health`
+answers. Every service is started `--runs` times.
+
+    python benchmarks/bench_startup.py --latency 0.5 --runs 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+from eth_account import Account
+from stellar_sdk import Keypair
+
+from fakes import dump, percentile, start_fakes, start_service, stop
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = {
+    # name: (app dir, module, cwd)
+    "bridge": (os.path.join(BACKEND_DIR, "apps", "app"), "main", None),
+    "dashboard": (BACKEND_DIR, "app", BACKEND_DIR),
+}
+
+
+def time_startup(name: str, port: int, env: dict, python: str) -> dict:
+    app_dir, module, cwd = SERVICES[name]
+    start = time.perf_counter()
+    proc = start_service(app_dir, module, port, env, cwd=cwd or tempfile.mkdtemp(prefix=f"{name}-startup-"), python=python)
+    try:
+        listening = time.perf_counter() - start
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=60) as response:
+            response.read()
+        healthy = time.perf_counter() - start
+    finally:
+        stop(proc)
+    return {"listening_s": listening, "first_health_s": healthy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds added to every fake RPC/Horizon call")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--services", nargs="+", choices=list(SERVICES), default=list(SERVICES))
+    parser.add_argument("--python", default=sys.executable, help="interpreter to run the services with")
+    parser.add_argument("--port", type=int, default=19300)
+    args = parser.parse_args()
+
+    fakes = start_fakes(args.port + 1, args.latency)
+    env = {
+        "WEB3_PROVIDER": f"http://127.0.0.1:{args.port + 1}",
+        "HORIZON_URL": f"http://127.0.0.1:{args.port + 2}",
+        "BRIDGE_EVM_PRIVATE_KEY": Account.create().key.hex(),
+        "BRIDGE_STELLAR_PRIVATE_KEY": Keypair.random().secret,
+        "THIRD_PARTY_EVM_KEY": Account.create().key.hex(),
+        "THIRD_PARTY_STELLAR_KEY": Keypair.random().secret,
+        "PYTHONPATH": BACKEND_DIR,
+    }
+    report = {"upstream_latency_ms": args.latency * 1000, "runs": args.runs}
+    try:
+        for name in args.services:
+            samples = [time_startup(name, args.port, env, args.python) for _ in range(args.runs)]
+            report[name] = {
+                key: round(percentile([s[key] for s in samples], 50), 2)
+                for key in ("listening_s", "first_health_s")
+            }
+    finally:
+        stop(fakes)
+    dump(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Cost of tracing on the bridge server.
+
+Runs the POST /bridge/request load of bench_bridge_request.py twice, once
+with tracing off and once exporting every span to a JSON-lines file
+(`TRACE_FILE`), and reports throughput, p50/p99 latency and spans written
+per request. Also times `span()` in-process, enabled and disabled.
+
+    python benchmarks/bench_tracing.py --clients 100 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from eth_account import Account
+from stellar_sdk import Keypair
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_bridge_request import BRIDGE_APP_DIR, run_clients
+from fakes import dump, percentile, start_fakes, start_service, stop
+from x402_ramp.tracing import setup_tracing, span
+
+
+def span_cost(iterations: int) -> float:
+    """Microseconds per `with span(...)` in this process."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with span("bench", {"bench.attribute": 1}):
+            pass
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def run_load(args, trace_file: str | None) -> dict:
+    env = {
+        "WEB3_PROVIDER": f"http://127.0.0.1:{args.port + 1}",
+        "HORIZON_URL": f"http://127.0.0.1:{args.port + 2}",
+        "BRIDGE_EVM_PRIVATE_KEY": Account.create().key.hex(),
+        "BRIDGE_STELLAR_PRIVATE_KEY": Keypair.random().secret,
+        "BRIDGE_KEY_RATE": "0",  # one API key drives the whole load
+        "BRIDGE_KEY_MAX_OPEN": "0",
+        "PYTHONPATH": BACKEND_DIR,
+    }
+    if trace_file:
+        env["TRACE_FILE"] = trace_file
+    bridge = start_service(BRIDGE_APP_DIR, "main", args.port, env, cwd=tempfile.mkdtemp(prefix="bridge-tracing-"))
+    try:
+        latencies, errors, elapsed = asyncio.run(run_clients(f"http://127.0.0.1:{args.port}", args.clients, args.requests))
+    finally:
+        stop(bridge)  # flushes the batched spans on shutdown
+    report = {
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": errors,
+    }
+    if trace_file:
+        with open(trace_file) as f:
+            report["spans_per_request"] = round(sum(1 for _ in f) / args.requests, 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fake RPC/Horizon call")
+    parser.add_argument("--port", type=int, default=19500)
+    args = parser.parse_args()
+
+    report = {"upstream_latency_ms": args.latency * 1000, "clients": args.clients, "requests": args.requests}
+    report["span_us_disabled"] = round(span_cost(100_000), 3)
+
+    fakes = start_fakes(args.port + 1, args.latency)
+    try:
+        report["off"] = run_load(args, None)
+        with tempfile.TemporaryDirectory() as tmp:
+            report["file"] = run_load(args, os.path.join(tmp, "spans.jsonl"))
+    finally:
+        stop(fakes)
+
+    os.environ["TRACE_FILE"] = os.devnull
+    provider = setup_tracing("bench")
+    if provider:
+        # Fewer than the export queue holds, so no span is dropped
+        report["span_us_enabled"] = round(span_cost(2_000), 3)
+        provider.shutdown()
+    dump(report)
+
+
+if __name__ == "__main__":
+    main()
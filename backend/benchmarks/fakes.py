@@ -0,0 +1,644 @@
+"""
+Local stand-ins for the remote services the backend talks to.
+
+Each fake is a small aiohttp application. Benchmarks start them in a
+separate process (`python fakes.py ...`) next to the real FastAPI services
+so that neither side competes with the load generator for the GIL. Every
+fake can add a fixed latency per request to mimic a remote provider (the
+RPC node also an occasional slower one, for tail latency), and reports the calls it received at `GET /_calls`.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+
+from aiohttp import web
+from eth_abi import decode
+from eth_account import Account
+from eth_account.typed_transactions import TypedTransaction
+from eth_utils import keccak
+from hexbytes import HexBytes
+from stellar_sdk import IdMemo, Keypair, Network, Payment, TextMemo, TransactionEnvelope
+from stellar_sdk.sep.stellar_web_authentication import build_challenge_transaction
+
+USDC_ISSUER = "GBBD47IF6LWK7P7MDEVSCWR7DPUWV3NY3DTQEVFL4NAT4AQH3ZLLFLA5"
+CHAIN_ID = 84532  # Base Sepolia
+MAX_UINT256 = 2**256 - 1
+APPROVE = "0x095ea7b3"
+DISPERSE = "0x" + keccak(b"disperse(address,bytes32[],address[],uint256[])")[:4].hex()
+PAYOUT_TOPIC = "0x" + keccak(b"Payout(bytes32,address,uint256)").hex()
+TRANSFER = "0xa9059cbb"
+TRANSFER_TOPIC = "0x" + keccak(b"Transfer(address,address,uint256)").hex()
+
+
+def _word(value: int) -> str:
+    return "0x" + value.to_bytes(32, "big").hex()
+
+
+def _topic(address: str) -> str:
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+
+class FakeEvmRpc:
+    """
+    JSON-RPC node serving the calls the bridge makes against Base.
+
+    Signed token transfers sent through `eth_sendRawTransaction`, and deposits
+    injected with `POST /_deposit`, become `Transfer` logs that `eth_getLogs`
+    returns, so the bridge's indexer sees them like on a real chain.
+    `POST /_reorg` replaces the most recent blocks and drops what was mined in them.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        block_time: float = 2.0,
+        token_balance: int = 10**15,
+        slow_latency: float = 0.0,
+        slow_fraction: float = 0.0,
+    ):
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.slow_fraction = slow_fraction
+        self.block_time = block_time
+        self.token_balance = token_balance
+        self.started = time.monotonic()
+        self.calls = Counter()
+        self.nonces = Counter()
+        self.allowance = 0
+        self.receipts = {}
+        self.logs = []
+        self.forks = Counter()  # block number -> times a reorg replaced it
+
+    def block_hash(self, number: int) -> str:
+        fork = self.forks[number]
+        return "0x" + keccak(number.to_bytes(32, "big") + (fork.to_bytes(4, "big") if fork else b"")).hex()
+
+    @property
+    def block_number(self) -> int:
+        return 1_000 + int((time.monotonic() - self.started) / self.block_time)
+
+    def block(self, number: int) -> dict:
+        return {
+            "number": hex(number),
+            "hash": self.block_hash(number),
+            "parentHash": self.block_hash(number - 1),
+            "timestamp": hex(int(time.time())),
+            "baseFeePerGas": hex(10**7),
+            "gasLimit": hex(30_000_000),
+            "gasUsed": hex(15_000_000),
+            "transactions": [],
+        }
+
+    def eth_call(self, params):
+        selector = params[0].get("data", params[0].get("input", ""))[:10]
+        if selector == "0x313ce567":  # decimals()
+            return _word(6)
+        if selector == "0x70a08231":  # balanceOf(address)
+            return _word(self.token_balance)
+        if selector == "0xdd62ed3e":  # allowance(address,address)
+            return _word(self.allowance)
+        return _word(0)
+
+    def transfer_log(self, token: str, sender: str, recipient: str, value: int, tx_hash: str, block_number: int) -> dict:
+        log = {
+            "address": token,
+            "topics": [TRANSFER_TOPIC, _topic(sender), _topic(recipient)],
+            "data": _word(value),
+            "logIndex": "0x0",
+            "transactionIndex": "0x0",
+            "transactionHash": tx_hash,
+            "blockHash": self.block_hash(block_number),
+            "blockNumber": hex(block_number),
+            "removed": False,
+        }
+        self.logs.append(log)
+        return log
+
+    def get_logs(self, params) -> list:
+        query = params[0]
+        from_block, to_block = int(query["fromBlock"], 16), int(query["toBlock"], 16)
+        addresses = query.get("address") or []
+        addresses = {a.lower() for a in ([addresses] if isinstance(addresses, str) else addresses)}
+        topics = query.get("topics") or []
+        matches = []
+        for log in self.logs:
+            if not from_block <= int(log["blockNumber"], 16) <= to_block:
+                continue
+            if addresses and log["address"].lower() not in addresses:
+                continue
+            if all(
+                wanted is None or log["topics"][i].lower() in {w.lower() for w in ([wanted] if isinstance(wanted, str) else wanted)}
+                for i, wanted in enumerate(topics)
+            ):
+                matches.append(log)
+        return matches
+
+    def receipt(self, tx_hash: str, tx: dict, sender: str) -> dict:
+        # Mined in the next block, so a log never lands in a block a scanner already read
+        block_number = self.block_number + 1
+        block_hash = self.block_hash(block_number)
+        data = "0x" + bytes(tx["data"]).hex()
+        logs = []
+        if data.startswith(TRANSFER):
+            recipient, value = decode(["address", "uint256"], bytes.fromhex(data[10:]))
+            logs.append(self.transfer_log("0x" + bytes(tx["to"]).hex(), sender, recipient, value, tx_hash, block_number))
+        elif data.startswith(DISPERSE):
+            _, request_ids, recipients, amounts = decode(
+                ["address", "bytes32[]", "address[]", "uint256[]"], bytes.fromhex(data[10:])
+            )
+            for i, (request_id, recipient, amount) in enumerate(zip(request_ids, recipients, amounts)):
+                logs.append({
+                    "address": "0x" + bytes(tx["to"]).hex(),
+                    "topics": [PAYOUT_TOPIC, "0x" + request_id.hex(), "0x" + recipient[2:].lower().rjust(64, "0")],
+                    "data": _word(amount),
+                    "logIndex": hex(2 * i + 1),  # each Payout follows its token Transfer
+                    "transactionIndex": "0x0",
+                    "transactionHash": tx_hash,
+                    "blockHash": block_hash,
+                    "blockNumber": hex(block_number),
+                    "removed": False,
+                })
+        elif data.startswith(APPROVE):
+            self.allowance = MAX_UINT256
+        return {
+            "transactionHash": tx_hash,
+            "transactionIndex": "0x0",
+            "blockHash": block_hash,
+            "blockNumber": hex(block_number),
+            "from": "0x" + "00" * 20,
+            "to": "0x" + bytes(tx["to"]).hex(),
+            "cumulativeGasUsed": hex(tx["gas"]),
+            "gasUsed": hex(tx["gas"]),
+            "effectiveGasPrice": hex(tx["maxFeePerGas"]),
+            "contractAddress": None,
+            "logs": logs,
+            "logsBloom": "0x" + "00" * 256,
+            "status": "0x1",
+            "type": "0x2",
+        }
+
+    def send_raw_transaction(self, raw: str) -> str:
+        tx_hash = "0x" + keccak(bytes.fromhex(raw[2:])).hex()
+        tx = TypedTransaction.from_bytes(HexBytes(raw)).as_dict()
+        sender = Account.recover_transaction(raw)
+        self.nonces[sender.lower()] = max(self.nonces[sender.lower()], tx["nonce"] + 1)
+        self.receipts[tx_hash] = self.receipt(tx_hash, tx, sender)
+        return tx_hash
+
+    def dispatch(self, method: str, params):
+        if method == "eth_chainId":
+            return hex(CHAIN_ID)
+        if method == "net_version":
+            return str(CHAIN_ID)
+        if method == "eth_blockNumber":
+            return hex(self.block_number)
+        if method == "eth_getBlockByNumber":
+            tag = params[0]
+            number = self.block_number if tag in ("latest", "pending", "safe", "finalized") else int(tag, 16)
+            return self.block(number)
+        if method == "eth_call":
+            return self.eth_call(params)
+        if method == "eth_getLogs":
+            return self.get_logs(params)
+        if method == "eth_getTransactionCount":
+            return hex(self.nonces[params[0].lower()])
+        if method == "eth_estimateGas":
+            return hex(45_000)
+        if method == "eth_gasPrice":
+            return hex(2 * 10**7)
+        if method == "eth_maxPriorityFeePerGas":
+            return hex(10**6)
+        if method == "eth_feeHistory":
+            return {
+                "oldestBlock": hex(self.block_number - 4),
+                "baseFeePerGas": [hex(10**7)] * 6,
+                "gasUsedRatio": [0.5] * 5,
+                "reward": [[hex(10**6)]] * 5,
+            }
+        if method == "eth_sendRawTransaction":
+            return self.send_raw_transaction(params[0])
+        if method == "eth_getTransactionReceipt":
+            return self.receipts.get(params[0])
+        raise KeyError(method)
+
+    async def get_calls(self, request: web.Request) -> web.Response:
+        return web.json_response(self.calls)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if self.slow_fraction and random.random() < self.slow_fraction:
+            await asyncio.sleep(self.slow_latency)
+        elif self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls[body["method"]] += 1
+        try:
+            result = self.dispatch(body["method"], body.get("params", []))
+        except KeyError:
+            return web.json_response({"jsonrpc": "2.0", "id": body["id"],
+                                      "error": {"code": -32601, "message": "method not found"}})
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": result})
+
+    async def post_deposit(self, request: web.Request) -> web.Response:
+        """Test hook: a user's token transfer to `to`, mined in the next block."""
+        body = await request.json()
+        tx_hash = "0x" + uuid.uuid4().hex * 2
+        self.transfer_log(body["token"], body["from"], body["to"], int(body["value"]), tx_hash, self.block_number + 1)
+        return web.json_response({"hash": tx_hash})
+
+    async def post_reorg(self, request: web.Request) -> web.Response:
+        """Test hook: replace the last `depth` blocks, dropping the logs and receipts mined in them."""
+        body = await request.json()
+        head = self.block_number
+        fork = head - int(body["depth"]) + 1
+        for number in range(fork, head + 2):  # the next block too, where deposits are mined
+            self.forks[number] += 1
+        dropped = {log["transactionHash"] for log in self.logs if int(log["blockNumber"], 16) >= fork}
+        self.logs = [log for log in self.logs if log["transactionHash"] not in dropped]
+        for tx_hash in dropped:
+            self.receipts.pop(tx_hash, None)
+        return web.json_response({"fork": fork, "dropped": sorted(dropped)})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        app.router.add_post("/_deposit", self.post_deposit)
+        app.router.add_post("/_reorg", self.post_reorg)
+        app.router.add_get("/_calls", self.get_calls)
+        return app
+
+
+def _token_key(paging_token: str) -> tuple:
+    return tuple(int(part) for part in paging_token.split("-"))
+
+
+def _memo(memo) -> dict:
+    # As Horizon renders a transaction's memo
+    if isinstance(memo, IdMemo):
+        return {"memo_type": "id", "memo": str(memo.memo_id)}
+    if isinstance(memo, TextMemo):
+        return {"memo_type": "text", "memo": memo.memo_text.decode()}
+    return {"memo_type": "none"}
+
+
+class FakeHorizon:
+    """
+    Horizon serving accounts, transaction submission and payments/effects streams.
+
+    Every payment operation submitted to `POST /transactions`, and every user
+    payment injected with `POST /_payment`, becomes a payment record plus
+    `account_credited` / `account_debited` effects. Payment records embed
+    their transaction's memo, as with `join=transactions`. They are served from the
+    paged endpoints and pushed to open SSE streams, resuming after `cursor`
+    like Horizon does. Each transaction closes its own ledger.
+    """
+
+    def __init__(self, latency: float = 0.0, usdc_balance: str = "1000000.0000000"):
+        self.latency = latency
+        self.usdc_balance = usdc_balance
+        self.calls = Counter()
+        self.sequences = Counter()
+        self.ledger = 2_000  # accounts were last modified in ledger 1000
+        # (kind, account) -> records in paging order, and the queues of its open streams
+        self.records = defaultdict(list)
+        self.streams = defaultdict(set)
+
+    def account(self, account_id: str) -> dict:
+        return {
+            "id": account_id,
+            "account_id": account_id,
+            "sequence": str(self.sequences[account_id] + 1_000_000),
+            "last_modified_ledger": 1000,
+            "balances": [
+                {"asset_type": "credit_alphanum4", "asset_code": "USDC",
+                 "asset_issuer": USDC_ISSUER, "balance": self.usdc_balance},
+                {"asset_type": "native", "balance": "10000.0000000"},
+            ],
+            "data": {},
+        }
+
+    def publish(self, kind: str, account_id: str, record: dict):
+        self.records[(kind, account_id)].append(record)
+        for queue in self.streams[(kind, account_id)]:
+            queue.put_nowait(record)
+
+    def record_payment(
+        self, op_id: int, tx_hash: str, sender: str, recipient: str, asset: dict, amount: str, memo: dict
+    ):
+        amount = f"{float(amount):.7f}"
+        self.publish("payments", recipient, {
+            "id": str(op_id),
+            "paging_token": str(op_id),
+            "type": "payment",
+            "transaction_successful": True,
+            "source_account": sender,
+            "from": sender,
+            "to": recipient,
+            "amount": amount,
+            "transaction_hash": tx_hash,
+            "transaction": {"hash": tx_hash, **memo},
+            **asset,
+        })
+        for index, (kind, account_id) in enumerate((("credited", recipient), ("debited", sender)), start=1):
+            self.publish("effects", account_id, {
+                "id": f"{op_id:019d}-{index:010d}",
+                "paging_token": f"{op_id}-{index}",
+                "type": f"account_{kind}",
+                "account": account_id,
+                "amount": amount,
+                **asset,
+            })
+
+    def close_ledger(self) -> int:
+        self.ledger += 1
+        return self.ledger << 32
+
+    async def get_calls(self, request: web.Request) -> web.Response:
+        return web.json_response(self.calls)
+
+    async def get_account(self, request: web.Request) -> web.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls["accounts"] += 1
+        return web.json_response(self.account(request.match_info["account_id"]))
+
+    async def post_transaction(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls["transactions"] += 1
+        envelope = TransactionEnvelope.from_xdr(form["tx"], Network.TESTNET_NETWORK_PASSPHRASE)
+        tx = envelope.transaction
+        self.sequences[tx.source.account_id] += 1
+        tx_hash = envelope.hash_hex()
+        memo = _memo(tx.memo)
+        ledger_start = self.close_ledger()
+        for index, op in enumerate(tx.operations, start=1):
+            if isinstance(op, Payment):
+                sender = (op.source or tx.source).account_id
+                asset = {"asset_type": op.asset.type}
+                if not op.asset.is_native():
+                    asset.update(asset_code=op.asset.code, asset_issuer=op.asset.issuer)
+                self.record_payment(
+                    ledger_start + index, tx_hash, sender, op.destination.account_id, asset, op.amount, memo
+                )
+        return web.json_response({"hash": tx_hash, "successful": True, "envelope_xdr": form["tx"],
+                                  "ledger": self.ledger})
+
+    async def post_payment(self, request: web.Request) -> web.Response:
+        """Test hook: a user's USDC payment from `from` to `to` with an optional memo id, closed in its own ledger."""
+        body = await request.json()
+        tx_hash = uuid.uuid4().hex * 2
+        asset = {"asset_type": "credit_alphanum4", "asset_code": "USDC", "asset_issuer": USDC_ISSUER}
+        memo = {"memo_type": "id", "memo": str(body["memo"])} if body.get("memo") else {"memo_type": "none"}
+        self.record_payment(self.close_ledger() + 1, tx_hash, body["from"], body["to"], asset, body["amount"], memo)
+        return web.json_response({"hash": tx_hash})
+
+    def after(self, records: list, cursor: str | None, desc: bool = False) -> list:
+        if desc:
+            records = records[::-1]
+        if cursor in (None, "", "now"):
+            return [] if cursor == "now" else records
+        key = _token_key(cursor)
+        return [r for r in records if (_token_key(r["paging_token"]) < key if desc else _token_key(r["paging_token"]) > key)]
+
+    async def stream_records(self, request: web.Request) -> web.StreamResponse:
+        kind = request.path.rsplit("/", 1)[-1]
+        account_id = request.match_info["account_id"]
+        cursor = request.query.get("cursor")
+        if "text/event-stream" not in request.headers.get("Accept", ""):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            self.calls[f"{kind}_page"] += 1
+            desc = request.query.get("order") == "desc"
+            limit = int(request.query.get("limit", 10))
+            records = self.after(self.records[(kind, account_id)], cursor, desc)[:limit]
+            return web.json_response({"_embedded": {"records": records}})
+        self.calls[f"{kind}_stream"] += 1
+        # Backlog and subscription are taken together, so no record is missed or sent twice
+        queue = asyncio.Queue()
+        for record in self.after(self.records[(kind, account_id)], cursor or "now"):
+            queue.put_nowait(record)
+        self.streams[(kind, account_id)].add(queue)
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        try:
+            await response.prepare(request)
+            await response.write(b'retry: 1000\nevent: open\ndata: "hello"\n\n')
+            while True:
+                try:
+                    record = await asyncio.wait_for(queue.get(), 15)
+                except asyncio.TimeoutError:
+                    await response.write(b": keep-alive\n\n")
+                    continue
+                await response.write(f"id: {record['paging_token']}\ndata: {json.dumps(record)}\n\n".encode())
+        except (asyncio.CancelledError, ConnectionResetError):
+            pass
+        finally:
+            self.streams[(kind, account_id)].discard(queue)
+        return response
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/accounts/{account_id}", self.get_account)
+        app.router.add_get("/accounts/{account_id}/payments", self.stream_records)
+        app.router.add_get("/accounts/{account_id}/effects", self.stream_records)
+        app.router.add_post("/transactions", self.post_transaction)
+        app.router.add_post("/_payment", self.post_payment)
+        app.router.add_get("/_calls", self.get_calls)
+        return app
+
+
+class FakeAnchor:
+    """
+    SEP-1/10/6 anchor: stellar.toml, challenge/token auth and withdrawals.
+
+    The stellar.toml carries an ETag and answers 304 to a matching
+    `If-None-Match`. Challenges are real SEP-10 transactions signed by the
+    anchor's key; any signed challenge is exchanged for a JWT that expires
+    after `token_ttl` seconds. Withdrawals only check for a bearer token.
+    """
+
+    def __init__(self, latency: float = 0.0, token_ttl: int = 3600):
+        self.latency = latency
+        self.token_ttl = token_ttl
+        self.signing_key = Keypair.random()
+        self.calls = Counter()
+
+    def stellar_toml(self, host: str) -> str:
+        return (
+            f'NETWORK_PASSPHRASE = "{Network.TESTNET_NETWORK_PASSPHRASE}"\n'
+            f'SIGNING_KEY = "{self.signing_key.public_key}"\n'
+            f'WEB_AUTH_ENDPOINT = "http://{host}/auth"\n'
+            f'TRANSFER_SERVER = "http://{host}/sep6"\n'
+            "[DOCUMENTATION]\n"
+            'ORG_NAME = "Fake Anchor"\n'
+        )
+
+    def jwt(self, account: str) -> str:
+        def segment(value: dict) -> str:
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+
+        now = int(time.time())
+        claims = {"iss": "fake-anchor", "sub": account, "iat": now, "exp": now + self.token_ttl}
+        return f"{segment({'alg': 'none', 'typ': 'JWT'})}.{segment(claims)}.signature"
+
+    async def delay(self, name: str):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls[name] += 1
+
+    async def get_calls(self, request: web.Request) -> web.Response:
+        return web.json_response(self.calls)
+
+    async def get_toml(self, request: web.Request) -> web.Response:
+        await self.delay("stellar_toml")
+        body = self.stellar_toml(request.host)
+        etag = '"' + keccak(body.encode()).hex()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="text/plain", headers={"ETag": etag})
+
+    async def get_challenge(self, request: web.Request) -> web.Response:
+        await self.delay("auth_challenge")
+        challenge = build_challenge_transaction(
+            self.signing_key.secret,
+            request.query["account"],
+            request.host.split(":")[0],
+            request.host,
+            Network.TESTNET_NETWORK_PASSPHRASE,
+        )
+        return web.json_response({"transaction": challenge, "network_passphrase": Network.TESTNET_NETWORK_PASSPHRASE})
+
+    async def post_token(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.delay("auth_token")
+        envelope = TransactionEnvelope.from_xdr(body["transaction"], Network.TESTNET_NETWORK_PASSPHRASE)
+        client_op = envelope.transaction.operations[0]
+        return web.json_response({"token": self.jwt(client_op.source.account_id)})
+
+    async def get_withdraw(self, request: web.Request) -> web.Response:
+        await self.delay("sep6_withdraw")
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return web.json_response({"error": "authentication required"}, status=403)
+        return web.json_response({
+            "id": str(uuid.uuid4()),
+            "account_id": self.signing_key.public_key,
+            "min_amount": 0.1,
+            "max_amount": 10000,
+        })
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/.well-known/stellar.toml", self.get_toml)
+        app.router.add_get("/auth", self.get_challenge)
+        app.router.add_post("/auth", self.post_token)
+        app.router.add_get("/sep6/withdraw", self.get_withdraw)
+        app.router.add_get("/_calls", self.get_calls)
+        return app
+
+
+def port_open(port: int) -> bool:
+    with socket.socket() as sock:
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+def ensure_free(*ports: int):
+    for port in ports:
+        if port_open(port):
+            raise RuntimeError(f"port {port} is already in use")
+
+
+def wait_for_port(port: int, timeout: float = 30, proc: subprocess.Popen | None = None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if port_open(port):
+            return
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"process for port {port} exited with {proc.returncode}")
+        time.sleep(0.1)
+    raise TimeoutError(f"nothing listening on port {port}")
+
+
+def start_fakes(port: int, latency: float, slow_latency: float = 0.0, slow_fraction: float = 0.0) -> subprocess.Popen:
+    """Run the fake RPC node on `port`, the fake Horizon on `port + 1` and the fake anchor on `port + 2`."""
+    ensure_free(port, port + 1, port + 2)
+    proc = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), "--port", str(port), "--latency", str(latency),
+        "--slow-latency", str(slow_latency), "--slow-fraction", str(slow_fraction),
+    ])
+    for offset in range(3):
+        wait_for_port(port + offset, proc=proc)
+    return proc
+
+
+def start_service(
+    app_dir: str, module: str, port: int, env: dict, cwd: str, python: str = sys.executable
+) -> subprocess.Popen:
+    """Run one of the FastAPI services under uvicorn, as the Dockerfiles do."""
+    ensure_free(port)
+    proc = subprocess.Popen(
+        [python, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port),
+         "--app-dir", app_dir, "--log-level", "warning", "--timeout-keep-alive", "30"],
+        env={**os.environ, **env},
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+    )
+    wait_for_port(port, timeout=120, proc=proc)
+    return proc
+
+
+def stop(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def fetch_calls(base_url: str) -> dict:
+    with urllib.request.urlopen(f"{base_url}/_calls") as response:
+        return json.load(response)
+
+
+def diff_calls(before: dict, after: dict) -> dict:
+    return {name: count - before.get(name, 0) for name, count in after.items() if count != before.get(name, 0)}
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def dump(report: dict):
+    print(json.dumps(report, indent=2))
+
+
+async def serve(port: int, latency: float, slow_latency: float, slow_fraction: float):
+    rpc = FakeEvmRpc(latency=latency, slow_latency=slow_latency, slow_fraction=slow_fraction)
+    for offset, fake in enumerate((rpc, FakeHorizon(latency=latency), FakeAnchor(latency=latency))):
+        runner = web.AppRunner(fake.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port + offset).start()
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the fake RPC node, Horizon and anchor.")
+    parser.add_argument("--port", type=int, default=19001, help="RPC port; Horizon listens on port + 1, the anchor on port + 2")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="latency of the RPC node's slow calls")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="share of RPC calls that are slow")
+    args = parser.parse_args()
+    asyncio.run(serve(args.port, args.latency, args.slow_latency, args.slow_fraction))
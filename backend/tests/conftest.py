@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# test1.py ... test10.py are manual scripts against testnet, not pytest tests
+collect_ignore_glob = ["test[0-9]*.py"]
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import pytest
+
+from x402_ramp.bridge import AdmissionController, MemoryAdmissionStore, Throttled, api_key_id
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_rate():
+    async def run():
+        store = MemoryAdmissionStore()
+        assert [await store.take("k", 1, 2, 100.0) for _ in range(2)] == [0, 0]
+        assert await store.take("k", 1, 2, 100.0) == pytest.approx(1)
+        assert await store.take("k", 1, 2, 100.5) == pytest.approx(0.5)
+        assert await store.take("k", 1, 2, 101.0) == 0
+        # Other keys have their own bucket
+        assert await store.take("other", 1, 2, 101.0) == 0
+
+    asyncio.run(run())
+
+
+def test_slots_are_capped_freed_on_close_and_expire():
+    async def run():
+        store = MemoryAdmissionStore()
+        assert await store.open("k", "r1", 2, 10, 100.0) == 0
+        assert await store.open("k", "r2", 2, 10, 105.0) == 0
+        assert await store.open("k", "r3", 2, 10, 106.0) == pytest.approx(4)
+        await store.close("r1")
+        assert await store.open("k", "r3", 2, 10, 106.0) == 0
+        # r2 expires at 115
+        assert await store.open("k", "r4", 2, 10, 115.0) == 0
+        await store.close("unknown")
+
+    asyncio.run(run())
+
+
+def test_sweep_drops_full_buckets_and_expired_slots():
+    async def run():
+        store = MemoryAdmissionStore(sweep_interval=60)
+        for i in range(1000):
+            await store.take(f"key-{i}", 1, 20, 100.0)
+            await store.open(f"key-{i}", f"r{i}", 5, 30, 100.0)
+        await store.open("busy", "held", 5, 3600, 100.0)
+        # The sweep runs at 195; a bucket drawn from after that is still refilling
+        await store.take("busy", 1, 20, 195.0)
+        await store.take("late", 1, 20, 200.0)
+        assert set(store._buckets) == {"busy", "late"}
+        assert set(store._open) == {"busy"}
+        assert set(store._owners) == {"held"}
+
+    asyncio.run(run())
+
+
+def test_rate_limit_raises_throttled_with_retry_after():
+    async def run():
+        admission = AdmissionController(rate=0.001, burst=2, max_open=0)
+        await admission.admit("k", "r1")
+        await admission.admit("k", "r2")
+        with pytest.raises(Throttled) as refused:
+            await admission.admit("k", "r3")
+        assert refused.value.retry_after > 0
+        await admission.admit("other", "r4")
+
+    asyncio.run(run())
+
+
+def test_terminal_status_frees_the_slot():
+    async def run():
+        admission = AdmissionController(rate=0, max_open=1)
+        await admission.admit("k", "r1")
+        with pytest.raises(Throttled):
+            await admission.admit("k", "r2")
+        admission("r1", {"status": "paying"})
+        await asyncio.sleep(0)
+        with pytest.raises(Throttled):
+            await admission.admit("k", "r2")
+        admission("r1", {"status": "completed"})
+        assert len(admission._releasing) == 1
+        await asyncio.gather(*admission._releasing)
+        await asyncio.sleep(0)
+        assert not admission._releasing
+        await admission.admit("k", "r2")
+
+    asyncio.run(run())
+
+
+def test_seed_holds_slots_for_resumed_requests():
+    async def run():
+        admission = AdmissionController(rate=0, max_open=2, open_ttl=3600)
+        now = time.time()
+        key = api_key_id("k")
+        rows = [
+            {"id": f"r{i}", "api_key_id": key, "created_at": now - 10} for i in range(3)
+        ] + [
+            {"id": "old", "api_key_id": key, "created_at": now - 7200},  # its slot would have expired
+            {"id": "legacy", "api_key_id": None, "created_at": now},  # journaled before key ids
+        ]
+        await admission.seed(rows)
+        # All three are held, even past max_open
+        assert set(admission.store._owners) == {"r0", "r1", "r2"}
+        with pytest.raises(Throttled):
+            await admission.admit("k", "new")
+        for request_id in ("r0", "r1"):
+            admission(request_id, {"status": "failed"})
+        await asyncio.sleep(0)
+        await admission.admit("k", "new")
+
+    asyncio.run(run())
+
+
+def test_api_key_is_not_kept_in_the_store():
+    async def run():
+        admission = AdmissionController(rate=1, max_open=1)
+        await admission.admit("secret-key", "r1")
+        assert "secret-key" not in admission.store._buckets
+        assert api_key_id("secret-key") in admission.store._open
+
+    asyncio.run(run())
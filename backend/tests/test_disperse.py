@@ -0,0 +1,218 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+
+from x402_ramp.bridge import DisperseBatcher, PayoutError, PayoutPending
+from x402_ramp.bridge.disperse import request_id_bytes
+from x402_ramp.nonce import NonceManager
+
+GAS_PER_PAYOUT = 50_000
+BAD_RECIPIENT = Web3.to_checksum_address("0x" + "ba" * 20)
+
+
+class FakeCall:
+    def __init__(self, chain, args):
+        self.chain = chain
+        self.args = args
+
+    async def estimate_gas(self, tx):
+        self.chain.estimates.append(len(self.args[1]))
+        if BAD_RECIPIENT in self.args[2]:
+            raise ValueError("execution reverted: transfer failed")
+        return GAS_PER_PAYOUT * len(self.args[1])
+
+
+class FakeChain:
+    """Just enough of EvmChain, the disperse contract and the node for DisperseBatcher."""
+
+    def __init__(self):
+        self.estimates = []  # batch size of every estimate
+        self.sent = {}  # tx hash -> (nonce, disperse args)
+        self.receipt_status = 1
+        self.receipt_error = None
+        self.send_error = None
+        self._hashes = (HexBytes(i.to_bytes(32, "big")) for i in itertools.count(1))
+        self.token = SimpleNamespace(address="0xtoken")
+        self.w3 = SimpleNamespace(eth=self)
+        self.address = "0xdisperse"
+        self.functions = SimpleNamespace(disperse=lambda *args: FakeCall(self, args))
+        self.events = SimpleNamespace(Payout=lambda: SimpleNamespace(process_receipt=self._payout_logs))
+
+    async def decimals(self):
+        return 6
+
+    async def chain_id(self):
+        return 84532
+
+    async def get_transaction_count(self, address, block_identifier):
+        return 0
+
+    def encode_abi(self, fn_name, args):
+        return args
+
+    async def send_raw_transaction(self, tx):
+        if self.send_error:
+            raise self.send_error
+        tx_hash = next(self._hashes)
+        self.sent[tx_hash] = (tx["nonce"], tx["data"])
+        return tx_hash
+
+    async def wait_for_transaction_receipt(self, tx_hash, timeout):
+        if self.receipt_error:
+            raise self.receipt_error
+        return {"transactionHash": tx_hash, "status": self.receipt_status}
+
+    def _payout_logs(self, receipt, errors):
+        _, args = self.sent[receipt["transactionHash"]]
+        return [{"args": {"requestId": rid}, "logIndex": i} for i, rid in enumerate(args[1])]
+
+
+async def fees():
+    return {"max_fee_per_gas": 2, "max_priority_fee": 1}
+
+
+def batcher(chain: FakeChain, **kwargs) -> DisperseBatcher:
+    account = SimpleNamespace(address="0xbridge", sign_transaction=lambda tx: SimpleNamespace(raw_transaction=tx))
+    return DisperseBatcher(
+        chain, chain, account, NonceManager(chain.w3, account.address), SimpleNamespace(fees=fees),
+        window=0.01, gas_buffer=1, **kwargs,
+    )
+
+
+def recipient(i: int) -> str:
+    return Web3.to_checksum_address(f"0x{i + 1:040x}")
+
+
+async def pay_all(disperse: DisperseBatcher, payouts: list, on_submitted=None) -> list:
+    runner = asyncio.create_task(disperse.run())
+    try:
+        return await asyncio.gather(
+            *(disperse.pay(f"{i:064x}", to, amount, on_submitted=on_submitted) for i, (to, amount) in enumerate(payouts)),
+            return_exceptions=True,
+        )
+    finally:
+        runner.cancel()
+
+
+def test_pays_a_batch_in_one_transaction():
+    async def run():
+        chain = FakeChain()
+        submitted = []
+
+        async def on_submitted(tx_hash):
+            submitted.append(tx_hash)
+
+        results = await pay_all(batcher(chain), [(recipient(i), 2.01) for i in range(3)], on_submitted)
+        assert len(chain.sent) == 1
+        (tx_hash, (nonce, args)), = chain.sent.items()
+        assert nonce == 0
+        assert args[3] == [2_010_000] * 3  # rounded, not truncated
+        assert results == [(tx_hash.hex(), i) for i in range(3)]
+        assert submitted == [tx_hash.hex()] * 3
+
+    asyncio.run(run())
+
+
+def test_batches_are_capped_by_gas():
+    async def run():
+        chain = FakeChain()
+        disperse = batcher(chain, max_gas=2 * GAS_PER_PAYOUT)
+        disperse.per_payout_gas = GAS_PER_PAYOUT
+        results = await pay_all(disperse, [(recipient(i), 1) for i in range(5)])
+        assert sorted(len(args[1]) for _, args in chain.sent.values()) == [1, 2, 2]
+        assert [nonce for nonce, _ in chain.sent.values()] == [0, 1, 2]
+        assert all(isinstance(r, tuple) for r in results)
+
+    asyncio.run(run())
+
+
+def test_batch_over_the_gas_cap_is_split():
+    async def run():
+        chain = FakeChain()
+        # The learned per-payout cost is too low, so the first estimate comes out over the cap
+        disperse = batcher(chain, max_gas=2 * GAS_PER_PAYOUT)
+        disperse.per_payout_gas = 1
+        results = await pay_all(disperse, [(recipient(i), 1) for i in range(4)])
+        assert chain.estimates[0] == 4
+        assert sorted(len(args[1]) for _, args in chain.sent.values()) == [2, 2]
+        assert all(isinstance(r, tuple) for r in results)
+
+    asyncio.run(run())
+
+
+def test_failing_payout_is_isolated_and_the_rest_paid():
+    async def run():
+        chain = FakeChain()
+        payouts = [(recipient(i), 1) for i in range(4)]
+        payouts[2] = (BAD_RECIPIENT, 1)
+        results = await pay_all(batcher(chain), payouts)
+        assert isinstance(results[2], PayoutError)
+        assert all(isinstance(results[i], tuple) for i in (0, 1, 3))
+        paid = [rid for _, args in chain.sent.values() for rid in args[1]]
+        assert request_id_bytes(f"{2:064x}") not in paid
+        assert len(paid) == 3
+
+    asyncio.run(run())
+
+
+def test_failed_broadcast_fails_the_batch_and_frees_its_nonce():
+    async def run():
+        chain = FakeChain()
+        chain.send_error = ConnectionError("node unreachable")
+        disperse = batcher(chain)
+        results = await pay_all(disperse, [(recipient(i), 1) for i in range(2)])
+        assert all(isinstance(r, ConnectionError) for r in results)
+        assert disperse.nonces.in_flight == 0
+        chain.send_error = None
+        await pay_all(disperse, [(recipient(0), 1)])
+        (nonce, _), = chain.sent.values()
+        assert nonce == 0
+
+    asyncio.run(run())
+
+
+def test_reverted_batch_fails_every_payout():
+    async def run():
+        chain = FakeChain()
+        chain.receipt_status = 0
+        results = await pay_all(batcher(chain), [(recipient(i), 1) for i in range(2)])
+        assert all(isinstance(r, PayoutError) and "reverted" in str(r) for r in results)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("error", [TimeExhausted("not mined"), ConnectionError("node unreachable")])
+def test_unconfirmed_batch_leaves_the_outcome_unknown(error):
+    async def run():
+        chain = FakeChain()
+        chain.receipt_error = error
+        submitted = []
+
+        async def on_submitted(tx_hash):
+            submitted.append(tx_hash)
+
+        results = await pay_all(batcher(chain), [(recipient(i), 1) for i in range(2)], on_submitted)
+        assert all(isinstance(r, PayoutPending) for r in results)
+        assert not any(isinstance(r, PayoutError) for r in results)
+        assert len(submitted) == 2
+
+    asyncio.run(run())
+
+
+def test_error_recording_the_broadcast_leaves_the_outcome_unknown():
+    async def run():
+        chain = FakeChain()
+
+        async def on_submitted(tx_hash):
+            raise OSError("journal unavailable")
+
+        results = await pay_all(batcher(chain), [(recipient(0), 1)], on_submitted)
+        assert isinstance(results[0], PayoutPending)
+        assert len(chain.sent) == 1
+
+    asyncio.run(run())
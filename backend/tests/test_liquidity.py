@@ -0,0 +1,48 @@
+from x402_ramp.bridge import LiquidityLedger
+
+CHAIN = "stellar-testnet"
+
+
+def ledger(balance=10, ttl: float = 3600) -> LiquidityLedger:
+    liquidity = LiquidityLedger(ttl=ttl)
+    liquidity.set_balance(CHAIN, balance, as_of=100)
+    return liquidity
+
+
+def test_reservations_cannot_promise_the_same_funds_twice():
+    liquidity = ledger(10)
+    assert liquidity.reserve("r1", CHAIN, 6)
+    assert not liquidity.reserve("r2", CHAIN, 6)
+    assert liquidity.available(CHAIN) == 4
+    assert not liquidity.reserve("r3", "base-sepolia", 1)  # balance never loaded
+
+
+def test_completed_payout_debits_and_failed_payout_releases():
+    liquidity = ledger(10)
+    liquidity.reserve("r1", CHAIN, 3)
+    liquidity.reserve("r2", CHAIN, 4)
+    liquidity("r1", {"status": "completed"})
+    liquidity("r2", {"status": "failed"})
+    assert liquidity.balance(CHAIN) == 7
+    assert liquidity.available(CHAIN) == 7
+
+
+def test_credits_only_after_the_loaded_balance():
+    liquidity = ledger(10)
+    liquidity.credit(CHAIN, 5, 100)  # already in the loaded balance
+    liquidity.credit(CHAIN, 5, 101)
+    assert liquidity.balance(CHAIN) == 15
+
+
+def test_unfunded_reservation_expires_and_is_taken_back_on_deposit():
+    liquidity = ledger(10, ttl=0)
+    liquidity.reserve("r1", CHAIN, 10)
+    assert liquidity.available(CHAIN) == 10
+    liquidity("r1", {"status": "deposit_detected"})
+    assert liquidity.available(CHAIN) == 0
+
+
+def test_funded_reservation_does_not_expire():
+    liquidity = ledger(10, ttl=0)
+    liquidity.seed([{"id": "r1", "status": "deposit_detected", "target_chain": CHAIN, "amount": 4.0}])
+    assert liquidity.available(CHAIN) == 6
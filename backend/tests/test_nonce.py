@@ -0,0 +1,129 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from x402_ramp.nonce import NonceManager, is_nonce_error
+
+
+class FakeEth:
+    def __init__(self, pending: int):
+        self.pending = pending
+        self.reads = 0
+
+    async def get_transaction_count(self, address, block_identifier):
+        assert block_identifier == "pending"
+        self.reads += 1
+        return self.pending
+
+
+def manager(pending: int = 7) -> NonceManager:
+    return NonceManager(SimpleNamespace(eth=FakeEth(pending)), "0xbridge")
+
+
+def test_hands_out_consecutive_nonces_from_the_pending_count():
+    async def run():
+        nonces = manager(7)
+        assert [await nonces.reserve() for _ in range(3)] == [7, 8, 9]
+        assert nonces.w3.eth.reads == 1
+        assert nonces.in_flight == 3
+
+    asyncio.run(run())
+
+
+def test_released_nonce_is_reused_first():
+    async def run():
+        nonces = manager(0)
+        for _ in range(4):
+            await nonces.reserve()
+        nonces.release(1)
+        assert await nonces.reserve() == 1
+        assert await nonces.reserve() == 4
+
+    asyncio.run(run())
+
+
+def test_releasing_the_newest_nonces_rewinds_the_counter():
+    async def run():
+        nonces = manager(0)
+        for _ in range(3):
+            await nonces.reserve()
+        nonces.release(1)
+        nonces.release(2)
+        # No gap is left: 1 and 2 come back in order, then the counter carries on
+        assert [await nonces.reserve() for _ in range(3)] == [1, 2, 3]
+
+    asyncio.run(run())
+
+
+def test_release_of_an_unknown_nonce_is_ignored():
+    async def run():
+        nonces = manager(0)
+        nonce = await nonces.reserve()
+        nonces.confirm(nonce)
+        nonces.release(nonce)
+        assert await nonces.reserve() == 1
+
+    asyncio.run(run())
+
+
+def test_allocate_confirms_on_success_and_releases_on_a_failed_send():
+    async def run():
+        nonces = manager(3)
+        async with nonces.allocate() as nonce:
+            assert nonce == 3
+        with pytest.raises(ConnectionError):
+            async with nonces.allocate() as nonce:
+                assert nonce == 4
+                raise ConnectionError("node unreachable")
+        assert nonces.in_flight == 0
+        assert await nonces.reserve() == 4
+
+    asyncio.run(run())
+
+
+def test_nonce_error_invalidates_and_resyncs_on_next_reserve():
+    async def run():
+        nonces = manager(0)
+        await nonces.reserve()
+        with pytest.raises(ValueError):
+            async with nonces.allocate():
+                raise ValueError("nonce too low")
+        # Another sender moved the account on; the next nonce comes from the chain again
+        nonces.w3.eth.pending = 12
+        assert await nonces.reserve() == 12
+        assert nonces.w3.eth.reads == 2
+
+    asyncio.run(run())
+
+
+def test_resync_keeps_nonces_still_in_flight():
+    async def run():
+        nonces = manager(0)
+        first = await nonces.reserve()
+        second = await nonces.reserve()
+        nonces.release(first)
+        nonces.invalidate(second)
+        nonces.w3.eth.pending = 1
+        # 0 was already mined (pending count is 1), so it is not handed out again
+        assert await nonces.reserve() == 1
+
+    asyncio.run(run())
+
+
+def test_idle_manager_resyncs_after_the_interval():
+    async def run():
+        nonces = manager(5)
+        nonces.resync_interval = 0
+        async with nonces.allocate():
+            pass
+        nonces.w3.eth.pending = 9
+        assert await nonces.reserve() == 9
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("message", ["nonce too low", "Replacement transaction underpriced", "already known"])
+def test_is_nonce_error(message):
+    assert is_nonce_error(ValueError({"message": message}))
+    assert not is_nonce_error(ValueError("insufficient funds for gas"))
@@ -0,0 +1,71 @@
+import pytest
+
+from x402_ramp.bridge import ReservedTags, allocate_amount_tag, allocate_memo_id
+from x402_ramp.bridge.tags import MAX_MEMO_ID
+
+
+def test_tag_is_held_until_its_request_is_terminal():
+    tags = ReservedTags()
+    tags.reserve("r1", "123")
+    tags("r1", {"status": "deposit_detected"})
+    tags("r1", {"status": "pending"})  # deposit reorged out: still waiting on the same tag
+    assert "123" in tags
+    tags("r1", {"status": "completed"})
+    assert "123" not in tags
+    assert len(tags) == 0
+
+
+def test_tags_compare_as_strings():
+    tags = ReservedTags()
+    tags.reserve("r1", 1_000_042)
+    assert 1_000_042 in tags
+    assert "1000042" in tags
+
+
+def test_reserving_again_replaces_the_requests_tag():
+    tags = ReservedTags()
+    tags.reserve("r1", "1")
+    tags.reserve("r1", "2")
+    assert "1" not in tags and "2" in tags
+    tags.release("r1")
+    assert len(tags) == 0
+    tags.release("r1")
+
+
+def test_releasing_one_request_leaves_the_others():
+    tags = ReservedTags()
+    tags.reserve("r1", "1")
+    tags.reserve("r2", "2")
+    tags("r1", {"status": "failed"})
+    assert "2" in tags and len(tags) == 1
+
+
+def test_seed_skips_requests_without_a_tag():
+    tags = ReservedTags()
+    tags.seed([{"id": "r1", "deposit_tag": "7"}, {"id": "r2", "deposit_tag": None}])
+    assert "7" in tags and len(tags) == 1
+
+
+def test_amount_tag_avoids_taken_totals():
+    units = 5_000
+    # 3 decimals leave tags 1..9; all but one taken
+    taken = ReservedTags()
+    for tag in range(1, 9):
+        taken.reserve(f"r{tag}", units + tag)
+    assert allocate_amount_tag(units, taken, decimals=3) == units + 9
+    taken.reserve("r9", units + 9)
+    with pytest.raises(RuntimeError):
+        allocate_amount_tag(units, taken, decimals=3)
+
+
+def test_amount_tag_stays_under_a_cent():
+    for _ in range(100):
+        tagged = allocate_amount_tag(2_010_000, set())
+        assert 2_010_000 < tagged < 2_020_000
+
+
+def test_memo_id_is_in_range_and_not_taken():
+    taken = {allocate_memo_id(set()) for _ in range(100)}
+    memo = allocate_memo_id(taken)
+    assert memo not in taken
+    assert 0 < int(memo) <= MAX_MEMO_ID
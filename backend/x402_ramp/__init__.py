@@ -1 +1,11 @@
-from .core import has_trustline
\ No newline at end of file
+from .core import has_trustline, warm_up
+from .accounts import AccountCache, AccountState, asset_key
+from .chains import EvmChain, StellarChain
+from .channels import ChannelPool, channel_keypair, result_code
+from .gas import FeeOracle, GasLimitCache, fetch_fees
+from .metrics import WALLET_BALANCE, RpcMetrics
+from .nonce import NonceManager, is_nonce_error
+from .rpcpool import RpcPool
+from .sep import Sep10Tokens, StellarToml, jwt_expiry
+from .tracing import setup_tracing, span
+from .upstreams import Upstreams
@@ -0,0 +1,122 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+from stellar_sdk import Account
+
+from .chains import StellarChain
+from .tracing import span
+
+BALANCE_EFFECTS = {"account_credited": 1, "account_debited": -1}
+
+
+def asset_key(record) -> str:
+    """Asset key of a Horizon balance or effect record, e.g. `USDC:G...` or `native`."""
+    if record.get("asset_type") == "native":
+        return "native"
+    return f"{record['asset_code']}:{record['asset_issuer']}"
+
+
+def effect_ledger(effect) -> int:
+    # Effect paging tokens are "<operation id>-<index>"; the ledger is the operation id's high 32 bits
+    return int(effect["paging_token"].split("-")[0]) >> 32
+
+
+@dataclass
+class AccountState:
+    sequence: int
+    balances: dict  # asset key -> Decimal
+    ledgers: dict  # asset key -> last ledger already reflected in the balance
+
+
+class AccountCache:
+    """
+    In-memory sequence numbers and balances of our own Stellar accounts.
+
+    An account is loaded from Horizon once. After that, `next_account` hands
+    out sequence numbers locally, and `watch` keeps the balances current from
+    the account's effects stream. A credit or debit is applied only if it
+    happened in a later ledger than the one the loaded balance reflects. The
+    stream resumes right after the newest loaded balance, so no effect is
+    missed or counted twice. Fees are not effects: the native balance
+    overstates by the fees paid since the last load.
+    """
+
+    def __init__(self, stellar: StellarChain, reconnect_delay: float = 5):
+        self.stellar = stellar
+        self.reconnect_delay = reconnect_delay
+        self._accounts = {}
+        self._locks = defaultdict(asyncio.Lock)
+
+    async def reload(self, account_id: str) -> AccountState:
+        record = await self.stellar.account(account_id)
+        balances, ledgers = {}, {}
+        for balance in record["balances"]:
+            if balance.get("asset_type") == "liquidity_pool_shares":
+                continue
+            key = asset_key(balance)
+            balances[key] = Decimal(balance["balance"])
+            ledgers[key] = balance.get("last_modified_ledger", record["last_modified_ledger"])
+        sequence = int(record["sequence"])
+        previous = self._accounts.get(account_id)
+        if previous is not None:
+            # Sequence numbers handed out but not yet in a ledger stay reserved
+            sequence = max(sequence, previous.sequence)
+        state = AccountState(sequence, balances, ledgers)
+        self._accounts[account_id] = state
+        return state
+
+    async def _state(self, account_id: str) -> AccountState:
+        state = self._accounts.get(account_id)
+        if state is not None:
+            return state
+        async with self._locks[account_id]:
+            return self._accounts.get(account_id) or await self.reload(account_id)
+
+    async def next_account(self, account_id: str) -> Account:
+        """Account holding the next free sequence number; build exactly one transaction on it."""
+        state = await self._state(account_id)
+        account = Account(account_id, state.sequence)
+        state.sequence += 1
+        return account
+
+    async def balance(self, account_id: str, asset: str) -> float:
+        state = await self._state(account_id)
+        return float(state.balances.get(asset, 0))
+
+    def cached_balance(self, account_id: str, asset: str) -> float:
+        """Balance as currently held in memory, without loading; NaN if the account isn't loaded."""
+        state = self._accounts.get(account_id)
+        return float(state.balances.get(asset, 0)) if state is not None else float("nan")
+
+    def invalidate(self, account_id: str):
+        """Forget an account, e.g. after a tx_bad_seq, so the next use reloads it."""
+        self._accounts.pop(account_id, None)
+
+    def apply_effect(self, account_id: str, effect):
+        state = self._accounts.get(account_id)
+        sign = BALANCE_EFFECTS.get(effect["type"])
+        if state is None or sign is None:
+            return
+        key = asset_key(effect)
+        if effect_ledger(effect) <= state.ledgers.get(key, 0):
+            return
+        state.balances[key] = state.balances.get(key, Decimal(0)) + sign * Decimal(effect["amount"])
+
+    async def watch(self, account_id: str):
+        """Follow an account's effects for as long as the task runs."""
+        print(f"🔁 Watching Stellar account {account_id}...")
+        while True:
+            try:
+                with span("AccountCache.reload"):
+                    state = await self.reload(account_id)
+                cursor = str((max(state.ledgers.values(), default=0) + 1) << 32)
+                effects = self.stellar.server.effects().for_account(account_id).cursor(cursor)
+                async for effect in effects.stream():
+                    self.apply_effect(account_id, effect)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Stellar account stream error for {account_id}: {e}")
+            await asyncio.sleep(self.reconnect_delay)
@@ -0,0 +1,13 @@
+from .admission import AdmissionController, MemoryAdmissionStore, Throttled, api_key_id
+from .bloom import BloomFilter
+from .confirmations import ConfirmationTracker, parse_tiers
+from .disperse import DisperseBatcher, EvmPayout, request_id_bytes
+from .events import TERMINAL_STATUSES, StatusEvents
+from .indexer import TransferIndexer
+from .lifecycle import LifecycleMetrics
+from .liquidity import LiquidityLedger
+from .payouts import PayoutBatcher, PayoutError, PayoutPending, StellarPayout, StellarPayoutBatcher
+from .pending import PendingDeposits
+from .store import DepositLedger, RequestStore, StateTable
+from .stream import PaymentStream, payment_asset
+from .tags import ReservedTags, allocate_amount_tag, allocate_memo_id
@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import math
+import time
+
+from .events import TERMINAL_STATUSES
+
+
+def api_key_id(apikey: str) -> str:
+    """Stable id of an API key, so neither the admission store nor the request journal holds the key itself."""
+    return hashlib.sha256(apikey.encode()).hexdigest()[:32]
+
+
+class Throttled(Exception):
+    """A request was refused admission; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class MemoryAdmissionStore:
+    """
+    Token buckets and open-request slots per API key, held in this process.
+
+    The methods are coroutines so a store shared by several bridge processes
+    (e.g. Redis, with each method one server-side script) can replace it
+    without touching the AdmissionController.
+
+    Every `sweep_interval` seconds, buckets that have refilled completely
+    (no different from a new one) and expired slots are dropped, so a client
+    cycling through API keys can't grow the store without bound.
+    """
+
+    def __init__(self, sweep_interval: float = 60):
+        self.sweep_interval = sweep_interval
+        self._buckets = {}  # key -> [tokens, time they were counted, time the bucket is full again]
+        self._open = {}  # key -> {request_id: expires at}
+        self._owners = {}  # request_id -> key
+        self._swept_at = 0.0
+
+    def _sweep(self, now: float):
+        self._swept_at = now
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+        for key, slots in list(self._open.items()):
+            self._expire(key, slots, now)
+
+    def _expire(self, key: str, slots: dict, now: float):
+        for expired in [rid for rid, expires_at in slots.items() if expires_at <= now]:
+            del slots[expired]
+            self._owners.pop(expired, None)
+        if not slots:
+            del self._open[key]
+
+    async def take(self, key: str, rate: float, burst: float, now: float) -> float:
+        """Take one token from `key`'s bucket; 0 if taken, else seconds until one is available."""
+        if now - self._swept_at >= self.sweep_interval:
+            self._sweep(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now, now]
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        wait = 0 if tokens >= 1 else (1 - tokens) / rate
+        if not wait:
+            tokens -= 1
+        bucket[0], bucket[1], bucket[2] = tokens, now, now + (burst - tokens) / rate
+        return wait
+
+    async def open(self, key: str, request_id: str, limit: int, ttl: float, now: float) -> float:
+        """Hold one of `key`'s `limit` slots for `request_id`; 0 if held, else seconds until the oldest expires."""
+        if now - self._swept_at >= self.sweep_interval:
+            self._sweep(now)
+        slots = self._open.setdefault(key, {})
+        self._expire(key, slots, now)
+        slots = self._open.setdefault(key, slots)
+        if len(slots) >= limit:
+            return min(slots.values()) - now
+        slots[request_id] = now + ttl
+        self._owners[request_id] = key
+        return 0
+
+    async def close(self, request_id: str):
+        key = self._owners.pop(request_id, None)
+        if key is not None:
+            slots = self._open[key]
+            slots.pop(request_id, None)
+            if not slots:
+                del self._open[key]
+
+
+class AdmissionController:
+    """
+    Per-API-key admission for new bridge requests.
+
+    Each key has a token bucket refilled at `rate` requests per second up
+    to `burst`, and at most `max_open` requests that have not reached a
+    terminal status. A slot is freed when its request completes or fails
+    (the controller is a store listener), or after `open_ttl` seconds for a
+    request whose deposit never comes. A refused request raises Throttled
+    with the time to wait. A `rate` or `max_open` of 0 turns that limit off.
+
+    Limits are kept per `api_key_id`. After a restart, `seed` takes slots
+    again for the open requests in the store.
+    """
+
+    def __init__(self, store=None, rate: float = 1, burst: float = 20, max_open: int = 50, open_ttl: float = 3600):
+        self.store = store or MemoryAdmissionStore()
+        self.rate = rate
+        self.burst = burst
+        self.max_open = max_open
+        self.open_ttl = open_ttl
+        self._releasing = set()
+
+    async def admit(self, apikey: str, request_id: str):
+        now = time.time()
+        key = api_key_id(apikey)
+        if self.rate:
+            wait = await self.store.take(key, self.rate, self.burst, now)
+            if wait:
+                raise Throttled(f"Rate limit of {self.rate:g} requests/s exceeded", wait)
+        if self.max_open:
+            wait = await self.store.open(key, request_id, self.max_open, self.open_ttl, now)
+            if wait:
+                raise Throttled(f"{self.max_open} bridge requests already open", wait)
+
+    async def release(self, request_id: str):
+        if self.max_open:
+            await self.store.close(request_id)
+
+    async def seed(self, rows):
+        """Hold slots for open requests loaded from the store, e.g. `store.in_flight()`, even past `max_open`."""
+        if not self.max_open:
+            return
+        now = time.time()
+        for row in rows:
+            ttl = row["created_at"] + self.open_ttl - now
+            if row["api_key_id"] is not None and ttl > 0:
+                await self.store.open(row["api_key_id"], row["id"], math.inf, ttl, now)
+
+    def __call__(self, request_id: str, event: dict):
+        if event["status"] in TERMINAL_STATUSES and self.max_open:
+            task = asyncio.ensure_future(self.release(request_id))
+            self._releasing.add(task)
+            task.add_done_callback(self._releasing.discard)
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
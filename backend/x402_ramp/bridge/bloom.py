@@ -0,0 +1,42 @@
+import math
+
+
+class BloomFilter:
+    """
+    Set membership with no false negatives and about `error_rate` false positives.
+
+    Sized for `capacity` keys; past that the false-positive rate climbs, so
+    owners check `full` and rebuild a larger one. The bit positions come from
+    two hashes of the key (Kirsch and Mitzenmacher double hashing) and are
+    probed lazily, so a missing key usually costs one or two probes.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # str hashes are salted per process, which is fine for a filter rebuilt in each process
+        first, second, bits = hash(key), hash((key, 1)) | 1, self.bits
+        for i in range(self.hashes):
+            yield (first + i * second) % bits
+
+    def add(self, key: str):
+        array = self._array
+        for position in self._positions(key):
+            array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        array = self._array
+        for position in self._positions(key):
+            if not array[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
@@ -0,0 +1,150 @@
+import asyncio
+import math
+
+LEVELS = ("seen", "safe", "finalized")
+
+
+def parse_tiers(spec: str) -> list:
+    """
+    Parse a payout policy such as "10:seen,1000:safe,finalized".
+
+    Each entry applies to deposits up to its amount; an entry without one
+    covers everything above the others.
+    """
+    tiers = []
+    for entry in spec.split(","):
+        limit, _, level = entry.strip().rpartition(":")
+        if level not in LEVELS:
+            raise ValueError(f"Unknown confirmation level {level!r}; expected one of {', '.join(LEVELS)}")
+        tiers.append((float(limit) if limit else math.inf, level))
+    return sorted(tiers)
+
+
+class ConfirmationTracker:
+    """
+    Rolling window of recent EVM block hashes, for deciding when a deposit is final enough to pay out.
+
+    `update` extends the window to the current head, fetching each new
+    header once. A header whose parent hash doesn't match the window, or a
+    block whose hash changed, is a reorg: ancestors are re-fetched until
+    they match again, and each callable in `listeners` is called with the
+    first replaced block number.
+
+    A deposit is `seen` once its block is in the window, `safe` or
+    `finalized` once that block is `safe_depth` / `finalized_depth` blocks
+    below the head, or, with no depth set, at or below the node's
+    `safe` / `finalized` block. `confirm` waits for the level the payout
+    policy (`tiers`, see parse_tiers) sets for the deposit's amount, and
+    returns False if the deposit's block hash changes first.
+
+    Blocks older than the window are trusted as they are, so keep `window`
+    above the finalized depth.
+    """
+
+    def __init__(
+        self,
+        w3,
+        tiers=((math.inf, "seen"),),
+        safe_depth: int | None = None,
+        finalized_depth: int | None = None,
+        window: int = 1024,
+    ):
+        self.w3 = w3
+        self.tiers = sorted(tiers)
+        # Levels the policy can ask for; only those are tracked
+        self.levels = {level for _, level in self.tiers}
+        if self.tiers[-1][0] != math.inf:
+            self.levels.add("finalized")
+        self.depths = {"safe": safe_depth, "finalized": finalized_depth}
+        self.window = window
+        self.listeners = []
+        self.heights = {}  # level -> highest block number that has reached it
+        self._hashes = {}  # block number -> hash
+        self._oldest = None
+        self._waiters = []  # (block number, block hash, level, future)
+
+    def level_for(self, amount) -> str:
+        for limit, level in self.tiers:
+            if amount <= limit:
+                return level
+        return "finalized"
+
+    async def _walk_back(self, block) -> int:
+        """Re-fetch the ancestors of `block` that don't match the window; returns the first replaced number."""
+        number = block["number"]
+        while self._hashes.get(number - 1, block["parentHash"]) != block["parentHash"]:
+            number -= 1
+            block = await self.w3.eth.get_block(number)
+            self._hashes[number] = block["hash"]
+        return number
+
+    async def update(self, head: int) -> int | None:
+        """Extend the window to `head`; returns the first block a reorg replaced, if any."""
+        top = max(self._hashes) if self._hashes else head
+        start = max(min(top, head), head - self.window + 1)
+        blocks = await asyncio.gather(*(self.w3.eth.get_block(n) for n in range(start, head + 1)))
+        fork = None
+        for block in blocks:
+            number = block["number"]
+            known = self._hashes.get(number)
+            if (known is not None and known != block["hash"]) or (
+                self._hashes.get(number - 1, block["parentHash"]) != block["parentHash"]
+            ):
+                replaced = await self._walk_back(block)
+                fork = replaced if fork is None else min(fork, replaced)
+            self._hashes[number] = block["hash"]
+        for number in [n for n in self._hashes if n > head]:
+            # The chain got shorter
+            del self._hashes[number]
+            fork = number if fork is None else min(fork, number)
+        if self._oldest is None:
+            self._oldest = start
+        while self._oldest < head - self.window + 1:
+            self._hashes.pop(self._oldest, None)
+            self._oldest += 1
+
+        self.heights["seen"] = head
+        for level in self.levels - {"seen"}:
+            depth = self.depths[level]
+            if depth is None:
+                self.heights[level] = (await self.w3.eth.get_block(level))["number"]
+            else:
+                self.heights[level] = head - depth
+        if fork is not None:
+            print(f"⚠️ EVM reorg replaced blocks from {fork}")
+            for listener in self.listeners:
+                listener(fork)
+        self._settle()
+        return fork
+
+    def _check(self, number: int, block_hash, level: str) -> bool | None:
+        known = self._hashes.get(number)
+        if known is not None and known != block_hash:
+            return False
+        if number > self.heights.get(level, -1):
+            return None
+        if known is None and number >= (self._oldest or 0):
+            return None
+        return True
+
+    def _settle(self):
+        waiting = []
+        for number, block_hash, level, future in self._waiters:
+            if future.done():
+                continue
+            result = self._check(number, block_hash, level)
+            if result is None:
+                waiting.append((number, block_hash, level, future))
+            else:
+                future.set_result(result)
+        self._waiters = waiting
+
+    async def confirm(self, number: int, block_hash, amount) -> bool:
+        """Wait until block `number` reaches the level set for `amount`; False if its hash changes first."""
+        level = self.level_for(amount)
+        result = self._check(number, block_hash, level)
+        if result is not None:
+            return result
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((number, block_hash, level, future))
+        return await future
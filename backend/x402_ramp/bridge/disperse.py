@@ -0,0 +1,176 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from web3 import Web3
+from web3.logs import DISCARD
+
+from ..chains import EvmChain
+from ..gas import FeeOracle
+from ..nonce import NonceManager
+from .payouts import PayoutBatcher, PayoutError, PayoutPending
+
+MAX_UINT256 = 2**256 - 1
+
+
+@dataclass
+class EvmPayout:
+    request_id: bytes
+    recipient: str
+    amount: int
+    on_submitted: Callable[[str], Awaitable] | None = field(default=None, repr=False)
+    future: asyncio.Future = field(default=None, repr=False)
+
+
+def request_id_bytes(request_id: str) -> bytes:
+    return bytes.fromhex(request_id.removeprefix("0x")).rjust(32, b"\0")
+
+
+class DisperseBatcher(PayoutBatcher):
+    """
+    Packs queued EVM payouts into a single `BridgeDisperse.disperse` call.
+
+    The bridge wallet approves the disperse contract once and every batch
+    pays all its recipients with one signature, one nonce and one base fee.
+    Batches are capped so their estimated gas stays under `max_gas`, using
+    the per-payout cost learned from previous estimates; a batch that still
+    comes out over the cap, or fails to estimate, is split in halves. Each
+    caller's `on_submitted` is awaited with the tx hash once the batch is
+    broadcast, and the caller gets the shared tx hash and the log index of
+    its `Payout` event once the receipt is in. Once broadcast, only a
+    reverted receipt fails the batch's payouts; anything else that goes
+    wrong leaves their outcome unknown and raises PayoutPending.
+    """
+
+    def __init__(
+        self,
+        evm: EvmChain,
+        disperse,
+        account,
+        nonces: NonceManager,
+        fee_oracle: FeeOracle,
+        window: float = 2,
+        max_payouts: int = 200,
+        max_gas: int = 3_000_000,
+        gas_buffer: float = 1.2,
+        concurrency: int = 4,
+        receipt_timeout: float = 120,
+    ):
+        super().__init__(window, max_payouts)
+        self.evm = evm
+        self.disperse = disperse
+        self.account = account
+        self.nonces = nonces
+        self.fee_oracle = fee_oracle
+        self.max_gas = max_gas
+        self.gas_buffer = gas_buffer
+        self.receipt_timeout = receipt_timeout
+        self.per_payout_gas = 60_000
+        self._concurrency = concurrency
+
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    async def pay(self, request_id: str, recipient: str, amount: float, on_submitted=None) -> tuple[str, int]:
+        """Queue a payout and wait for (tx hash, log index) of the transfer that paid it."""
+        # Rounded, not truncated: 2.01 * 10**6 is 2009999.99...
+        raw_amount = round(amount * (10 ** await self.evm.decimals()))
+        payout = EvmPayout(request_id_bytes(request_id), Web3.to_checksum_address(recipient), raw_amount, on_submitted)
+        return await self._enqueue(payout)
+
+    async def _send(self, contract, fn_name: str, args: list, gas: int):
+        fees = await self.fee_oracle.fees()
+        tx = {
+            "chainId": await self.evm.chain_id(),
+            "to": contract.address,
+            "value": 0,
+            "data": contract.encode_abi(fn_name, args=args),
+            "gas": gas,
+            "maxFeePerGas": fees["max_fee_per_gas"],
+            "maxPriorityFeePerGas": fees["max_priority_fee"],
+            "type": 2,
+        }
+        async with self.nonces.allocate() as nonce:
+            tx["nonce"] = nonce
+            signed_tx = self.account.sign_transaction(tx)
+            return await self.evm.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+
+    async def ensure_allowance(self):
+        """Approve the disperse contract to spend the bridge wallet's tokens, once."""
+        token = self.evm.token
+        allowance = await token.functions.allowance(self.account.address, self.disperse.address).call()
+        if allowance >= MAX_UINT256 // 2:
+            return
+        args = [self.disperse.address, MAX_UINT256]
+        gas = await token.functions.approve(*args).estimate_gas({"from": self.account.address})
+        tx_hash = await self._send(token, "approve", args, int(gas * self.gas_buffer))
+        await self.evm.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.receipt_timeout)
+        print(f"✅ Approved disperse contract {self.disperse.address}: {tx_hash.hex()}")
+
+    def _args(self, payouts: list) -> list:
+        return [
+            self.evm.token.address,
+            [p.request_id for p in payouts],
+            [p.recipient for p in payouts],
+            [p.amount for p in payouts],
+        ]
+
+    async def _split(self, payouts: list, error: Exception):
+        if len(payouts) == 1:
+            payouts[0].future.set_exception(error)
+            return
+        half = len(payouts) // 2
+        await self.submit(payouts[:half])
+        await self.submit(payouts[half:])
+
+    async def submit(self, payouts: list):
+        payouts = [p for p in payouts if not p.future.done()]
+        if not payouts:
+            return
+        args = self._args(payouts)
+        try:
+            estimate = await self.disperse.functions.disperse(*args).estimate_gas({"from": self.account.address})
+        except Exception as e:
+            await self._split(payouts, PayoutError(f"disperse estimate failed: {e}"))
+            return
+        gas = int(estimate * self.gas_buffer)
+        if gas > self.max_gas and len(payouts) > 1:
+            await self._split(payouts, PayoutError("disperse batch over gas cap"))
+            return
+        self.per_payout_gas = -(-gas // len(payouts))
+
+        try:
+            tx_hash = await self._send(self.disperse, "disperse", args, gas)
+        except Exception as e:
+            for payout in payouts:
+                payout.future.set_exception(e)
+            return
+        try:
+            await asyncio.gather(*(p.on_submitted(tx_hash.hex()) for p in payouts if p.on_submitted))
+            receipt = await self.evm.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.receipt_timeout)
+        except Exception as e:
+            # Broadcast, so the batch may still be mined; only a revert fails it
+            for payout in payouts:
+                payout.future.set_exception(PayoutPending(f"disperse tx {tx_hash.hex()} not confirmed: {e}"))
+            return
+        tx_hash = tx_hash.hex()
+        if receipt["status"] != 1:
+            for payout in payouts:
+                payout.future.set_exception(PayoutError(f"disperse tx {tx_hash} reverted"))
+            return
+
+        log_index = {
+            log["args"]["requestId"]: log["logIndex"]
+            for log in self.disperse.events.Payout().process_receipt(receipt, errors=DISCARD)
+        }
+        print(f"✅ EVM disperse {tx_hash} paid {len(log_index)} request(s)")
+        for payout in payouts:
+            if payout.request_id in log_index:
+                payout.future.set_result((tx_hash, log_index[payout.request_id]))
+            else:
+                payout.future.set_exception(PayoutError(f"no Payout event in {tx_hash}"))
+
+    async def flush(self, batch: list):
+        size = max(1, self.max_gas // self.per_payout_gas)
+        for start in range(0, len(batch), size):
+            await self.submit(batch[start:start + size])
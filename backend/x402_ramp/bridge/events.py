@@ -0,0 +1,37 @@
+import asyncio
+from collections import defaultdict
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class StatusEvents:
+    """
+    In-process pub/sub of bridge request status transitions.
+
+    Every subscriber owns one queue and can follow any number of request
+    IDs through it, so an SSE stream follows one request and a WebSocket can
+    multiplex many. `publish` is synchronous and never blocks the bridge; a
+    request only goes through a handful of transitions, so queues stay short.
+    """
+
+    def __init__(self):
+        # request_id -> queues of the subscribers following it
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, queue: asyncio.Queue, request_id: str):
+        self._subscribers[request_id].add(queue)
+
+    def unsubscribe(self, queue: asyncio.Queue, request_id: str):
+        queues = self._subscribers.get(request_id)
+        if not queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[request_id]
+
+    def publish(self, request_id: str, event: dict):
+        for queue in self._subscribers.get(request_id, ()):
+            queue.put_nowait(event)
+
+    def __len__(self):
+        return sum(len(queues) for queues in self._subscribers.values())
@@ -0,0 +1,107 @@
+import asyncio
+
+from ..tracing import span
+from .pending import PendingDeposits
+
+
+class TransferIndexer:
+    """
+    Single async background scanner for ERC-20 `Transfer` logs sent to the bridge.
+
+    Each new block range is fetched once, filtered on the indexed `to` topic,
+    and every log is dispatched by its exact value, which carries the amount
+    tag of the request it pays (see tags.py). The
+    last processed block is persisted in `state` so a restart picks up where
+    the previous process stopped. Transfers already claimed in `deposits`
+    are skipped, so a rescanned range doesn't wake a request whose tag
+    happens to match an old transfer. Each callable in `listeners` is called
+    with every transfer to `recipient`, matched or not.
+
+    With a ConfirmationTracker in `confirmations`, each poll first brings
+    its block window up to the head; after a reorg the range from the first
+    replaced block is scanned again, so a transfer re-mined in another
+    block is picked up.
+    """
+
+    def __init__(
+        self,
+        w3,
+        token_contract,
+        recipient: str,
+        state,
+        pending: PendingDeposits,
+        deposits=None,
+        confirmations=None,
+        chain: str = "evm",
+        cursor_key: str = "evm_indexer_cursor",
+        poll_interval: float = 5,
+        max_range: int = 500,
+        lookback: int = 20,
+    ):
+        self.w3 = w3
+        self.token_contract = token_contract
+        self.recipient = recipient
+        self.state = state
+        self.pending = pending
+        self.deposits = deposits
+        self.confirmations = confirmations
+        self.chain = chain
+        self.cursor_key = cursor_key
+        self.poll_interval = poll_interval
+        self.max_range = max_range
+        self.lookback = lookback
+        self.listeners = []
+
+    @property
+    def cursor(self) -> int | None:
+        return self.state.get(self.cursor_key)
+
+    async def _fetch_logs(self, from_block: int, to_block: int):
+        return await self.token_contract.events.Transfer().get_logs(
+            from_block=from_block,
+            to_block=to_block,
+            argument_filters={"to": self.recipient},
+        )
+
+    def deposit_key(self, log) -> tuple:
+        """(chain, tx hash, log index) the transfer is claimed under in the DepositLedger."""
+        return self.chain, log["transactionHash"].hex(), log["logIndex"]
+
+    def handle_log(self, log):
+        for listener in self.listeners:
+            listener(log)
+        if self.deposits is not None and self.deposits.is_claimed(*self.deposit_key(log)):
+            return
+        value = log["args"]["value"]
+        request_id = self.pending.dispatch(value, value, log)
+        if request_id:
+            print(f"✅ EVM Transfer {log['transactionHash'].hex()} matched request {request_id}")
+
+    async def poll_once(self):
+        head = await self.w3.eth.block_number
+        cursor = self.cursor
+        if cursor is None:
+            cursor = head - self.lookback
+        if self.confirmations is not None:
+            fork = await self.confirmations.update(head)
+            if fork is not None:
+                cursor = min(cursor, fork - 1)
+        while cursor < head:
+            end = min(cursor + self.max_range, head)
+            logs = await self._fetch_logs(cursor + 1, end)
+            for log in logs:
+                self.handle_log(log)
+            cursor = end
+            self.state[self.cursor_key] = cursor
+
+    async def run(self):
+        print(f"🔁 Indexing USDC transfers to {self.recipient} from block {self.cursor}...")
+        while True:
+            try:
+                with span("TransferIndexer.poll"):
+                    await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ EVM indexer error: {e}")
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,97 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+from .events import TERMINAL_STATUSES
+
+DIRECTIONS = {"stellar-testnet": "evm_to_stellar", "base-sepolia": "stellar_to_evm"}
+# status -> stage it marks; each stage is timed from the one before it
+STAGES = {"deposit_detected": "deposit_detected", "submitted": "payout_submitted", "completed": "payout_confirmed"}
+
+STAGE_SECONDS = Histogram(
+    "x402_ramp_bridge_stage_seconds",
+    "Time a bridge request took to reach each stage from the previous one",
+    ["direction", "stage"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+REQUESTS = Counter(
+    "x402_ramp_bridge_requests_total",
+    "Bridge requests that reached a terminal status",
+    ["direction", "status"],
+)
+PENDING = Gauge(
+    "x402_ramp_bridge_pending_requests",
+    "Bridge requests waiting for their deposit",
+    ["direction"],
+)
+PAYING = Gauge(
+    "x402_ramp_bridge_inflight_payouts",
+    "Bridge requests whose payout is being sent or waiting to be included",
+    ["direction"],
+)
+
+
+class LifecycleMetrics:
+    """
+    Store listener turning status transitions into bridge lifecycle metrics.
+
+    Stage latencies come from the transition times the store commits:
+    deposit_detected is timed from the request, payout_submitted (the
+    `submitted` record written once the payout tx is broadcast) from the
+    deposit, and payout_confirmed (`completed`, written once the tx is
+    included) from the submission. `paying`, written before the payout is
+    queued, doesn't restart the clock. Only open requests are tracked;
+    `seed` picks up the ones a previous process left open.
+    """
+
+    def __init__(self):
+        # request_id -> [direction, status, time of the last transition]
+        self._open = {}
+        self._stages = {
+            direction: {stage: STAGE_SECONDS.labels(direction, stage) for stage in STAGES.values()}
+            for direction in DIRECTIONS.values()
+        }
+        self._pending = {direction: PENDING.labels(direction) for direction in DIRECTIONS.values()}
+        self._paying = {direction: PAYING.labels(direction) for direction in DIRECTIONS.values()}
+
+    def _gauge(self, direction: str, status: str):
+        if status == "pending":
+            return self._pending[direction]
+        if status in ("paying", "submitted"):
+            return self._paying[direction]
+        return None
+
+    def _enter(self, request_id: str, direction: str, status: str, at: float):
+        self._open[request_id] = [direction, status, at]
+        gauge = self._gauge(direction, status)
+        if gauge is not None:
+            gauge.inc()
+
+    def seed(self, rows):
+        """Track open requests loaded from the store, e.g. `store.in_flight()`."""
+        for row in rows:
+            if row["id"] not in self._open:
+                self._enter(row["id"], DIRECTIONS[row["target_chain"]], row["status"], row["updated_at"])
+
+    def __call__(self, request_id: str, event: dict):
+        status, at = event["status"], event["at"]
+        entry = self._open.get(request_id)
+        if entry is None:
+            if status == "pending":
+                self._enter(request_id, DIRECTIONS[event["target_chain"]], status, at)
+            return
+        direction, previous, since = entry
+        gauge = self._gauge(direction, previous)
+        if gauge is not None:
+            gauge.dec()
+        stage = STAGES.get(status)
+        if stage is not None:
+            self._stages[direction][stage].observe(at - since)
+        if status in TERMINAL_STATUSES:
+            del self._open[request_id]
+            REQUESTS.labels(direction, status).inc()
+            return
+        entry[1] = status
+        if stage is not None or status == "pending":
+            entry[2] = at
+        gauge = self._gauge(direction, status)
+        if gauge is not None:
+            gauge.inc()
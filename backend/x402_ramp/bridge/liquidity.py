@@ -0,0 +1,117 @@
+import heapq
+import time
+from decimal import Decimal
+
+
+class LiquidityLedger:
+    """
+    Bridge wallet balances per chain, net of the payouts open requests were promised.
+
+    Each chain's balance is loaded once with `set_balance`, together with the
+    block or ledger it reflects. After that, `credit` adds each transfer into
+    the wallet seen by the indexer or payment stream (skipping those the
+    loaded balance already includes), and a completed payout debits its
+    amount. Accepting a request `reserve`s its payout against what is left,
+    so the admission check is a dict lookup and concurrent requests can't
+    promise the same funds twice.
+
+    As a store listener, a reservation is settled (debited) when its request
+    completes and released when it fails. A request still waiting for its
+    deposit after `ttl` seconds stops holding funds; if the deposit does
+    come later, the reservation is taken back regardless of balance.
+    """
+
+    def __init__(self, ttl: float = 3600):
+        self.ttl = ttl
+        self._balances = {}  # chain -> Decimal
+        self._as_of = {}  # chain -> block / ledger the loaded balance includes
+        self._reserved = {}  # chain -> Decimal held by open requests
+        self._reservations = {}  # request_id -> [chain, amount, expires at, or None once funded]
+        self._expired = {}  # request_id -> (chain, amount) of reservations that timed out unfunded
+        self._expiry = []  # heap of (expires at, request_id)
+
+    def set_balance(self, chain: str, amount, as_of: int = 0):
+        self._balances[chain] = Decimal(str(amount))
+        self._as_of[chain] = as_of
+        self._reserved.setdefault(chain, Decimal(0))
+
+    def credit(self, chain: str, amount, at: int):
+        """Add a transfer into the wallet made in block / ledger `at`."""
+        if chain in self._balances and at > self._as_of[chain]:
+            self._balances[chain] += Decimal(str(amount))
+
+    def __contains__(self, chain: str) -> bool:
+        """Whether `chain`'s balance has been loaded."""
+        return chain in self._balances
+
+    def balance(self, chain: str) -> float:
+        return float(self._balances.get(chain, "nan"))
+
+    def _expire(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            _, request_id = heapq.heappop(self._expiry)
+            entry = self._reservations.get(request_id)
+            if entry is not None and entry[2] is not None and entry[2] <= now:
+                del self._reservations[request_id]
+                self._reserved[entry[0]] -= entry[1]
+                self._expired[request_id] = (entry[0], entry[1])
+
+    def available(self, chain: str) -> float:
+        self._expire(time.time())
+        if chain not in self._balances:
+            return float("nan")
+        return float(self._balances[chain] - self._reserved[chain])
+
+    def reserve(self, request_id: str, chain: str, amount) -> bool:
+        """Hold `amount` on `chain` for a request's payout; False if it isn't available."""
+        now = time.time()
+        self._expire(now)
+        amount = Decimal(str(amount))
+        if chain not in self._balances or self._balances[chain] - self._reserved[chain] < amount:
+            return False
+        self._hold(request_id, chain, amount, now + self.ttl)
+        heapq.heappush(self._expiry, (now + self.ttl, request_id))
+        return True
+
+    def _hold(self, request_id: str, chain: str, amount: Decimal, expires_at: float | None):
+        self._reservations[request_id] = [chain, amount, expires_at]
+        self._reserved[chain] = self._reserved.get(chain, Decimal(0)) + amount
+
+    def release(self, request_id: str):
+        self._expired.pop(request_id, None)
+        entry = self._reservations.pop(request_id, None)
+        if entry is not None:
+            self._reserved[entry[0]] -= entry[1]
+
+    def seed(self, rows):
+        """Hold funds for open requests loaded from the store, e.g. `store.in_flight()`."""
+        now = time.time()
+        for row in rows:
+            if row["id"] in self._reservations:
+                continue
+            amount = Decimal(str(row["amount"]))
+            if row["status"] == "pending":
+                self._hold(row["id"], row["target_chain"], amount, now + self.ttl)
+                heapq.heappush(self._expiry, (now + self.ttl, row["id"]))
+            else:
+                self._hold(row["id"], row["target_chain"], amount, None)
+
+    def __call__(self, request_id: str, event: dict):
+        status = event["status"]
+        entry = self._reservations.get(request_id)
+        if status == "pending" and entry is not None and entry[2] is None:
+            # Its deposit was given back (a reorg); waiting for it again runs the clock again
+            entry[2] = time.time() + self.ttl
+            heapq.heappush(self._expiry, (entry[2], request_id))
+        elif status == "deposit_detected":
+            if entry is not None:
+                entry[2] = None  # funded: held until the payout settles
+            elif request_id in self._expired:
+                chain, amount = self._expired.pop(request_id)
+                self._hold(request_id, chain, amount, None)
+        elif status == "completed":
+            self.release(request_id)
+            if entry is not None and entry[0] in self._balances:
+                self._balances[entry[0]] -= entry[1]
+        elif status == "failed":
+            self.release(request_id)
@@ -0,0 +1,221 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from stellar_sdk import Asset, Keypair, TransactionBuilder
+from stellar_sdk.exceptions import BadRequestError
+
+from ..accounts import AccountCache
+from ..chains import StellarChain
+from ..channels import ChannelPool, result_code
+from ..tracing import span
+
+
+class PayoutError(Exception):
+    """A single payout was rejected by the network."""
+
+
+class PayoutPending(Exception):
+    """A payout was broadcast but its outcome isn't known; it may still be paid."""
+
+
+@dataclass
+class StellarPayout:
+    destination: str
+    asset: Asset
+    amount: str
+    memo: str | None = None
+    future: asyncio.Future = field(default=None, repr=False)
+
+
+def failed_operations(error: BadRequestError, size: int) -> list | None:
+    """Per-op result codes of a failed batch, when Horizon reports them for every op."""
+    codes = (error.extras or {}).get("result_codes", {}).get("operations")
+    if codes and len(codes) == size:
+        return codes
+    return None
+
+
+class PayoutBatcher(ABC):
+    """
+    Queue of payouts that are sent in batches.
+
+    `run()` collects whatever is queued within `window` seconds of the first
+    payout (up to `max_batch`) and hands it to `flush`, keeping at most
+    `concurrency()` batches in flight. Each payout carries a future that
+    `flush` resolves with its result.
+    """
+
+    def __init__(self, window: float, max_batch: int):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = asyncio.Queue()
+
+    async def _enqueue(self, payout):
+        payout.future = asyncio.get_running_loop().create_future()
+        await self._queue.put(payout)
+        return await payout.future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def concurrency(self) -> int:
+        return 1
+
+    @abstractmethod
+    async def flush(self, batch: list):
+        """Send `batch`, resolving each payout's future."""
+
+    async def _flush(self, batch: list):
+        try:
+            with span(f"{type(self).__name__}.flush", {"payouts.batch_size": len(batch)}):
+                await self.flush(batch)
+        finally:
+            for payout in batch:
+                if not payout.future.done():
+                    payout.future.cancel()
+
+    async def run(self):
+        slots = asyncio.Semaphore(self.concurrency())
+        in_flight = set()
+        try:
+            while True:
+                batch = await self._collect()
+                await slots.acquire()
+                task = asyncio.create_task(self._flush(batch))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+
+class StellarPayoutBatcher(PayoutBatcher):
+    """
+    Packs queued Stellar payouts into multi-operation transactions.
+
+    Payouts arriving within `window` seconds (about one ledger close) of the
+    first queued payout go out as one transaction of up to `max_ops` payment
+    operations, one per memo since a memo covers the whole transaction. Every
+    caller gets the hash of the transaction that carried its payment. When
+    Horizon rejects a batch, the failing ops are dropped and the rest
+    resubmitted; if it does not say which op failed, the batch is split in
+    halves until the bad payment is isolated.
+
+    With a `channels` pool, batches are submitted from channel accounts and
+    up to one batch per channel is in flight at a time; otherwise batches go
+    out one after another from the main account, taking its sequence
+    numbers from `accounts` when given.
+    """
+
+    def __init__(
+        self,
+        stellar: StellarChain,
+        keypair: Keypair,
+        network_passphrase: str,
+        base_fee: int = 100,
+        window: float = 5,
+        max_ops: int = 100,
+        channels: ChannelPool | None = None,
+        accounts: AccountCache | None = None,
+    ):
+        super().__init__(window, max_ops)
+        self.stellar = stellar
+        self.keypair = keypair
+        self.network_passphrase = network_passphrase
+        self.base_fee = base_fee
+        self.channels = channels
+        self.accounts = accounts
+
+    def concurrency(self) -> int:
+        return len(self.channels) if self.channels else 1
+
+    async def pay(self, destination: str, asset: Asset, amount, memo: str | None = None) -> str:
+        """Queue a payment and wait for the hash of the transaction that carried it."""
+        return await self._enqueue(StellarPayout(destination, asset, str(amount), memo))
+
+    async def _submit_tx(self, payouts: list) -> str:
+        def add_payments(builder: TransactionBuilder, source: str | None = None):
+            for payout in payouts:
+                builder.append_payment_op(
+                    destination=payout.destination, asset=payout.asset, amount=payout.amount, source=source
+                )
+
+        if self.channels:
+            response = await self.channels.submit(add_payments, memo=payouts[0].memo)
+            return response["hash"]
+
+        if self.accounts:
+            account = await self.accounts.next_account(self.keypair.public_key)
+        else:
+            account = await self.stellar.load_account(self.keypair.public_key)
+        builder = TransactionBuilder(
+            source_account=account,
+            network_passphrase=self.network_passphrase,
+            base_fee=self.base_fee,
+        )
+        add_payments(builder)
+        if payouts[0].memo:
+            builder.add_text_memo(payouts[0].memo)
+        tx = builder.set_timeout(30).build()
+        tx.sign(self.keypair)
+        try:
+            response = await self.stellar.submit(tx)
+        except Exception as e:
+            # Only a tx that failed in the ledger consumed its sequence number
+            if self.accounts and not (isinstance(e, BadRequestError) and result_code(e) == "tx_failed"):
+                self.accounts.invalidate(self.keypair.public_key)
+            raise
+        return response["hash"]
+
+    async def submit(self, payouts: list):
+        payouts = [p for p in payouts if not p.future.done()]
+        if not payouts:
+            return
+        try:
+            tx_hash = await self._submit_tx(payouts)
+        except BadRequestError as e:
+            codes = failed_operations(e, len(payouts))
+            if codes:
+                retry = []
+                for payout, code in zip(payouts, codes):
+                    if code == "op_success":
+                        retry.append(payout)
+                    else:
+                        payout.future.set_exception(PayoutError(f"{payout.destination}: {code}"))
+                await self.submit(retry)
+            elif len(payouts) > 1:
+                half = len(payouts) // 2
+                await self.submit(payouts[:half])
+                await self.submit(payouts[half:])
+            else:
+                payouts[0].future.set_exception(e)
+            return
+        except Exception as e:
+            for payout in payouts:
+                if not payout.future.done():
+                    payout.future.set_exception(e)
+            return
+        print(f"✅ Stellar batch {tx_hash} paid {len(payouts)} request(s)")
+        for payout in payouts:
+            if not payout.future.done():
+                payout.future.set_result(tx_hash)
+
+    async def flush(self, batch: list):
+        by_memo = {}
+        for payout in batch:
+            by_memo.setdefault(payout.memo, []).append(payout)
+        for payouts in by_memo.values():
+            await self.submit(payouts)
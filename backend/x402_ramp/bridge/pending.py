@@ -0,0 +1,53 @@
+import asyncio
+
+
+class PendingDeposits:
+    """
+    Bridge requests waiting for a deposit on their source chain.
+
+    Each waiter is registered under a key no other pending request shares
+    (a Stellar memo, or an EVM amount carrying a unique tag; see tags.py),
+    so an incoming deposit is resolved with one dict lookup however many
+    requests are pending.
+    """
+
+    def __init__(self):
+        # key -> (request_id, min_amount, future)
+        self._waiting = {}
+
+    def register(self, key, request_id: str, min_amount) -> asyncio.Future:
+        """Wait for a deposit under `key`; registering the same request again returns the same future."""
+        entry = self._waiting.get(key)
+        if entry is not None:
+            if entry[0] != request_id:
+                raise KeyError(f"Deposit key {key} is already taken by request {entry[0]}")
+            return entry[2]
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[key] = (request_id, min_amount, future)
+        return future
+
+    def unregister(self, key, request_id: str):
+        entry = self._waiting.get(key)
+        if entry is None or entry[0] != request_id:
+            return
+        del self._waiting[key]
+        if not entry[2].done():
+            entry[2].cancel()
+
+    def dispatch(self, key, amount, deposit) -> str | None:
+        """Hand `deposit` to the waiter registered under `key`, if it covers the amount."""
+        entry = self._waiting.get(key)
+        if entry is None:
+            return None
+        request_id, min_amount, future = entry
+        if amount < min_amount or future.done():
+            return None
+        del self._waiting[key]
+        future.set_result(deposit)
+        return request_id
+
+    def __contains__(self, key) -> bool:
+        return key in self._waiting
+
+    def __len__(self):
+        return len(self._waiting)
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import sqlite3
+import time
+
+from .bloom import BloomFilter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id TEXT PRIMARY KEY,
+    target_chain TEXT NOT NULL,
+    evm_address TEXT NOT NULL,
+    stellar_address TEXT NOT NULL,
+    source_address TEXT NOT NULL,
+    target_address TEXT NOT NULL,
+    amount REAL NOT NULL,
+    deposit_tag TEXT,
+    api_key_id TEXT,
+    status TEXT NOT NULL,
+    source_tx TEXT,
+    target_tx TEXT,
+    target_log_index INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_status ON requests (status, updated_at);
+CREATE INDEX IF NOT EXISTS requests_source_address ON requests (source_address);
+CREATE INDEX IF NOT EXISTS requests_target_address ON requests (target_address);
+CREATE INDEX IF NOT EXISTS requests_created_at ON requests (created_at);
+
+CREATE TABLE IF NOT EXISTS transitions (
+    request_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transitions_request_id ON transitions (request_id);
+
+CREATE TABLE IF NOT EXISTS deposits (
+    chain TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    position TEXT NOT NULL,
+    request_id TEXT NOT NULL,
+    claimed_at REAL NOT NULL,
+    PRIMARY KEY (chain, tx_hash, position)
+);
+
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+UPDATABLE = ("source_tx", "target_tx", "target_log_index", "error")
+OPEN_STATUSES = ("pending", "deposit_detected", "paying", "submitted")
+
+
+def _address(address: str) -> str:
+    # EVM addresses are matched case-insensitively; Stellar keys are upper-case already
+    return address.lower() if address.startswith("0x") else address
+
+
+class StateTable:
+    """Small JSON key/value table for cursors, with the dict calls the indexers use."""
+
+    def __init__(self, store: "RequestStore"):
+        self.store = store
+
+    def get(self, key: str, default=None):
+        row = self.store.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def __setitem__(self, key: str, value):
+        self.store._write(
+            "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value)),
+        )
+
+
+class DepositLedger:
+    """
+    Deposits already consumed by a request, one row per (chain, tx hash, position).
+
+    The position is a log index on EVM and an operation id on Stellar.
+    `claim` is the only way a request reaches deposit_detected, and a deposit
+    can be claimed once, so a deposit seen again (a rescanned block range, a
+    replayed stream) never pays out twice. The check and the insert run
+    without yielding to the event loop, and the claim commits in the same
+    batch as the status change.
+
+    `is_claimed` answers from a Bloom filter of the claimed keys, so a new
+    deposit, the common case, costs no query; only a possible repeat is
+    looked up.
+    """
+
+    def __init__(self, store: "RequestStore", capacity: int = 100_000, error_rate: float = 0.001):
+        self.store = store
+        self.error_rate = error_rate
+        self._rebuild(capacity)
+
+    def _rebuild(self, capacity: int):
+        rows = self.store.conn.execute("SELECT chain, tx_hash, position FROM deposits").fetchall()
+        self._seen = BloomFilter(max(capacity, 2 * len(rows)), self.error_rate)
+        for row in rows:
+            self._seen.add(":".join(row))
+
+    def is_claimed(self, chain: str, tx_hash: str, position) -> bool:
+        if f"{chain}:{tx_hash}:{position}" not in self._seen:
+            return False
+        row = self.store.conn.execute(
+            "SELECT 1 FROM deposits WHERE chain = ? AND tx_hash = ? AND position = ?", (chain, tx_hash, str(position))
+        ).fetchone()
+        return row is not None
+
+    async def claim(self, request_id: str, chain: str, tx_hash: str, position, **fields) -> bool:
+        """Consume a deposit for `request_id` and move it to deposit_detected; False if it was already claimed."""
+        if self.is_claimed(chain, tx_hash, position):
+            return False
+        self.store._write(
+            "INSERT INTO deposits (chain, tx_hash, position, request_id, claimed_at) VALUES (?, ?, ?, ?, ?)",
+            (chain, tx_hash, str(position), request_id, time.time()),
+        )
+        self._seen.add(f"{chain}:{tx_hash}:{position}")
+        if self._seen.full:
+            self._rebuild(2 * self._seen.capacity)
+        await self.store.update(request_id, "deposit_detected", source_tx=tx_hash, **fields)
+        return True
+
+    async def release(self, request_id: str):
+        """Give back the deposit `request_id` claimed, e.g. one a reorg dropped, and return it to pending."""
+        self.store._write("DELETE FROM deposits WHERE request_id = ?", (request_id,))
+        await self.store.update(request_id, "pending", source_tx=None)
+
+
+class RequestStore:
+    """
+    SQLite journal of bridge requests and their status transitions.
+
+    The database runs in WAL mode and writes are group-committed: each
+    write joins the open transaction and its caller resumes once the batch
+    commits. By default that is at the end of the current event-loop pass,
+    so every write issued in the same pass shares one commit; a positive
+    `commit_interval` holds the batch open longer, and `max_batch` writes
+    force a commit early.
+    With `synchronous=NORMAL` a committed batch survives a process crash;
+    the last batches before a power loss may not.
+
+    Each callable in `listeners` is called as `listener(request_id, event)`
+    once a transition has committed, with the new status, its time and any
+    columns set alongside it.
+    """
+
+    def __init__(self, path: str = "bridge.db", commit_interval: float = 0, max_batch: int = 500):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(requests)")}
+        # Databases from before deposit tags / per-key admission
+        for column in ("deposit_tag", "api_key_id"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE requests ADD COLUMN {column} TEXT")
+        self.state = StateTable(self)
+        self.deposits = DepositLedger(self)
+        self.listeners = []
+        self._waiters = []
+        self._pending = 0
+        self._commit_handle = None
+
+    def _write(self, sql: str, params=()) -> asyncio.Future | None:
+        self.conn.execute(sql, params)
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.commit()
+            return None
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        if self._pending >= self.max_batch:
+            self.commit()
+        elif self._commit_handle is None:
+            self._commit_handle = loop.call_later(self.commit_interval, self.commit)
+        return waiter
+
+    def commit(self):
+        if self._commit_handle is not None:
+            self._commit_handle.cancel()
+            self._commit_handle = None
+        waiters, self._waiters, self._pending = self._waiters, [], 0
+        try:
+            self.conn.commit()
+        except Exception as e:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            raise
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def _transition(self, request_id: str, status: str, now: float, fields: dict):
+        waiter = self._write(
+            "INSERT INTO transitions (request_id, status, at) VALUES (?, ?, ?)",
+            (request_id, status, now),
+        )
+        if waiter is not None:
+            await waiter
+        event = {"request_id": request_id, "status": status, "at": now, **fields}
+        for listener in self.listeners:
+            listener(request_id, event)
+
+    async def create(
+        self,
+        request_id: str,
+        target_chain: str,
+        evm_address: str,
+        stellar_address: str,
+        amount: float,
+        status: str = "pending",
+        deposit_tag: str | None = None,
+        api_key_id: str | None = None,
+    ):
+        now = time.time()
+        if target_chain == "stellar-testnet":
+            source_address, target_address = evm_address, stellar_address
+        else:
+            source_address, target_address = stellar_address, evm_address
+        self._write(
+            "INSERT INTO requests (id, target_chain, evm_address, stellar_address, source_address,"
+            " target_address, amount, deposit_tag, api_key_id, status, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (request_id, target_chain, evm_address, stellar_address, _address(source_address),
+             _address(target_address), amount, deposit_tag, api_key_id, status, now, now),
+        )
+        await self._transition(request_id, status, now, {"target_chain": target_chain})
+
+    async def update(self, request_id: str, status: str, **fields):
+        """Move a request to `status`, setting any of the UPDATABLE columns alongside."""
+        unknown = set(fields) - set(UPDATABLE)
+        if unknown:
+            raise ValueError(f"Cannot update {', '.join(sorted(unknown))}")
+        now = time.time()
+        columns = "".join(f", {name} = ?" for name in fields)
+        self._write(
+            f"UPDATE requests SET status = ?, updated_at = ?{columns} WHERE id = ?",
+            (status, now, *fields.values(), request_id),
+        )
+        await self._transition(request_id, status, now, fields)
+
+    def get(self, request_id: str) -> dict | None:
+        row = self.conn.execute("SELECT * FROM requests WHERE id = ?", (request_id,)).fetchone()
+        return dict(row) if row else None
+
+    def history(self, request_id: str) -> list:
+        rows = self.conn.execute(
+            "SELECT status, at FROM transitions WHERE request_id = ? ORDER BY rowid", (request_id,)
+        )
+        return [dict(row) for row in rows]
+
+    def find(self, status: str | None = None, address: str | None = None, since: float | None = None, limit: int = 100) -> list:
+        """Requests filtered by status, source-or-target address and creation time, newest first."""
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if address is not None:
+            clauses.append("(source_address = ? OR target_address = ?)")
+            params += [_address(address)] * 2
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.conn.execute(
+            f"SELECT * FROM requests {where} ORDER BY created_at DESC LIMIT ?", (*params, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def in_flight(self, statuses=OPEN_STATUSES) -> list:
+        """Every request that has not reached a terminal status, oldest first."""
+        marks = ", ".join("?" * len(statuses))
+        rows = self.conn.execute(
+            f"SELECT * FROM requests WHERE status IN ({marks}) ORDER BY created_at", statuses
+        )
+        return [dict(row) for row in rows]
+
+    def stuck(self, older_than: float, statuses=OPEN_STATUSES) -> list:
+        """Open requests whose status has not moved for `older_than` seconds."""
+        marks = ", ".join("?" * len(statuses))
+        rows = self.conn.execute(
+            f"SELECT * FROM requests WHERE status IN ({marks}) AND updated_at < ? ORDER BY updated_at",
+            (*statuses, time.time() - older_than),
+        )
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self.commit()
+        self.conn.close()
@@ -0,0 +1,131 @@
+import asyncio
+
+from stellar_sdk import ServerAsync
+
+from ..tracing import span
+from .pending import PendingDeposits
+
+
+def payment_asset(payment) -> str:
+    """Asset key of a Horizon payment record, e.g. `USDC:G...` or `native`."""
+    if payment.get("asset_type") == "native":
+        return "native"
+    return f"{payment['asset_code']}:{payment['asset_issuer']}"
+
+
+class PaymentStream:
+    """
+    One long-lived async consumer of the payments stream for a Stellar account.
+
+    Incoming payments of `asset` are routed to waiting requests through
+    `pending`, keyed by the MEMO_ID of their transaction (fetched along with
+    the payments via `join=transactions`), so any number of pending requests
+    share a single SSE connection to Horizon. Payments already claimed in
+    `deposits` are skipped. Each callable in `listeners` is called with every
+    incoming payment of `asset`, matched or not.
+
+    With a `state` table the paging token of the last handled payment is
+    persisted under `cursor_key`. On (re)connect, everything after that token
+    is first read back in pages of `page_size` records before the stream is
+    opened, so payments made while the server was down still reach their
+    requests.
+    """
+
+    def __init__(
+        self,
+        server: ServerAsync,
+        account_id: str,
+        pending: PendingDeposits,
+        asset: str,
+        deposits=None,
+        chain: str = "stellar",
+        cursor: str = "now",
+        reconnect_delay: float = 5,
+        state=None,
+        cursor_key: str = "stellar_stream_cursor",
+        page_size: int = 200,
+    ):
+        self.server = server
+        self.account_id = account_id
+        self.pending = pending
+        self.asset = asset
+        self.deposits = deposits
+        self.chain = chain
+        self.state = state
+        self.cursor_key = cursor_key
+        self.cursor = state.get(cursor_key, cursor) if state is not None else cursor
+        self.reconnect_delay = reconnect_delay
+        self.page_size = page_size
+        self.listeners = []
+
+    def _save_cursor(self):
+        if self.state is not None and self.cursor != "now":
+            self.state[self.cursor_key] = self.cursor
+
+    def deposit_key(self, payment) -> tuple:
+        """(chain, tx hash, operation id) the payment is claimed under in the DepositLedger."""
+        return self.chain, payment["transaction_hash"], payment["id"]
+
+    def handle_payment(self, payment):
+        if payment["type"] != "payment" or payment["to"] != self.account_id or payment_asset(payment) != self.asset:
+            return
+        for listener in self.listeners:
+            listener(payment)
+        if self.deposits is not None and self.deposits.is_claimed(*self.deposit_key(payment)):
+            return
+        transaction = payment.get("transaction") or {}
+        if transaction.get("memo_type") != "id":
+            return
+        request_id = self.pending.dispatch(transaction["memo"], float(payment["amount"]), payment)
+        if request_id:
+            print(f"✅ Stellar Payment {payment['id']} matched request {request_id}")
+
+    def _payments_page(self, limit: int, desc: bool = False):
+        payments = self.server.payments().for_account(self.account_id).join("transactions").limit(limit).order(desc=desc)
+        if self.cursor != "now":
+            payments = payments.cursor(self.cursor)
+        return payments.call()
+
+    async def backfill(self) -> int:
+        """Handle every payment after the cursor, a page at a time. Returns the count."""
+        if self.cursor == "now":
+            # First start: pin the cursor to the latest payment so it can be persisted
+            if self.state is not None:
+                page = await self._payments_page(1, desc=True)
+                records = page["_embedded"]["records"]
+                if records:
+                    self.cursor = records[0]["paging_token"]
+                    self._save_cursor()
+            return 0
+        handled = 0
+        while True:
+            page = await self._payments_page(self.page_size)
+            records = page["_embedded"]["records"]
+            for payment in records:
+                self.cursor = payment["paging_token"]
+                self.handle_payment(payment)
+            handled += len(records)
+            if records:
+                self._save_cursor()
+            if len(records) < self.page_size:
+                return handled
+
+    async def run(self):
+        print(f"🔁 Streaming Stellar payments to {self.account_id} from cursor {self.cursor}...")
+        while True:
+            try:
+                with span("PaymentStream.backfill"):
+                    backfilled = await self.backfill()
+                if backfilled:
+                    print(f"✅ Backfilled {backfilled} Stellar payment(s) up to cursor {self.cursor}")
+                payments = self.server.payments().for_account(self.account_id).join("transactions").cursor(self.cursor)
+                async for payment in payments.stream():
+                    with span("PaymentStream.payment", {"stellar.payment_id": payment["id"]}):
+                        self.cursor = payment["paging_token"]
+                        self.handle_payment(payment)
+                        self._save_cursor()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Stellar payment stream error: {e}")
+            await asyncio.sleep(self.reconnect_delay)
@@ -0,0 +1,75 @@
+import itertools
+import secrets
+
+from .events import TERMINAL_STATUSES
+
+# Memo ids stay below 2**63: some wallets mishandle the top bit of the uint64
+MAX_MEMO_ID = 2**63 - 1
+
+
+def allocate_memo_id(taken) -> str:
+    """Random Stellar MEMO_ID, as Horizon renders it, that is not in `taken`."""
+    while True:
+        memo = str(secrets.randbelow(MAX_MEMO_ID) + 1)
+        if memo not in taken:
+            return memo
+
+
+def allocate_amount_tag(units: int, taken, decimals: int = 6) -> int:
+    """
+    `units` plus a random sub-cent tag, so the total is not in `taken`.
+
+    For a 6-decimal token the tag is 0.000001 to 0.009999, which leaves the
+    amount the user sees unchanged to the cent.
+    """
+    span = 10 ** (decimals - 2) - 1
+    start = secrets.randbelow(span)
+    # Random probes first; when most tags are taken, every tag is tried once from a random start
+    probes = (secrets.randbelow(span) for _ in range(16))
+    for offset in itertools.chain(probes, ((start + i) % span for i in range(span))):
+        tagged = units + offset + 1
+        if tagged not in taken:
+            return tagged
+    raise RuntimeError(f"No free amount tag left for {units} units")
+
+
+class ReservedTags:
+    """
+    Deposit tags (memo ids and amount tags) held by open requests.
+
+    A tag stays taken from the moment it is allocated until its request
+    completes or fails (the set is a store listener), not just while the
+    deposit is awaited: a claimed EVM deposit can still be reorged out and
+    waited for again, and must not then match a newer request. Pass it as
+    `taken` to the allocators and `reserve` the result before yielding.
+    """
+
+    def __init__(self):
+        self._owners = {}  # request_id -> tag
+        self._tags = set()
+
+    def reserve(self, request_id: str, tag):
+        self.release(request_id)
+        self._owners[request_id] = str(tag)
+        self._tags.add(str(tag))
+
+    def release(self, request_id: str):
+        tag = self._owners.pop(request_id, None)
+        if tag is not None:
+            self._tags.discard(tag)
+
+    def seed(self, rows):
+        """Reserve the tags of open requests loaded from the store, e.g. `store.in_flight()`."""
+        for row in rows:
+            if row["deposit_tag"] is not None:
+                self.reserve(row["id"], row["deposit_tag"])
+
+    def __contains__(self, tag) -> bool:
+        return str(tag) in self._tags
+
+    def __len__(self):
+        return len(self._tags)
+
+    def __call__(self, request_id: str, event: dict):
+        if event["status"] in TERMINAL_STATUSES:
+            self.release(request_id)
@@ -0,0 +1,167 @@
+import asyncio
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from stellar_sdk import ServerAsync
+from stellar_sdk.client.aiohttp_client import AiohttpClient
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
+
+from .metrics import RpcMetrics, provider_name
+from .rpcpool import RpcPool
+from .tracing import span
+
+
+class PooledHTTPProvider(AsyncHTTPProvider):
+    """
+    AsyncHTTPProvider that posts through a keep-alive session we own.
+
+    web3's own session manager opens a new connection per request and takes
+    a thread-pool lock around every call, which serialises concurrent calls.
+    """
+
+    session: ClientSession | None = None
+    metrics: RpcMetrics | None = None
+    pool: RpcPool | None = None
+
+    async def _post(self, method, request_data: bytes, url: str | None = None) -> bytes:
+        if self.session is None:
+            return await super()._make_request(method, request_data)
+        async with self.session.post(url or self.endpoint_uri, data=request_data, **self.get_request_kwargs()) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def _make_request(self, method, request_data: bytes) -> bytes:
+        with span(method, {"rpc.system": "jsonrpc", "rpc.method": method}):
+            if self.pool is not None and self.session is not None:
+                return await self.pool.request(method, request_data, self._post)
+            if self.metrics is None:
+                return await self._post(method, request_data)
+            return await self.metrics.timed(method, self._post(method, request_data))
+
+    async def disconnect(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        await super().disconnect()
+
+
+class EvmChain:
+    """
+    Async access to an EVM chain and one ERC-20 token on it.
+
+    `connect()` installs a pooled keep-alive aiohttp session that every call
+    shares. Values that never change for a deployment (chain id, token decimals) are
+    fetched once. web3's validation middleware is dropped: it re-checks the
+    chain id on every call, and all our writes are locally signed raw txs.
+    Every call is timed per JSON-RPC method under the provider's host name.
+    `provider_url` may list several comma-separated endpoints, which are then
+    shared through an RpcPool.
+    """
+
+    def __init__(self, provider_url: str, token_address: str, token_abi, request_timeout: float = 10, pool_size: int = 100):
+        urls = [url.strip() for url in provider_url.split(",") if url.strip()]
+        provider = PooledHTTPProvider(urls[0], request_kwargs={"timeout": ClientTimeout(request_timeout)})
+        if len(urls) > 1:
+            provider.pool = RpcPool(urls)
+        else:
+            provider.metrics = RpcMetrics(provider_name(urls[0]))
+        self.w3 = AsyncWeb3(provider)
+        self.w3.middleware_onion.remove("validation")
+        self.token = self.w3.eth.contract(address=token_address, abi=token_abi)
+        self.pool_size = pool_size
+        self._chain_id = None
+        self._decimals = None
+        self._chain_id_lock = asyncio.Lock()
+        self._decimals_lock = asyncio.Lock()
+
+    async def connect(self):
+        """Open the shared session; must be called from the serving event loop."""
+        if self.w3.provider.session is None:
+            self.w3.provider.session = ClientSession(connector=TCPConnector(limit=self.pool_size))
+
+    async def chain_id(self) -> int:
+        if self._chain_id is None:
+            async with self._chain_id_lock:
+                if self._chain_id is None:
+                    self._chain_id = await self.w3.eth.chain_id
+        return self._chain_id
+
+    async def decimals(self) -> int:
+        if self._decimals is None:
+            async with self._decimals_lock:
+                if self._decimals is None:
+                    self._decimals = await self.token.functions.decimals().call()
+        return self._decimals
+
+    async def block_number(self) -> int:
+        return await self.w3.eth.block_number
+
+    async def transfer_tx(self, recipient: str, amount: int, gas: int, fees: dict) -> dict:
+        """Unsigned EIP-1559 token `transfer`, built locally without RPC calls."""
+        return {
+            "chainId": await self.chain_id(),
+            "to": self.token.address,
+            "value": 0,
+            "data": self.token.encode_abi("transfer", args=[recipient, amount]),
+            "gas": gas,
+            "maxFeePerGas": fees["max_fee_per_gas"],
+            "maxPriorityFeePerGas": fees["max_priority_fee"],
+            "type": 2,
+        }
+
+    async def send_token(self, account, recipient: str, amount: float, nonces, fee_oracle, gas_limits) -> str:
+        """
+        Sign and send a token `transfer` of `amount` (in whole tokens) from `account`; returns the tx hash.
+
+        Fees and the gas limit come from `fee_oracle` / `gas_limits`, so only a
+        cache miss hits the node, and the nonce is reserved from `nonces` last
+        so slow estimates don't hold up other sends.
+        """
+        recipient = Web3.to_checksum_address(recipient)
+        # Rounded, not truncated: a tagged amount like 1.000123 must arrive to the unit
+        raw_amount = round(amount * (10 ** await self.decimals()))
+        fees = await fee_oracle.fees()
+        gas = await gas_limits.transfer_gas(self.token, account.address, raw_amount)
+        tx = await self.transfer_tx(recipient, raw_amount, gas, fees)
+        async with nonces.allocate() as nonce:
+            tx["nonce"] = nonce
+            signed_tx = account.sign_transaction(tx)
+            tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        return tx_hash.hex()
+
+    async def token_balance(self, address: str, block_identifier="latest") -> float:
+        decimals = await self.decimals()
+        raw_balance = await self.token.functions.balanceOf(Web3.to_checksum_address(address)).call(
+            block_identifier=block_identifier
+        )
+        return raw_balance / (10 ** decimals)
+
+    async def close(self):
+        await self.w3.provider.disconnect()
+
+
+class StellarChain:
+    """Async access to Horizon over a single shared aiohttp client, timed per endpoint."""
+
+    def __init__(self, horizon_url: str):
+        self.horizon_url = horizon_url
+        self.server = ServerAsync(horizon_url, client=AiohttpClient())
+        self.metrics = RpcMetrics(provider_name(horizon_url))
+
+    async def account(self, account_id: str) -> dict:
+        return await self.metrics.timed("accounts", self.server.accounts().account_id(account_id).call())
+
+    async def load_account(self, account_id: str):
+        return await self.metrics.timed("accounts", self.server.load_account(account_id))
+
+    async def asset_balance(self, account_id: str, asset_code: str, issuer: str) -> float:
+        account = await self.account(account_id)
+        for balance in account["balances"]:
+            if balance.get("asset_code") == asset_code and balance.get("asset_issuer") == issuer:
+                return float(balance["balance"])
+        return 0.0
+
+    async def submit(self, tx) -> dict:
+        return await self.metrics.timed("transactions", self.server.submit_transaction(tx))
+
+    async def close(self):
+        await self.server.close()
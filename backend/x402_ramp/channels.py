@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from decimal import Decimal
+
+from stellar_sdk import Account, Asset, Keypair, TransactionBuilder
+from stellar_sdk.exceptions import BadRequestError, NotFoundError
+
+from .chains import StellarChain
+
+STROOP = Decimal("0.0000001")
+
+
+def channel_keypair(keypair: Keypair, index: int) -> Keypair:
+    """Channel keypair derived from the main account's seed, so no extra secrets are needed."""
+    seed = hashlib.sha256(keypair.raw_secret_key() + b"x402-ramp channel" + index.to_bytes(4, "big")).digest()
+    return Keypair.from_raw_ed25519_seed(seed)
+
+
+def result_code(error: BadRequestError) -> str | None:
+    return (error.extras or {}).get("result_codes", {}).get("transaction")
+
+
+def native_balance(account: dict) -> Decimal:
+    return next((Decimal(b["balance"]) for b in account["balances"] if b.get("asset_type") == "native"), Decimal(0))
+
+
+class ChannelAccount:
+    def __init__(self, keypair: Keypair):
+        self.keypair = keypair
+        self.sequence = None
+        self.balance = None  # XLM left for fees
+
+    @property
+    def account_id(self) -> str:
+        return self.keypair.public_key
+
+
+class ChannelPool:
+    """
+    Pool of channel accounts that submit transactions for a main account.
+
+    Each channel is the transaction source, so it supplies the sequence number
+    and fee, while operations keep the main account as their source. A
+    submission leases an idle channel, so up to `size` transactions can be in
+    flight per ledger instead of one. Sequence numbers are tracked locally
+    and only reloaded from Horizon after a submission that was rejected
+    before reaching the ledger or whose outcome is unknown.
+
+    Channels pay the fees. Each channel's XLM balance is tracked locally,
+    less the fee of every submission, and a channel that drops below
+    `min_balance` (or is refused for `tx_insufficient_balance`) is topped
+    back up to `starting_balance` from the main account in the background.
+    `setup` does the same for low channels, in the same transaction that
+    creates missing ones. A channel Horizon couldn't load at setup stays in
+    the pool and is loaded when first leased.
+    """
+
+    def __init__(
+        self,
+        stellar: StellarChain,
+        keypair: Keypair,
+        network_passphrase: str,
+        size: int = 4,
+        starting_balance: str = "2",
+        min_balance: str = "1.5",
+        base_fee: int = 100,
+        fund_retry: float = 30,
+    ):
+        self.stellar = stellar
+        self.keypair = keypair
+        self.network_passphrase = network_passphrase
+        self.starting_balance = starting_balance
+        self.min_balance = min_balance
+        self.base_fee = base_fee
+        self.fund_retry = fund_retry
+        self.channels = [ChannelAccount(channel_keypair(keypair, i)) for i in range(size)]
+        self._idle = asyncio.Queue()
+        self._missing = set()  # channels found not to exist after setup
+        self._funding = None  # background top-up task
+        self._funded_at = 0.0
+
+    def __len__(self):
+        return len(self.channels)
+
+    async def _load(self, channel: ChannelAccount):
+        account = await self.stellar.account(channel.account_id)
+        channel.sequence = int(account["sequence"])
+        channel.balance = native_balance(account)
+
+    def _is_low(self, channel: ChannelAccount) -> bool:
+        return channel.balance is not None and channel.balance < Decimal(self.min_balance)
+
+    async def _fund(self, missing: list, low: list):
+        # Balances are read again so fees charged since the last load aren't topped up twice
+        balances = await asyncio.gather(*(self.stellar.account(c.account_id) for c in low))
+        top_ups = [(c, Decimal(self.starting_balance) - native_balance(a)) for c, a in zip(low, balances)]
+        source = await self.stellar.load_account(self.keypair.public_key)
+        builder = TransactionBuilder(source, self.network_passphrase, base_fee=self.base_fee)
+        for channel in missing:
+            builder.append_create_account_op(channel.account_id, self.starting_balance)
+        for channel, top_up in top_ups:
+            builder.append_payment_op(channel.account_id, Asset.native(), f"{top_up:.7f}")
+        tx = builder.set_timeout(30).build()
+        tx.sign(self.keypair)
+        await self.stellar.submit(tx)
+        for channel, top_up in top_ups:
+            channel.balance += top_up
+        print(f"✅ Created {len(missing)} and topped up {len(low)} Stellar channel account(s)")
+
+    async def _fund_pending(self):
+        missing, self._missing = list(self._missing), set()
+        low = [c for c in self.channels if c not in missing and self._is_low(c)]
+        try:
+            await self._fund(missing, low)
+        except Exception as e:
+            self._missing.update(missing)
+            print(f"⚠️ Could not fund Stellar channel accounts, retrying in {self.fund_retry:g}s: {e}")
+
+    def _schedule_funding(self):
+        """Start a background top-up unless one is running or the last attempt was too recent."""
+        if self._funding is not None and not self._funding.done():
+            return
+        if time.monotonic() - self._funded_at < self.fund_retry:
+            return
+        self._funded_at = time.monotonic()
+        self._funding = asyncio.ensure_future(self._fund_pending())
+
+    def _charge(self, channel: ChannelAccount, fee):
+        """Deduct a submission's fee, in stroops, from the channel's tracked balance."""
+        if channel.balance is not None:
+            channel.balance -= Decimal(fee) * STROOP
+        if self._is_low(channel):
+            self._schedule_funding()
+
+    async def setup(self):
+        """Load every channel, creating missing channels and topping up low ones from the main account."""
+        results = await asyncio.gather(*(self._load(c) for c in self.channels), return_exceptions=True)
+        missing = [c for c, r in zip(self.channels, results) if isinstance(r, NotFoundError)]
+        unreachable = [r for r in results if isinstance(r, Exception) and not isinstance(r, NotFoundError)]
+        if unreachable:
+            print(f"⚠️ Could not load {len(unreachable)} Stellar channel account(s), "
+                  f"loading them again when first leased: {unreachable[0]}")
+        low = [c for c in self.channels if self._is_low(c)]
+        if missing or low:
+            try:
+                await self._fund(missing, low)
+                await asyncio.gather(*(self._load(c) for c in missing))
+            except Exception as e:
+                print(f"⚠️ Could not fund Stellar channel accounts: {e}")
+        # Only channels known not to exist are dropped
+        self.channels = [c for c in self.channels if c not in missing or c.sequence is not None]
+        for channel in self.channels:
+            self._idle.put_nowait(channel)
+        if self.channels:
+            print(f"🔁 {len(self.channels)} Stellar channel account(s) ready")
+        else:
+            print("⚠️ No Stellar channel accounts; payouts go out one at a time from the main account")
+
+    @asynccontextmanager
+    async def lease(self):
+        channel = await self._idle.get()
+        try:
+            if channel.sequence is None:
+                try:
+                    await self._load(channel)
+                except NotFoundError:
+                    self._missing.add(channel)
+                    self._schedule_funding()
+                    raise
+                if self._is_low(channel):
+                    self._schedule_funding()
+            yield channel
+        finally:
+            self._idle.put_nowait(channel)
+
+    async def submit(self, add_operations, memo: str | None = None) -> dict:
+        """
+        Build, sign and submit a transaction from a leased channel.
+
+        `add_operations(builder, source)` appends the operations; each one
+        must use `source` (the main account) as its operation source.
+        """
+        async with self.lease() as channel:
+            account = Account(channel.account_id, channel.sequence)
+            builder = TransactionBuilder(account, self.network_passphrase, base_fee=self.base_fee)
+            add_operations(builder, self.keypair.public_key)
+            if memo:
+                builder.add_text_memo(memo)
+            tx = builder.set_timeout(30).build()
+            tx.sign(channel.keypair)
+            tx.sign(self.keypair)
+            try:
+                response = await self.stellar.submit(tx)
+            except BadRequestError as e:
+                # A tx that failed in the ledger still consumed its sequence and paid its fee;
+                # anything rejected before that did not, so reload to be sure
+                if result_code(e) == "tx_failed":
+                    channel.sequence = account.sequence
+                    self._charge(channel, tx.transaction.fee)
+                else:
+                    channel.sequence = None
+                    if result_code(e) == "tx_insufficient_balance":
+                        channel.balance = Decimal(0)
+                        self._schedule_funding()
+                raise
+            except BaseException:
+                channel.sequence = None
+                raise
+            channel.sequence = account.sequence
+            self._charge(channel, response.get("fee_charged", tx.transaction.fee))
+            return response
@@ -1,3 +1,6 @@
+import asyncio
+
+
 def has_trustline(account, asset_code, issuer):
     for balance in account['balances']:
         if balance.get("asset_type") == "native":
@@ -9,3 +12,18 @@ def has_trustline(account, asset_code, issuer):
             return True
     return False
 
+
+
+async def warm_up(steps: dict) -> dict:
+    """
+    Run named start-up coroutines concurrently.
+
+    A failing step is reported and left for its cache to fill on first use,
+    so a slow or unreachable upstream delays a service's start instead of
+    stopping it.
+    """
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Warm-up of {name} failed: {result}")
+    return dict(zip(steps, results))
@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+from eth_account import Account
+
+from .tracing import span
+
+
+async def fetch_fees(
+    w3,
+    block=None,
+    default_priority_gwei: float = 2,
+    history_blocks: int = 5,
+    reward_pct: int = 50,
+) -> dict:
+    """
+    Estimate dynamic gas fee parameters using AsyncWeb3.
+
+    Returns a dict with:
+      - block_number       (int)
+      - base_fee           (wei)
+      - max_priority_fee   (wei)
+      - max_fee_per_gas    (wei)
+      - gas_price          (wei)  # legacy fallback
+    """
+    async def node_tip():
+        try:
+            return await w3.eth.max_priority_fee
+        except Exception:
+            return w3.to_wei(default_priority_gwei, "gwei")
+
+    async def latest_block():
+        return block if block is not None else await w3.eth.get_block("latest")
+
+    latest, priority_fee, hist, gas_price = await asyncio.gather(
+        latest_block(),
+        node_tip(),
+        w3.eth.fee_history(history_blocks, "latest", [reward_pct]),
+        w3.eth.gas_price,
+    )
+    base_fee = latest.get("baseFeePerGas", 0)
+
+    # Historical percentile tip
+    hist_tip = int(hist["reward"][-1][0])
+    priority_fee = max(priority_fee, hist_tip)
+
+    # Buffer to cover up to +12.5% baseFee increase
+    buffer = int(base_fee * 0.125)
+
+    return {
+        "block_number": latest["number"],
+        "base_fee": base_fee,
+        "max_priority_fee": priority_fee,
+        "max_fee_per_gas": base_fee + priority_fee + buffer,
+        "gas_price": gas_price,
+    }
+
+
+class FeeOracle:
+    """
+    Fee parameters for the current block, served from memory.
+
+    `run()` polls the head block and refreshes the fee snapshot only when a
+    new block appears, so payouts read fees without any RPC. Without the
+    background task, `fees()` refreshes on demand once the snapshot is older
+    than `max_age` seconds.
+    """
+
+    def __init__(self, w3, poll_interval: float = 2, max_age: float = 12, **fee_kwargs):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.fee_kwargs = fee_kwargs
+        self._lock = asyncio.Lock()
+        self._fees = None
+        self._updated_at = 0.0
+
+    @property
+    def block_number(self) -> int | None:
+        return self._fees["block_number"] if self._fees else None
+
+    async def refresh(self, block=None) -> dict:
+        self._fees = await fetch_fees(self.w3, block=block, **self.fee_kwargs)
+        self._updated_at = time.monotonic()
+        return self._fees
+
+    async def fees(self) -> dict:
+        if self._fees is None or time.monotonic() - self._updated_at > self.max_age:
+            async with self._lock:
+                if self._fees is None or time.monotonic() - self._updated_at > self.max_age:
+                    await self.refresh()
+        return self._fees
+
+    async def poll_once(self):
+        block = await self.w3.eth.get_block("latest")
+        if block["number"] != self.block_number:
+            async with self._lock:
+                await self.refresh(block)
+        else:
+            self._updated_at = time.monotonic()
+
+    async def run(self):
+        while True:
+            try:
+                with span("FeeOracle.poll"):
+                    await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Fee oracle error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+
+class GasLimitCache:
+    """
+    Gas limits for token calls, keyed by (token, method).
+
+    An ERC-20 `transfer` costs about the same every time, except that
+    crediting an empty balance writes a fresh storage slot. The limit is
+    estimated against a fresh address so it always covers that costlier
+    path: a recipient that once held the token may have spent it since, and
+    only the gas actually used is charged, so a tighter limit saves nothing.
+    """
+
+    def __init__(self, buffer: float = 1.15, fallback: int = 100_000):
+        self.buffer = buffer
+        self.fallback = fallback
+        self._limits = {}
+
+    async def transfer_gas(self, token, sender: str, amount: int) -> int:
+        key = (token.address, "transfer")
+        if key not in self._limits:
+            try:
+                estimate = await token.functions.transfer(Account.create().address, amount).estimate_gas({"from": sender})
+                self._limits[key] = int(estimate * self.buffer)
+            except Exception as e:
+                print(f"⚠️ Gas estimate failed, using fallback: {e}")
+                return self.fallback
+        return self._limits[key]
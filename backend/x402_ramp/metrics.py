@@ -0,0 +1,59 @@
+import time
+from urllib.parse import urlparse
+
+from prometheus_client import Counter, Gauge, Histogram
+
+RPC_SECONDS = Histogram(
+    "x402_ramp_rpc_request_seconds",
+    "Latency of calls to chain RPC providers and Horizon, by provider and method",
+    ["provider", "method"],
+)
+RPC_ERRORS = Counter(
+    "x402_ramp_rpc_errors_total",
+    "Calls to chain RPC providers and Horizon that raised, by provider and method",
+    ["provider", "method"],
+)
+WALLET_BALANCE = Gauge(
+    "x402_ramp_wallet_balance",
+    "Token balance of one of our wallets, as last seen",
+    ["chain", "asset", "address"],
+)
+
+
+def provider_name(url: str) -> str:
+    # Host only: provider URLs often carry an API key in the path
+    return urlparse(url).hostname or url
+
+
+class RpcMetrics:
+    """
+    Latency and error metrics of the calls made to one provider.
+
+    The labelled children for a method are looked up once and kept, so
+    timing a call costs two clock reads and a histogram observe.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._children = {}
+
+    def children(self, method: str):
+        children = self._children.get(method)
+        if children is None:
+            children = self._children[method] = (
+                RPC_SECONDS.labels(self.provider, method),
+                RPC_ERRORS.labels(self.provider, method),
+            )
+        return children
+
+    async def timed(self, method: str, call):
+        """Await `call`, recording its latency (and any error) under `method`."""
+        latency, errors = self.children(method)
+        start = time.perf_counter()
+        try:
+            return await call
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - start)
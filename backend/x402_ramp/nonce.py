@@ -0,0 +1,121 @@
+import asyncio
+import heapq
+import time
+from contextlib import asynccontextmanager
+
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "already known",
+    "replacement transaction underpriced",
+    "nonce has already been used",
+    "invalid nonce",
+)
+
+
+def is_nonce_error(error: Exception) -> bool:
+    """True when a node rejected a tx because its nonce no longer fits the account."""
+    message = str(error).lower()
+    return any(reason in message for reason in NONCE_ERRORS)
+
+
+class NonceManager:
+    """
+    In-process nonce allocator for one EVM sender.
+
+    Nonces are handed out from a local counter so many signed transactions can
+    be in flight at once instead of each payout reading `get_transaction_count`
+    and colliding with its neighbours. Nonces whose tx never reached the node
+    are released and reused first so no gap is left behind. The counter is
+    resynced against the chain's `pending` count on first use, after a node
+    rejects a nonce, and whenever the allocator has been idle for
+    `resync_interval` seconds, which also recovers from dropped transactions.
+    """
+
+    def __init__(self, w3, address: str, resync_interval: float = 30):
+        self.w3 = w3
+        self.address = address
+        self.resync_interval = resync_interval
+        self._lock = asyncio.Lock()
+        self._next = None
+        self._released = []
+        self._reserved = set()
+        self._synced_at = 0.0
+        self._needs_sync = True
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._reserved)
+
+    def _stale(self) -> bool:
+        if self._needs_sync:
+            return True
+        idle = not self._reserved and not self._released
+        return idle and time.monotonic() - self._synced_at > self.resync_interval
+
+    async def sync(self):
+        """Re-read the pending tx count; authoritative when nothing is in flight."""
+        chain_nonce = await self.w3.eth.get_transaction_count(self.address, "pending")
+        if self._next is None or not self._reserved:
+            self._next = chain_nonce
+            self._released = []
+        else:
+            self._next = max(self._next, chain_nonce)
+            self._released = [n for n in self._released if n >= chain_nonce]
+            heapq.heapify(self._released)
+        self._synced_at = time.monotonic()
+        self._needs_sync = False
+
+    async def reserve(self) -> int:
+        async with self._lock:
+            if self._stale():
+                await self.sync()
+            if self._released:
+                nonce = heapq.heappop(self._released)
+            else:
+                nonce = self._next
+                self._next += 1
+            self._reserved.add(nonce)
+            return nonce
+
+    def confirm(self, nonce: int):
+        """The node accepted the tx carrying `nonce`."""
+        self._reserved.discard(nonce)
+
+    def release(self, nonce: int):
+        """The tx carrying `nonce` was never broadcast; hand the nonce out again."""
+        if nonce not in self._reserved:
+            return
+        self._reserved.discard(nonce)
+        if nonce == self._next - 1:
+            self._next = nonce
+            while self._released and max(self._released) == self._next - 1:
+                self._released.remove(self._next - 1)
+                self._next -= 1
+            heapq.heapify(self._released)
+        else:
+            heapq.heappush(self._released, nonce)
+
+    def invalidate(self, nonce: int):
+        """The node rejected `nonce`; resync before the next reservation."""
+        self._reserved.discard(nonce)
+        self._needs_sync = True
+
+    @asynccontextmanager
+    async def allocate(self):
+        """
+        Reserve a nonce for the duration of a send.
+
+        Leaving the block normally confirms the nonce. An exception releases
+        it, or invalidates the counter when the node rejected the nonce itself.
+        """
+        nonce = await self.reserve()
+        try:
+            yield nonce
+        except BaseException as e:
+            if isinstance(e, Exception) and is_nonce_error(e):
+                self.invalidate(nonce)
+            else:
+                self.release(nonce)
+            raise
+        self.confirm(nonce)
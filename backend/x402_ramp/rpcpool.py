@@ -0,0 +1,175 @@
+import asyncio
+import json
+import time
+
+from .metrics import RpcMetrics, provider_name
+
+# Sent to one endpoint only: a broadcast retried elsewhere can land twice,
+# and nonces must be read from the mempool the transaction goes to
+PINNED_METHODS = frozenset({"eth_sendRawTransaction", "eth_sendTransaction", "eth_getTransactionCount"})
+HEDGED_METHODS = frozenset({"eth_call", "eth_getLogs"})
+
+
+class Endpoint:
+    """Rolling latency and error rate of one JSON-RPC endpoint."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.metrics = RpcMetrics(provider_name(url))
+        self.latency = None  # EWMA of successful calls, seconds
+        self.error_rate = 0.0  # EWMA of failed calls
+        self.failures = 0  # consecutive
+        self.down_until = 0.0
+        self.sampled_at = 0.0
+        self.head = None  # latest block number it reported
+        self.head_at = 0.0
+
+    def record(self, latency: float | None, alpha: float):
+        self.sampled_at = time.monotonic()
+        if latency is None:
+            self.error_rate += alpha * (1 - self.error_rate)
+            self.failures += 1
+            return
+        self.latency = latency if self.latency is None else self.latency + alpha * (latency - self.latency)
+        self.error_rate -= alpha * self.error_rate
+        self.failures = 0
+
+
+class RpcPool:
+    """
+    Routes JSON-RPC calls over several endpoints by observed latency and errors.
+
+    Reads go to the endpoint with the lowest latency EWMA, weighted by its
+    error rate. A read that fails is retried once on the next endpoint. An
+    `eth_call` or `eth_getLogs` that takes longer than `hedge_factor` times
+    its endpoint's usual latency is also sent to the runner-up, and the first
+    answer wins. `eth_getLogs` only goes to endpoints that have reported a
+    head at or past its `toBlock`, so a lagging provider can't return an
+    empty range the indexer would then skip. To keep every endpoint's head
+    current (and so eligible for hedged log reads), an `eth_blockNumber` is
+    also sent in the background to each endpoint whose head is older than
+    `head_interval` seconds. PINNED_METHODS stick to one endpoint until it
+    fails and are never retried elsewhere.
+
+    After `max_failures` consecutive errors an endpoint sits out for
+    `cooldown` seconds; an endpoint not called for `probe_interval`
+    seconds ranks first once, so its latency stays current.
+    """
+
+    def __init__(
+        self,
+        urls: list,
+        alpha: float = 0.2,
+        hedge_factor: float = 2.0,
+        min_hedge_delay: float = 0.05,
+        max_hedge_delay: float = 1.0,
+        max_failures: int = 3,
+        cooldown: float = 30,
+        probe_interval: float = 30,
+        head_interval: float = 5,
+    ):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.alpha = alpha
+        self.hedge_factor = hedge_factor
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self.head_interval = head_interval
+        self.pinned = None
+        self._background = set()
+
+    def _score(self, endpoint: Endpoint, now: float) -> tuple:
+        if endpoint.down_until > now:
+            return (2, endpoint.down_until)
+        if endpoint.latency is None or now - endpoint.sampled_at > self.probe_interval:
+            return (0, 0.0)
+        return (1, endpoint.latency * (1 + 10 * endpoint.error_rate))
+
+    def ranked(self) -> list:
+        now = time.monotonic()
+        return sorted(self.endpoints, key=lambda endpoint: self._score(endpoint, now))
+
+    def _hedge_delay(self, endpoint: Endpoint) -> float:
+        if endpoint.latency is None:
+            # Nothing to go by yet: don't let a cold start wait on a bad endpoint
+            return self.min_hedge_delay
+        return min(max(endpoint.latency * self.hedge_factor, self.min_hedge_delay), self.max_hedge_delay)
+
+    async def _call(self, endpoint: Endpoint, method: str, data: bytes, post) -> bytes:
+        start = time.perf_counter()
+        try:
+            response = await endpoint.metrics.timed(method, post(method, data, endpoint.url))
+        except Exception:
+            endpoint.record(None, self.alpha)
+            if endpoint.failures >= self.max_failures:
+                endpoint.down_until = time.monotonic() + self.cooldown
+                print(f"⚠️ RPC endpoint {endpoint.metrics.provider} failed {endpoint.failures} times; "
+                      f"skipping it for {self.cooldown}s")
+            raise
+        endpoint.record(time.perf_counter() - start, self.alpha)
+        if method == "eth_blockNumber":
+            endpoint.head = int(json.loads(response)["result"], 16)
+            endpoint.head_at = time.monotonic()
+        return response
+
+    def _log_range_endpoints(self, data: bytes, ranked: list) -> list:
+        to_block = json.loads(data)["params"][0].get("toBlock")
+        if not isinstance(to_block, str) or not to_block.startswith("0x"):
+            return ranked
+        to_block = int(to_block, 16)
+        caught_up = [e for e in ranked if e.head is not None and e.head >= to_block]
+        return caught_up or [max(ranked, key=lambda e: e.head or 0)]
+
+    def _refresh_heads(self, endpoints: list, data: bytes, post):
+        now = time.monotonic()
+        for endpoint in endpoints:
+            if endpoint.down_until > now or now - endpoint.head_at < self.head_interval:
+                continue
+            endpoint.head_at = now  # one refresh in flight at a time
+            task = asyncio.ensure_future(self._call(endpoint, "eth_blockNumber", data, post))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def request(self, method: str, data: bytes, post) -> bytes:
+        """Send one encoded JSON-RPC request via `post(method, data, url)`."""
+        if method in PINNED_METHODS:
+            if self.pinned is None or self.pinned.down_until > time.monotonic():
+                self.pinned = self.ranked()[0]
+            return await self._call(self.pinned, method, data, post)
+
+        ranked = self.ranked()
+        if method == "eth_blockNumber":
+            self._refresh_heads(ranked[1:], data, post)
+        if method == "eth_getLogs":
+            ranked = self._log_range_endpoints(data, ranked)
+        if method in HEDGED_METHODS and len(ranked) > 1:
+            return await self._hedged(ranked, method, data, post)
+        try:
+            return await self._call(ranked[0], method, data, post)
+        except Exception:
+            if len(ranked) == 1:
+                raise
+        return await self._call(ranked[1], method, data, post)
+
+    async def _hedged(self, ranked: list, method: str, data: bytes, post) -> bytes:
+        first = asyncio.ensure_future(self._call(ranked[0], method, data, post))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(ranked[0]))
+            if not done or first.exception() is not None:
+                # Slow or failed: the runner-up races it (or replaces it)
+                tasks.add(asyncio.ensure_future(self._call(ranked[1], method, data, post)))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,148 @@
+import asyncio
+import base64
+import json
+import time
+from collections import defaultdict
+
+import httpx
+import toml
+from stellar_sdk import Keypair, TransactionEnvelope
+
+from .tracing import span
+
+
+def jwt_expiry(token: str) -> float:
+    """`exp` claim of a JWT, read without verifying the signature."""
+    payload = token.split(".")[1]
+    payload += "=" * (-len(payload) % 4)
+    return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+
+
+class StellarToml:
+    """
+    Cached SEP-1 stellar.toml of an anchor.
+
+    The parsed document is served from memory for `ttl` seconds. After that
+    the next caller revalidates it with the ETag / Last-Modified the anchor
+    sent, so an unchanged file costs a 304 and no re-parse. Concurrent
+    callers share one fetch.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, path: str = "/.well-known/stellar.toml", ttl: float = 300):
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        self._data = None
+        self._expires = 0.0
+        self._validators = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> dict:
+        if self._data is not None and time.monotonic() < self._expires:
+            return self._data
+        async with self._lock:
+            if self._data is not None and time.monotonic() < self._expires:
+                return self._data
+            headers = self._validators if self._data is not None else {}
+            r = await self.client.get(self.path, headers=headers)
+            if r.status_code != 304:
+                r.raise_for_status()
+                self._data = toml.loads(r.text)
+                self._validators = {}
+                if "etag" in r.headers:
+                    self._validators["If-None-Match"] = r.headers["etag"]
+                if "last-modified" in r.headers:
+                    self._validators["If-Modified-Since"] = r.headers["last-modified"]
+            self._expires = time.monotonic() + self.ttl
+            return self._data
+
+
+class Sep10Tokens:
+    """
+    Per-account SEP-10 JWTs for an anchor's WEB_AUTH_ENDPOINT.
+
+    A token is reused until shortly before its `exp`: `refresh_margin`
+    seconds ahead (or half its lifetime, if that is shorter) a background
+    task runs a fresh challenge so callers keep finding a valid token in
+    memory. Callers only wait on a challenge the first time an account
+    authenticates, or after `invalidate` when the anchor rejected a token.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        stellar_toml: StellarToml,
+        network_passphrase: str,
+        refresh_margin: float = 60,
+    ):
+        self.client = client
+        self.stellar_toml = stellar_toml
+        self.network_passphrase = network_passphrase
+        self.refresh_margin = refresh_margin
+        # account -> (token, refresh_at)
+        self._tokens = {}
+        self._locks = defaultdict(asyncio.Lock)
+        self._timers = {}
+        self._refreshing = set()
+
+    def _fresh(self, account: str) -> str | None:
+        cached = self._tokens.get(account)
+        if cached and time.time() < cached[1]:
+            return cached[0]
+        return None
+
+    async def token(self, keypair: Keypair) -> str:
+        account = keypair.public_key
+        token = self._fresh(account)
+        if token:
+            return token
+        async with self._locks[account]:
+            return self._fresh(account) or await self._authenticate(keypair)
+
+    async def _authenticate(self, keypair: Keypair) -> str:
+        endpoint = (await self.stellar_toml.get())["WEB_AUTH_ENDPOINT"]
+        r = await self.client.get(endpoint, params={"account": keypair.public_key})
+        r.raise_for_status()
+        envelope = TransactionEnvelope.from_xdr(r.json()["transaction"], self.network_passphrase)
+        envelope.sign(keypair)
+        r = await self.client.post(endpoint, json={"transaction": envelope.to_xdr()})
+        r.raise_for_status()
+        token = r.json()["token"]
+
+        now = time.time()
+        exp = jwt_expiry(token)
+        refresh_at = exp - min(self.refresh_margin, (exp - now) / 2)
+        self._tokens[keypair.public_key] = (token, refresh_at)
+        self._schedule_refresh(keypair, refresh_at - now)
+        return token
+
+    def _schedule_refresh(self, keypair: Keypair, delay: float):
+        timer = self._timers.pop(keypair.public_key, None)
+        if timer:
+            timer.cancel()
+        self._timers[keypair.public_key] = asyncio.get_running_loop().call_later(
+            max(delay, 0), self._start_refresh, keypair
+        )
+
+    def _start_refresh(self, keypair: Keypair):
+        task = asyncio.create_task(self._refresh(keypair))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def _refresh(self, keypair: Keypair):
+        try:
+            async with self._locks[keypair.public_key]:
+                with span("Sep10Tokens.refresh"):
+                    await self._authenticate(keypair)
+        except Exception as e:
+            print(f"⚠️ SEP-10 token refresh for {keypair.public_key} failed: {e}")
+
+    def invalidate(self, account: str):
+        self._tokens.pop(account, None)
+
+    def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for task in self._refreshing:
+            task.cancel()
@@ -0,0 +1,62 @@
+import os
+from contextlib import nullcontext
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.instrumentation.aiohttp_client import AioHttpClientInstrumentor
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    TRACING_AVAILABLE = True
+except ImportError:
+    TRACING_AVAILABLE = False
+
+_NOOP = nullcontext()
+_tracer = None
+
+
+def setup_tracing(service_name: str, app=None):
+    """
+    Export spans if `TRACE_FILE` (JSON lines) or `OTEL_EXPORTER_OTLP_ENDPOINT`
+    (OTLP/HTTP collector) is set.
+
+    Inbound requests to `app` and every outbound httpx / aiohttp call get a
+    span, and W3C `traceparent` headers carry the trace between services.
+    Returns the provider to shut down on exit, or None when tracing is off
+    (unconfigured, or the opentelemetry packages are not installed).
+    """
+    global _tracer
+    trace_file = os.getenv("TRACE_FILE")
+    otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if not TRACING_AVAILABLE or not (trace_file or otlp_endpoint):
+        return None
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    if trace_file:
+        exporter = ConsoleSpanExporter(
+            out=open(trace_file, "a"), formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    if otlp_endpoint:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("x402_ramp")
+
+    HTTPXClientInstrumentor().instrument()
+    AioHttpClientInstrumentor().instrument()
+    if app is not None:
+        # One span per request: the per-message ASGI send/receive spans double the export cost
+        FastAPIInstrumentor.instrument_app(app, excluded_urls="metrics,health", exclude_spans=["receive", "send"])
+    return provider
+
+
+def span(name: str, attributes: dict | None = None):
+    """Context manager timing `name` as a child of the current span; free when tracing is off."""
+    if _tracer is None:
+        return _NOOP
+    return _tracer.start_as_current_span(name, attributes=attributes)
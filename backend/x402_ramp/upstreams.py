@@ -0,0 +1,42 @@
+import asyncio
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class Upstreams:
+    """
+    One long-lived `httpx.AsyncClient` per upstream service.
+
+    Every client keeps its connections alive between requests within the
+    shared `limits` and carries its upstream's own timeout. HTTP/2 is used for
+    https upstreams when the optional `h2` package is installed; plain http
+    upstreams stay on HTTP/1.1 keep-alive.
+    """
+
+    def __init__(self, limits: httpx.Limits | None = None):
+        self.limits = limits or httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+        self._clients = {}
+
+    def add(self, name: str, base_url: str, timeout: float | httpx.Timeout = 10) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=self.limits,
+            http2=HTTP2_AVAILABLE and base_url.startswith("https://"),
+        )
+        self._clients[name] = client
+        return client
+
+    def __getitem__(self, name: str) -> httpx.AsyncClient:
+        return self._clients[name]
+
+    async def close(self):
+        clients, self._clients = list(self._clients.values()), {}
+        await asyncio.gather(*(client.aclose() for client in clients))
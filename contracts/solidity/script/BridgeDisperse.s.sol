@@ -0,0 +1,20 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity ^0.8.13;
+
+import {Script, console} from "forge-std/Script.sol";
+import {BridgeDisperse} from "../src/BridgeDisperse.sol";
+
+contract BridgeDisperseScript is Script {
+    BridgeDisperse public disperse;
+
+    function setUp() public {}
+
+    function run() public {
+        vm.startBroadcast();
+
+        disperse = new BridgeDisperse();
+        console.log("BridgeDisperse deployed at", address(disperse));
+
+        vm.stopBroadcast();
+    }
+}
@@ -0,0 +1,39 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+interface IERC20 {
+    function transferFrom(address, address, uint) external returns (bool);
+}
+
+/// @notice Pays many bridge requests from the caller's balance in one transaction.
+/// @dev The caller approves this contract once; every payout is a
+///      transferFrom(msg.sender, recipient, amount), so the contract never
+///      holds funds and anyone can only spend their own allowance.
+contract BridgeDisperse {
+    event Payout(
+        bytes32 indexed requestId,
+        address indexed recipient,
+        uint256 amount
+    );
+
+    function disperse(
+        IERC20 token,
+        bytes32[] calldata requestIds,
+        address[] calldata recipients,
+        uint256[] calldata amounts
+    ) external {
+        require(
+            requestIds.length == recipients.length &&
+                recipients.length == amounts.length,
+            "Length mismatch"
+        );
+
+        for (uint256 i = 0; i < recipients.length; i++) {
+            require(
+                token.transferFrom(msg.sender, recipients[i], amounts[i]),
+                "Transfer failed"
+            );
+            emit Payout(requestIds[i], recipients[i], amounts[i]);
+        }
+    }
+}
@@ -0,0 +1,95 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity ^0.8.13;
+
+import {Test} from "forge-std/Test.sol";
+import {BridgeDisperse, IERC20} from "../src/BridgeDisperse.sol";
+
+contract MockToken {
+    mapping(address => uint256) public balanceOf;
+    mapping(address => mapping(address => uint256)) public allowance;
+
+    function mint(address to, uint256 amount) external {
+        balanceOf[to] += amount;
+    }
+
+    function approve(address spender, uint256 amount) external returns (bool) {
+        allowance[msg.sender][spender] = amount;
+        return true;
+    }
+
+    function transferFrom(address from, address to, uint256 amount) external returns (bool) {
+        require(allowance[from][msg.sender] >= amount, "allowance");
+        require(balanceOf[from] >= amount, "balance");
+        allowance[from][msg.sender] -= amount;
+        balanceOf[from] -= amount;
+        balanceOf[to] += amount;
+        return true;
+    }
+}
+
+contract BridgeDisperseTest is Test {
+    event Payout(bytes32 indexed requestId, address indexed recipient, uint256 amount);
+
+    BridgeDisperse public disperse;
+    MockToken public token;
+    address public bridge = address(0xB12D);
+    address public alice = address(0xA11CE);
+    address public bob = address(0xB0B);
+
+    function setUp() public {
+        disperse = new BridgeDisperse();
+        token = new MockToken();
+        token.mint(bridge, 10_000_000);
+        vm.prank(bridge);
+        token.approve(address(disperse), type(uint256).max);
+    }
+
+    function _batch()
+        internal
+        view
+        returns (bytes32[] memory requestIds, address[] memory recipients, uint256[] memory amounts)
+    {
+        requestIds = new bytes32[](2);
+        recipients = new address[](2);
+        amounts = new uint256[](2);
+        (requestIds[0], recipients[0], amounts[0]) = (bytes32(uint256(1)), alice, 2_010_000); // 2.01 USDC
+        (requestIds[1], recipients[1], amounts[1]) = (bytes32(uint256(2)), bob, 1);
+    }
+
+    function test_PaysEveryRecipient() public {
+        (bytes32[] memory requestIds, address[] memory recipients, uint256[] memory amounts) = _batch();
+        vm.prank(bridge);
+        disperse.disperse(IERC20(address(token)), requestIds, recipients, amounts);
+
+        assertEq(token.balanceOf(alice), amounts[0]);
+        assertEq(token.balanceOf(bob), amounts[1]);
+        assertEq(token.balanceOf(bridge), 10_000_000 - amounts[0] - amounts[1]);
+        assertEq(token.balanceOf(address(disperse)), 0);
+    }
+
+    function test_EmitsPayoutPerRequest() public {
+        (bytes32[] memory requestIds, address[] memory recipients, uint256[] memory amounts) = _batch();
+        vm.expectEmit(true, true, false, true, address(disperse));
+        emit Payout(requestIds[0], alice, amounts[0]);
+        vm.expectEmit(true, true, false, true, address(disperse));
+        emit Payout(requestIds[1], bob, amounts[1]);
+        vm.prank(bridge);
+        disperse.disperse(IERC20(address(token)), requestIds, recipients, amounts);
+    }
+
+    function test_RevertsOnLengthMismatch() public {
+        (bytes32[] memory requestIds, address[] memory recipients,) = _batch();
+        uint256[] memory amounts = new uint256[](1);
+        amounts[0] = 1;
+        vm.prank(bridge);
+        vm.expectRevert(bytes("Length mismatch"));
+        disperse.disperse(IERC20(address(token)), requestIds, recipients, amounts);
+    }
+
+    function test_SpendsOnlyTheCallersAllowance() public {
+        (bytes32[] memory requestIds, address[] memory recipients, uint256[] memory amounts) = _batch();
+        vm.prank(alice);
+        vm.expectRevert(bytes("allowance"));
+        disperse.disperse(IERC20(address(token)), requestIds, recipients, amounts);
+    }
+}